@@ -1,7 +1,17 @@
 # autoFunction_server.py
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
 import uvicorn
 from custom_components.extended_openai_conversation.ServerInterface.Helpers.shared_models import *
+from custom_components.extended_openai_conversation.ServerInterface.Helpers.intent_matcher import PhraseRegistry
+from custom_components.extended_openai_conversation.ServerInterface.Helpers.trusted_hop import (
+    TRUSTED_HOP_HEADER, check_schema_version, construct_request, is_trusted_hop, trusted_hop_header
+)
+from custom_components.extended_openai_conversation.ServerInterface.Helpers.codec import decode_request, encode_response
+from custom_components.extended_openai_conversation.ServerInterface.Helpers.tracing import (
+    TRACE_ID_HEADER, TRACEPARENT_HEADER, SpanBuffer, TraceContext, Tracer, current_context, waterfall
+)
+import os
 import traceback
 import sys
 
@@ -10,35 +20,80 @@ app = FastAPI()
 # Konstante für den Service-Namen
 SERVICE_NAME = "auto_function_server"
 
+# Compiled intent phrases, reloaded in the background when intent_phrases.json changes
+phrases = PhraseRegistry()
+
+# Spans of the requests handled here, continued from the main server's traceparent
+tracer = Tracer(SERVICE_NAME, SpanBuffer(int(os.environ.get("TRACE_BUFFER_SIZE", 4096))))
+
 def get_error_details() -> ErrorDetails:
     """Extract error details from the current exception."""
     exc_type, exc_value, exc_traceback = sys.exc_info()
     tb = traceback.extract_tb(exc_traceback)[-1]
+    trace = current_context()
     return ErrorDetails(
         message=str(exc_value),
         line_number=tb.lineno,
         file_name=tb.filename,
         traceback=''.join(traceback.format_exception(exc_type, exc_value, exc_traceback)),
-        service_name=SERVICE_NAME
+        service_name=SERVICE_NAME,
+        trace_id=trace.trace_id if trace else None
     )
 
+@app.on_event("startup")
+async def start_phrase_watch():
+    phrases.start()
+
+@app.on_event("shutdown")
+async def stop_phrase_watch():
+    await phrases.stop()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
 
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    """Spans of one trace recorded here."""
+    return {"trace_id": trace_id, "spans": waterfall(tracer.trace(trace_id))}
+
 @app.post("/process", response_model=ProcessResponse)
-async def process_request(request: ProcessRequest):
-    """Process a conversation request."""
+async def process_request(raw: Request):
+    """Process a conversation request (JSON or msgpack body, negotiated response)."""
+    with tracer.span("process", TraceContext.parse(raw.headers.get(TRACEPARENT_HEADER))) as trace:
+        response = await process_traced(raw)
+    response.headers[TRACE_ID_HEADER] = trace.trace_id
+    return response
+
+async def process_traced(raw: Request) -> Response:
+    trusted = is_trusted_hop(raw.headers.get(TRUSTED_HOP_HEADER), raw.client.host if raw.client else None)
+    with tracer.span("decode"):
+        request, error_response = await decode_request(raw, lambda payload: parse_request(payload, trusted))
+    if error_response is not None:
+        return error_response
+
+    with tracer.span("handle"):
+        response = handle_process(request)
+    return encode_response(response, raw.headers.get("accept"), trusted_hop_header() if trusted else None)
+
+def parse_request(payload: dict, trusted: bool) -> ProcessRequest:
+    # The main server already validated the request, skip it on the trusted hop
+    if trusted:
+        return construct_request(payload)
+    check_schema_version(payload)
+    return ProcessRequest(**payload)
+
+def handle_process(request: ProcessRequest) -> ProcessResponse:
     try:
+        match = phrases.match(request.user_input.text)
+
         # Simulate an error for testing
-        if "cause error" in request.user_input.text.lower():
+        if match and match.intent == "cause_error":
             raise ValueError("This is a test error from auto function server")
             
         # Simple example processing
-        text = request.user_input.text.lower()
-        
-        if "turn on helix" in text:
+        if match and match.intent == "turn_on" and match.slots.get("target") == "helix":
             return ProcessResponse(
                 response="Turning on Helix light auto",
                 commands=[
@@ -1,15 +1,19 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, Header, Request, WebSocket, WebSocketDisconnect
 import uvicorn
 import httpx
 import sys
 import os
 import traceback
-from typing import Dict, Type
+from typing import Callable, Dict, List, Optional, Tuple, Type
 import voluptuous as vol
 import asyncio
-from fastapi.responses import JSONResponse
-import aiofiles
-import tempfile
+import datetime
+import hashlib
+import itertools
+import time
+from contextlib import contextmanager
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+import re
 
 # Add parent folder to Python path
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -18,65 +22,247 @@ sys.path.append(parent_dir)
 
 # Relative import of shared_models
 from ServerInterface.Helpers.shared_models import *
+from ServerInterface.Helpers.state_mirror import StateMirrorStore
+from ServerInterface.Helpers.entity_index import EntityIndex
+from ServerInterface.Helpers.intent_matcher import PhraseRegistry
+from ServerInterface.Helpers.response_cache import ResponseCache
+from ServerInterface.Helpers.deadline import Deadline
+from ServerInterface.Helpers.executor_scheduler import ExecutorScheduler, ScheduledExecutor
+from ServerInterface.Helpers.process_tier import ProcessTier, transfer_context
+from ServerInterface.Helpers.config_validation import ValidationCache
+from ServerInterface.Helpers.audio_store import AudioStore
+from ServerInterface.Helpers.audio_stream import (
+    AUDIO_CHUNK_SIZE, SourceReader, multipart_stream, new_boundary
+)
+from ServerInterface.Helpers.trusted_hop import (
+    TRUSTED_HOP_HEADER, check_schema_version, construct_request, construct_response,
+    is_trusted_hop, trusted_hop_header
+)
+from ServerInterface.Helpers.single_flight import SingleFlight, dedupe_commands
+from ServerInterface.Helpers.ws_protocol import (
+    MSG_CANCEL, MSG_EVENT, MSG_PING, MSG_PONG, MSG_PROCESS, MSG_PUSH, decode_message, encode_message
+)
+from ServerInterface.Helpers.codec import (
+    ACCEPT_POST_HEADER, JSON_CODEC, UnsupportedContentType,
+    accept_header, accepted_types, codec_for_content_type, decode_request, encode_response, negotiate
+)
+from ServerInterface.Helpers.metrics import (
+    CLIENT_FALLBACK_REASONS, CLIENT_STAGES, CLIENT_TIMING_HEADER, FALLBACK_PREFIX,
+    PROMETHEUS_CONTENT_TYPE, SERVER_TIMING_HEADER, MetricsRegistry, begin_request, parse_timing, span
+)
+from ServerInterface.Helpers.shared_state import (
+    BACKEND_MEMORY, BACKEND_SQLITE, DEFAULT_FLUSH_INTERVAL, DEFAULT_SHARED_STATE_PATH, SharedAudioStore, SharedResponseCache,
+    SharedSpanBuffer, SharedStateDB, SharedStateMirrorStore
+)
+from ServerInterface.Helpers.plugin_loader import PluginLoader
+from ServerInterface.Helpers.tracing import (
+    TRACE_ID_HEADER, TRACEPARENT_HEADER, SpanBuffer, TraceContext, Tracer,
+    current_context, trace_header, waterfall
+)
 
 app = FastAPI()
 
+def worker_count(value: str) -> int:
+    """SERVER_WORKERS: a number or "auto" for one worker per core."""
+    if value == "auto":
+        return os.cpu_count() or 1
+    return max(1, int(value))
+
 # Constants
+SERVICE_NAME = "main_server"
 AUTO_FUNCTION_URL = "http://localhost:8128/process"
 AUTO_FUNCTION_HEALTH_URL = "http://localhost:8128/health"
+AUTO_FUNCTION_TRACES_URL = "http://localhost:8128/traces"
+
+# Request budget: cap for the caller's X-Request-Budget-Ms, minus a margin for the reply
+REQUEST_BUDGET = 10.0  # Sekunden
+REQUEST_BUDGET_MARGIN = 0.05
+
+# "sequential": AutoFunction first, local executors as fallback
+# "race": both in parallel, AutoFunction preferred if it answers within the grace period
+PROCESS_MODE = os.environ.get("PROCESS_MODE", "sequential")
+AUTO_FUNCTION_GRACE = 0.15  # Sekunden, die auf AutoFunction gewartet wird, wenn lokal schneller war
+# Sequential mode: part of the budget AutoFunction can't use, so the local fallback still runs
+LOCAL_FALLBACK_RESERVE = 0.25  # Sekunden
+
+# Process pool for cpu_bound executors
+CPU_WORKERS = int(os.environ.get("CPU_WORKERS", "2"))
+CPU_QUEUE_SIZE = int(os.environ.get("CPU_QUEUE_SIZE", "8"))
+
+# Executor configs built by this server skip validation unless this is set (debugging)
+VALIDATE_INTERNAL_CONFIGS = os.environ.get("VALIDATE_INTERNAL_CONFIGS", "0") == "1"
+VALIDATION_CACHE_SIZE = 1024
+
+# Identical requests (same text, client and state version) within this window share one computation
+SINGLE_FLIGHT_WINDOW = float(os.environ.get("SINGLE_FLIGHT_WINDOW", 0.5))
+
+# WebSocket channel: server pings this often and drops clients silent for WS_IDLE_TIMEOUT
+WS_HEARTBEAT_INTERVAL = 15.0
+WS_IDLE_TIMEOUT = 45.0
+
+# Finished spans kept for /traces/{trace_id}
+TRACE_BUFFER_SIZE = int(os.environ.get("TRACE_BUFFER_SIZE", 4096))
+TRACE_FETCH_TIMEOUT = 1.0  # Sekunden, für die Spans der AutoFunction
+
+# Multi-worker mode: SERVER_WORKERS uvicorn processes share port 8129
+SERVER_WORKERS = worker_count(os.environ.get("SERVER_WORKERS", "1"))
+# "memory": process-local state; "sqlite": state mirrors, response cache, audio and spans
+# in one SQLite file all workers use (default with more than one worker)
+SHARED_STATE_BACKEND = os.environ.get("SHARED_STATE_BACKEND", BACKEND_SQLITE if SERVER_WORKERS > 1 else BACKEND_MEMORY)
+SHARED_STATE_PATH = os.environ.get("SHARED_STATE_PATH", DEFAULT_SHARED_STATE_PATH)
+# Cache entries and spans of a worker are written in one transaction this often
+SHARED_STATE_FLUSH_INTERVAL = float(os.environ.get("SHARED_STATE_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL))
+
+# Executor plugins (EXECUTORS dict per module) are hot-loaded from this directory
+EXECUTOR_PLUGIN_DIR = os.environ.get("EXECUTOR_PLUGIN_DIR", os.path.join(os.path.dirname(current_dir), "Executors"))
+PLUGIN_POLL_INTERVAL = float(os.environ.get("PLUGIN_POLL_INTERVAL", 1.0))
+# Replaced executors get this long to finish the requests they are running
+PLUGIN_DRAIN_TIMEOUT = 30.0
+
+# Shared HTTP client limits (app lifetime)
+HTTP_MAX_CONNECTIONS = 20
+HTTP_MAX_KEEPALIVE = 10
 
 # Audio Service Constants
 AUDIO_SERVICE_URL = "http://audio-service:8130"  # Dummy URL
 AUDIO_FORWARD_ENDPOINT = f"{AUDIO_SERVICE_URL}/process_audio"
+AUDIO_FORWARD_TIMEOUT = 30.0
+
+# Audio store budgets; AUDIO_SPILL_DIR enables spilling to segment files
+AUDIO_MEMORY_BUDGET = int(os.environ.get("AUDIO_MEMORY_BUDGET", 32 * 1024 * 1024))
+AUDIO_DISK_BUDGET = int(os.environ.get("AUDIO_DISK_BUDGET", 256 * 1024 * 1024))
+AUDIO_MAX_CLIP = int(os.environ.get("AUDIO_MAX_CLIP", 16 * 1024 * 1024))
+AUDIO_TTL = float(os.environ.get("AUDIO_TTL", 600))
+AUDIO_SPILL_DIR = os.environ.get("AUDIO_SPILL_DIR") or None
+
+# Response cache for local executor results
+RESPONSE_CACHE_SIZE = 256
+RESPONSE_CACHE_TTL = 300.0  # Sekunden
+
+# Intents, die der LightControlExecutor als Service ausführt
+LIGHT_INTENTS = ("turn_on", "turn_off")
+
+# Satzgrenzen für gestreamte Sprachausgabe
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+# Cross-process store of the sqlite backend, opened per worker
+shared_state = SharedStateDB(SHARED_STATE_PATH) if SHARED_STATE_BACKEND == BACKEND_SQLITE else None
+
+async def off_loop(func: Callable, *args):
+    """Call a store method; the sqlite stores block on I/O, so theirs run on the database thread."""
+    if shared_state is None:
+        return func(*args)
+    return await shared_state.run(func, *args)
+
+# Uploaded audio per conversation, bounded in memory and optionally spilled to disk;
+# with the sqlite backend one byte budget (AUDIO_DISK_BUDGET) for the shared clips
+if shared_state is None:
+    audio_store = AudioStore(AUDIO_MEMORY_BUDGET, AUDIO_DISK_BUDGET, AUDIO_TTL, AUDIO_MAX_CLIP, AUDIO_SPILL_DIR)
+else:
+    audio_store = SharedAudioStore(shared_state, AUDIO_DISK_BUDGET, AUDIO_TTL, AUDIO_MAX_CLIP)
+
+# App-lifetime HTTP client for downstream services, created on startup
+http_client: Optional[httpx.AsyncClient] = None
+
+# Task committing the queued shared state writes, sqlite backend only
+shared_state_flush: Optional[asyncio.Task] = None
+
+# Coalesces duplicate utterances, e.g. from several satellites in one room
+single_flight = SingleFlight(SINGLE_FLIGHT_WINDOW)
+
+# Open WebSocket channels by state sync client id, for server-initiated pushes
+ws_channels: Dict[str, Callable] = {}
+
+# Body codec for AutoFunction requests, upgraded once it advertises a better one
+auto_function_codec = JSON_CODEC
+
+# Mirrors of the clients' entity states for delta state sync
+state_mirrors = StateMirrorStore() if shared_state is None else SharedStateMirrorStore(shared_state)
+
+# Compiled intent phrases, reloaded in the background when intent_phrases.json changes
+phrases = PhraseRegistry()
+
+# Cached executor results, invalidated when their entities change
+if shared_state is None:
+    response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+else:
+    response_cache = SharedResponseCache(
+        shared_state, RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL,
+        dump=lambda response: response.dict(), load=construct_response
+    )
+
+# Prometheus metrics, served on /metrics
+metrics = MetricsRegistry()
+stage_seconds = metrics.histogram("process_stage_seconds", "Time spent per /process pipeline stage", ("stage",))
+executor_seconds = metrics.histogram("executor_seconds", "Executor run time by outcome", ("executor", "status"))
+requests_total = metrics.counter("process_requests_total", "Process requests by transport", ("transport",))
+errors_total = metrics.counter("process_errors_total", "Process requests that failed with an exception")
+fallbacks_total = metrics.counter(
+    "fallbacks_total", "Requests answered by the local executors instead of AutoFunction, by reason", ("reason",)
+)
+client_stage_seconds = metrics.histogram(
+    "client_stage_seconds", "Stage times the integration reports for its previous request", ("stage",)
+)
+client_fallbacks_total = metrics.counter(
+    "client_fallbacks_total", "Integration fallbacks to its own local processing, by reason", ("reason",)
+)
+
+# Spans of the requests passing through this server, continued from the caller's traceparent
+tracer = Tracer(
+    SERVICE_NAME,
+    SpanBuffer(TRACE_BUFFER_SIZE) if shared_state is None else SharedSpanBuffer(shared_state, TRACE_BUFFER_SIZE)
+)
 
-# Global context to store audio data
-AUDIO_CONTEXT = {}
+@contextmanager
+def stage(name: str):
+    """Time a pipeline stage for /metrics, Server-Timing and the request's trace."""
+    with span(stage_seconds, name), tracer.span(name):
+        yield
 
 def get_error_details() -> ErrorDetails:
     """Get error details from current exception."""
     exc_type, exc_value, exc_traceback = sys.exc_info()
+    tb = traceback.extract_tb(exc_traceback)[-1] if exc_traceback else None
+    trace = current_context()
     return ErrorDetails(
-        type=exc_type.__name__ if exc_type else "Unknown",
         message=str(exc_value) if exc_value else "No message",
-        traceback=traceback.format_exc()
+        line_number=tb.lineno if tb else 0,
+        file_name=tb.filename if tb else "",
+        traceback=traceback.format_exc(),
+        service_name=SERVICE_NAME,
+        trace_id=trace.trace_id if trace else None
     )
 
-async def forward_audio_to_service(file_content: bytes, filename: str, conversation_id: str, content_type: str):
-    """Forward audio file to the audio processing service."""
+async def forward_audio_to_service(chunks, filename: str, conversation_id: str, content_type: str):
+    """
+    Stream audio chunks to the audio processing service as a chunked multipart upload.
+    chunks should be bounded (SourceReader.chunks), so only a few are held in memory.
+    """
     try:
-        # Erstelle ein temporäres File für den Multipart Upload
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            temp_file.write(file_content)
-            temp_path = temp_file.name
-
-        try:
-            # Erstelle den Multipart Form Data
-            files = {
-                'file': (filename, open(temp_path, 'rb'), content_type)
-            }
-            data = {
-                'conversation_id': conversation_id
-            }
-
-            # Sende Request an Audio Service
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    AUDIO_FORWARD_ENDPOINT,
-                    files=files,
-                    data=data,
-                    timeout=30.0
-                )
+        boundary = new_boundary()
+        body = multipart_stream(
+            {'conversation_id': conversation_id},
+            'file',
+            filename,
+            content_type,
+            chunks,
+            boundary
+        )
 
-                return {
-                    'success': response.status_code == 200,
-                    'status_code': response.status_code,
-                    'response': response.json() if response.status_code == 200 else None,
-                    'error': response.text if response.status_code != 200 else None
-                }
+        # Sende Request an Audio Service
+        response = await http_client.post(
+            AUDIO_FORWARD_ENDPOINT,
+            content=body,
+            headers={'Content-Type': f'multipart/form-data; boundary={boundary}'},
+            timeout=AUDIO_FORWARD_TIMEOUT
+        )
 
-        finally:
-            # Cleanup: Lösche temporäre Datei
-            os.unlink(temp_path)
+        return {
+            'success': response.status_code == 200,
+            'status_code': response.status_code,
+            'response': response.json() if response.status_code == 200 else None,
+            'error': response.text if response.status_code != 200 else None
+        }
 
     except Exception as e:
         print(f"Error forwarding audio: {str(e)}")
@@ -85,48 +271,54 @@ async def forward_audio_to_service(file_content: bytes, filename: str, conversat
             'error': str(e)
         }
 
-@app.post("/upload_audio")
-async def upload_audio(conversation_id: str, file: UploadFile = File(...)):
+async def upload_file_chunks(file: UploadFile):
+    """Read an uploaded file chunk by chunk instead of all at once."""
+    while True:
+        chunk = await file.read(AUDIO_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+async def forward_audio(chunks, filename: str, conversation_id: str, content_type: str) -> JSONResponse:
     """
-    Endpoint to receive audio files and forward them.
-    conversation_id: ID to associate the audio with a conversation
-    file: The audio file to upload
+    Forward the audio, store it and build the upload response. The upload is read to
+    the end into the store even when forwarding fails or stops early.
     """
+    reader = None
     try:
-        # Read the file content
-        content = await file.read()
-        
-        # Store in context with conversation ID
-        AUDIO_CONTEXT[conversation_id] = {
-            'filename': file.filename,
-            'content': content,
-            'content_type': file.content_type,
-            'timestamp': datetime.datetime.now().isoformat()
-        }
-        
-        # Forward to audio service
+        writer = audio_store.writer(conversation_id, filename, content_type)
+        reader = SourceReader(chunks, writer.write)
         forward_result = await forward_audio_to_service(
-            content,
-            file.filename,
+            reader.chunks(),
+            filename,
             conversation_id,
-            file.content_type
+            content_type
         )
-        
+        # Whatever the forward left unread; raises if the upload itself broke off
+        await reader.finish()
+
+        # Store with conversation ID; may write a segment file, so not on the loop
+        stored = await asyncio.get_running_loop().run_in_executor(None, writer.commit)
+
         if not forward_result['success']:
             print(f"Warning: Audio forwarding failed: {forward_result.get('error')}")
-        
+
         return JSONResponse(
             status_code=200,
             content={
                 "message": "Audio uploaded successfully",
-                "filename": file.filename,
+                "filename": filename,
                 "conversation_id": conversation_id,
-                "content_type": file.content_type,
+                "content_type": content_type,
+                # Only a completely stored clip reports its size
+                "size": reader.size if stored else None,
+                "stored": stored,
+                "timestamp": datetime.datetime.now().isoformat(),
                 "forward_status": "success" if forward_result.get('success') else "failed",
                 "forward_details": forward_result
             }
         )
-        
+
     except Exception as e:
         error_details = get_error_details()
         print(f"Error uploading audio: {e}")
@@ -138,35 +330,111 @@ async def upload_audio(conversation_id: str, file: UploadFile = File(...)):
                 "details": error_details.dict()
             }
         )
+    finally:
+        if reader is not None:
+            reader.cancel()
+
+@app.post("/upload_audio")
+async def upload_audio(conversation_id: str, file: UploadFile = File(...)):
+    """
+    Endpoint to receive audio files and forward them.
+    conversation_id: ID to associate the audio with a conversation
+    file: The audio file to upload
+    """
+    return await forward_audio(
+        upload_file_chunks(file),
+        file.filename,
+        conversation_id,
+        file.content_type
+    )
+
+@app.post("/upload_audio/stream")
+async def upload_audio_stream(raw: Request, conversation_id: str, filename: str = "audio"):
+    """
+    Streaming variant: the request body is the raw audio. Chunks are passed on
+    to the audio service as they arrive, nothing is spooled.
+    conversation_id: ID to associate the audio with a conversation
+    filename: Name reported to the audio service
+    """
+    return await forward_audio(
+        raw.stream(),
+        filename,
+        conversation_id,
+        raw.headers.get("content-type", "application/octet-stream")
+    )
+
+def iter_audio(conversation_id: str):
+    """Yield a stored clip in chunks straight from its memory buffer or segment file."""
+    with audio_store.open(conversation_id) as view:
+        if view is None:
+            return
+        for offset in range(0, len(view), AUDIO_CHUNK_SIZE):
+            yield bytes(view[offset:offset + AUDIO_CHUNK_SIZE])
+
+@app.get("/audio/stats")
+async def audio_stats():
+    """Audio store memory, disk and eviction statistics."""
+    return await off_loop(audio_store.stats)
+
+@app.get("/audio/{conversation_id}")
+async def get_audio(conversation_id: str):
+    """Stored audio of a conversation, e.g. for the speech service."""
+    clip = await off_loop(audio_store.get, conversation_id)
+    if clip is None:
+        return JSONResponse(status_code=404, content={"message": "No audio for this conversation"})
+    return StreamingResponse(
+        iter_audio(conversation_id),
+        media_type=clip.content_type or "application/octet-stream",
+        headers={"Content-Length": str(clip.size)}
+    )
 
 class BaseExecutor:
-    def __init__(self, schema: vol.Schema = vol.Schema({})):
-        self.schema = schema
+    # Scheduling: executors that must finish first, own timeout in seconds,
+    # merge priority (higher wins the response text) and whether the request needs it
+    depends_on: Tuple[str, ...] = ()
+    timeout: Optional[float] = 5.0
+    priority: int = 0
+    required: bool = True
+    # CPU-bound executors implement run() instead of execute() and run in the process tier;
+    # only context_keys are sent to the worker process
+    cpu_bound: bool = False
+    context_keys: Tuple[str, ...] = ("conversation_id", "original_text", "config", "results")
+
+    # Compiled once per class; a plain dict is compiled on registration
+    schema: vol.Schema = vol.Schema({})
 
-    async def validate(self, config: dict) -> bool:
+    def validate(self, config: dict) -> dict:
+        """Return the validated config. The result may be shared between requests, don't mutate it."""
         try:
-            self.schema(config)
-            return True
+            return self.schema(config)
         except vol.Error as e:
             raise ValueError(f"Invalid config: {str(e)}")
 
     async def execute(self, config: dict, context: dict) -> ProcessResponse:
         raise NotImplementedError()
 
+    def run(self, config: dict, context: dict) -> ProcessResponse:
+        """Synchronous entry point of cpu_bound executors, called in a worker process."""
+        raise NotImplementedError()
+
 class ResponseExecutor(BaseExecutor):
-    def __init__(self):
-        super().__init__(
-            vol.Schema({
-                vol.Required("command"): str,
-                vol.Optional("language"): str,
-            })
-        )
-    
+    # Waits for the light results so the answer can reflect what was resolved
+    depends_on = ("light",)
+    priority = 10
+    schema = vol.Schema({
+        vol.Required("command"): str,
+        vol.Optional("language"): str,
+    })
+
     async def execute(self, config: dict, context: dict) -> ProcessResponse:
         """Handle response generation."""
         original_text = context.get("original_text", "")
         response = f"{original_text} remote" if original_text else "remote"
-        
+
+        light_result = context.get("results", {}).get("light")
+        if config["command"] in LIGHT_INTENTS and light_result is not None and not light_result.commands:
+            response = f"{response} (no matching light found)"
+
         return ProcessResponse(
             response=response,
             commands=None,
@@ -174,28 +442,35 @@ class ResponseExecutor(BaseExecutor):
         )
 
 class LightControlExecutor(BaseExecutor):
-    def __init__(self):
-        super().__init__(
-            vol.Schema({
-                vol.Required("command"): str,
-                vol.Optional("entity_id"): str,
-                vol.Optional("language"): str,
-            })
-        )
+    timeout = 2.0
+    schema = vol.Schema({
+        vol.Required("command"): str,
+        vol.Optional("target"): str,
+        vol.Optional("entity_id"): str,
+        vol.Optional("language"): str,
+    })
 
     async def execute(self, config: dict, context: dict) -> ProcessResponse:
         command = config["command"]
         
         # Erstelle Commands basierend auf dem erkannten Kommando
         commands = None
-        if command == "turn_on_helix":
-            commands = [
-                Command(
-                    domain="light",
-                    service="turn_on",
-                    data={"entity_id": "light.helix"}
-                )
-            ]
+        if command in LIGHT_INTENTS:
+            # Ziel über den Entity-Index auflösen statt fest verdrahteter IDs
+            entity_ids = []
+            index = context.get("entity_index")
+            if index is not None and config.get("target"):
+                entity_ids = index.resolve(config["target"], domain="light")
+            if not entity_ids and config.get("entity_id"):
+                entity_ids = [config["entity_id"]]
+            if entity_ids:
+                commands = [
+                    Command(
+                        domain="light",
+                        service=command,
+                        data={"entity_id": entity_ids[0] if len(entity_ids) == 1 else entity_ids}
+                    )
+                ]
 
         return ProcessResponse(
             response="",  # Leere Response, da diese vom ResponseExecutor kommt
@@ -204,12 +479,126 @@ class LightControlExecutor(BaseExecutor):
         )
 
 class ExecutorRegistry:
-    def __init__(self):
+    def __init__(self, process_tier: ProcessTier):
         self._executors: Dict[str, BaseExecutor] = {}
+        self.process_tier = process_tier
+        self.validation_cache = ValidationCache(VALIDATION_CACHE_SIZE)
+        # Each instance gets its own version, so cached validations never cross a swap
+        self._versions: Dict[BaseExecutor, int] = {}
+        self._next_version = itertools.count(1)
+        # Requests currently using an instance; replaced instances are dropped once idle
+        self._in_flight: Dict[BaseExecutor, int] = {}
+        self._retired: Dict[BaseExecutor, asyncio.Event] = {}
+        # Part of every response cache key, so answers of replaced executors are never served
+        self.generation = self._generation_of(self._executors)
+
+    def _instantiate(self, executor_class: Type[BaseExecutor]) -> BaseExecutor:
+        executor = executor_class()
+        if not isinstance(executor.schema, vol.Schema):
+            executor.schema = vol.Schema(executor.schema)
+        return executor
 
     def register(self, name: str, executor_class: Type[BaseExecutor]):
         """Register a new executor class."""
-        self._executors[name] = executor_class()
+        self.swap({name: executor_class})
+
+    def swap(self, changes: Dict[str, Optional[Type[BaseExecutor]]]) -> List[BaseExecutor]:
+        """
+        Apply several registrations at once (None unregisters). All new instances are built
+        before anything changes, so a failing one leaves the registry as it was. Requests
+        already running keep the instances they started with. Returns the replaced instances.
+        """
+        executors = dict(self._executors)
+        for name, executor_class in changes.items():
+            if executor_class is None:
+                executors.pop(name, None)
+            else:
+                executors[name] = self._instantiate(executor_class)
+
+        replaced = [
+            executor for name, executor in self._executors.items()
+            if executors.get(name) is not executor
+        ]
+        for executor in executors.values():
+            self._versions.setdefault(executor, next(self._next_version))
+        self._executors = executors
+        self.generation = self._generation_of(executors)
+        for executor in replaced:
+            self._retire(executor)
+        return replaced
+
+    @staticmethod
+    def _generation_of(executors: Dict[str, BaseExecutor]) -> str:
+        # Plugin modules are named after their content digest, so every worker
+        # with the same executors computes the same generation (shared cache)
+        classes = sorted(
+            f"{name}={type(executor).__module__}.{type(executor).__qualname__}"
+            for name, executor in executors.items()
+        )
+        return hashlib.sha256("\n".join(classes).encode()).hexdigest()[:16]
+
+    def _retire(self, executor: BaseExecutor):
+        if self._in_flight.get(executor, 0) == 0:
+            self._versions.pop(executor, None)
+        else:
+            # Set by release() when its last request finishes
+            self._retired[executor] = asyncio.Event()
+
+    async def drain(self, executors: List[BaseExecutor], timeout: float) -> bool:
+        """Wait until no request uses the given replaced instances; False on timeout."""
+        events = [self._retired[executor] for executor in executors if executor in self._retired]
+        if not events:
+            return True
+        try:
+            await asyncio.wait_for(asyncio.gather(*(event.wait() for event in events)), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def acquire(self, names) -> Dict[str, BaseExecutor]:
+        """Pin the current instances for one request; release() when done."""
+        executors = {name: self.get_executor(name) for name in names}
+        for executor in executors.values():
+            self._in_flight[executor] = self._in_flight.get(executor, 0) + 1
+        return executors
+
+    def release(self, executors: Dict[str, BaseExecutor]):
+        for executor in executors.values():
+            remaining = self._in_flight[executor] - 1
+            if remaining:
+                self._in_flight[executor] = remaining
+                continue
+            del self._in_flight[executor]
+            idle = self._retired.pop(executor, None)
+            if idle is not None:
+                idle.set()
+                self._versions.pop(executor, None)
+
+    def classes(self) -> Dict[str, Type[BaseExecutor]]:
+        """Registered executor classes by name."""
+        return {name: type(executor) for name, executor in self._executors.items()}
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "registered": len(self._executors),
+            "in_flight": sum(self._in_flight.values()),
+            "draining": len(self._retired),
+        }
+
+    def validate_configs(
+        self, executor_configs: Dict[str, dict], executors: Dict[str, BaseExecutor], trusted: bool = False
+    ) -> Dict[str, dict]:
+        """Validate every config, remembering configs that passed before. Trusted configs are used as-is."""
+        if trusted:
+            return executor_configs
+        return {
+            executor_name: self.validation_cache.validate(
+                f"{executor_name}#{self._versions.get(executors[executor_name], 0)}",
+                executors[executor_name].validate,
+                config
+            )
+            for executor_name, config in executor_configs.items()
+        }
 
     def get_executor(self, name: str) -> BaseExecutor:
         """Get an executor instance by name."""
@@ -217,97 +606,496 @@ class ExecutorRegistry:
             raise ValueError(f"No executor registered for {name}")
         return self._executors[name]
 
-    async def execute_parallel(self, executor_configs: Dict[str, dict], context: dict) -> ProcessResponse:
-        """Execute multiple executors in parallel and combine their results."""
-        # Erstelle Tasks für jeden Executor
-        tasks = []
-        for executor_name, config in executor_configs.items():
-            executor = self.get_executor(executor_name)
-            tasks.append(executor.execute(config, context))
-        
-        # Führe alle Tasks parallel aus
-        results = await asyncio.gather(*tasks)
-        
-        # Kombiniere die Ergebnisse
+    def scheduler(self, executors: Dict[str, BaseExecutor]) -> ExecutorScheduler:
+        """Build a scheduler from the executors' declared dependencies, timeouts and priorities."""
+        nodes = {}
+        for executor_name, executor in executors.items():
+            nodes[executor_name] = ScheduledExecutor(
+                depends_on=executor.depends_on,
+                timeout=executor.timeout,
+                priority=executor.priority,
+                required=executor.required
+            )
+        return ExecutorScheduler(nodes)
+
+    def _starter(self, executor_configs: Dict[str, dict], executors: Dict[str, BaseExecutor], context: dict):
+        def start(executor_name: str, dependency_results: Dict[str, ProcessResponse]):
+            executor = executors[executor_name]
+            executor_context = {**context, "results": dependency_results}
+            if executor.cpu_bound:
+                return self.process_tier.run_method(
+                    type(executor), "run",
+                    executor_configs[executor_name],
+                    transfer_context(executor_context, executor.context_keys)
+                )
+            return executor.execute(executor_configs[executor_name], executor_context)
+        return start
+
+    async def execute_parallel(self, executor_configs: Dict[str, dict], context: dict, trusted: bool = False) -> ProcessResponse:
+        """
+        Execute the executors concurrently in dependency order and combine their results.
+        Per-executor timings are stored in context["executor_timings"].
+        """
+        executors = self.acquire(executor_configs)
+        try:
+            executor_configs = self.validate_configs(executor_configs, executors, trusted)
+            scheduler = self.scheduler(executors)
+            results = {}
+            try:
+                async for executor_name, result in scheduler.run(self._starter(executor_configs, executors, context)):
+                    results[executor_name] = result
+            finally:
+                context["executor_timings"] = scheduler.timings
+            return self.combine_results(results, context, executors)
+        finally:
+            self.release(executors)
+
+    def combine_results(
+        self, results: Dict[str, ProcessResponse], context: dict, executors: Optional[Dict[str, BaseExecutor]] = None
+    ) -> ProcessResponse:
+        """Combine executor results by priority: commands in priority order, highest priority response wins."""
+        executors = executors if executors is not None else self._executors
         final_commands = []
         final_response = ""
-        
-        for result in results:
+
+        ordered = sorted(results.items(), key=lambda item: -executors[item[0]].priority)
+        for _, result in ordered:
             if result.commands:
                 final_commands.extend(result.commands)
-            if result.response:
-                final_response = result.response  # Nimm die Response vom ResponseExecutor
-                
+            if result.response and not final_response:
+                final_response = result.response
+
         return ProcessResponse(
             response=final_response,
             commands=final_commands if final_commands else None,
             conversation_id=context.get("conversation_id")
         )
 
+    async def execute_stream(self, executor_configs: Dict[str, dict], context: dict, trusted: bool = False):
+        """
+        Execute executors in dependency order and yield (name, result) as soon as each is ready.
+        The instances used are stored in context["executors"] for combine_results.
+        """
+        executors = self.acquire(executor_configs)
+        context["executors"] = executors
+        try:
+            executor_configs = self.validate_configs(executor_configs, executors, trusted)
+            scheduler = self.scheduler(executors)
+            try:
+                async for executor_name, result in scheduler.run(self._starter(executor_configs, executors, context)):
+                    yield executor_name, result
+            finally:
+                context["executor_timings"] = scheduler.timings
+        finally:
+            self.release(executors)
+
+# Worker processes for CPU-bound executors, warmed on startup
+process_tier = ProcessTier(CPU_WORKERS, CPU_QUEUE_SIZE)
+
 # Create global registry instance
-registry = ExecutorRegistry()
+registry = ExecutorRegistry(process_tier)
 
 # Register executors
 registry.register("response", ResponseExecutor)
 registry.register("light", LightControlExecutor)
 
+# Plugins see these names as globals, so they don't import this module
+plugin_loader = PluginLoader(
+    registry,
+    EXECUTOR_PLUGIN_DIR,
+    BaseExecutor,
+    namespace={
+        "BaseExecutor": BaseExecutor,
+        "ProcessResponse": ProcessResponse,
+        "Command": Command,
+        "vol": vol,
+        "LIGHT_INTENTS": LIGHT_INTENTS,
+    },
+    poll_interval=PLUGIN_POLL_INTERVAL,
+    drain_timeout=PLUGIN_DRAIN_TIMEOUT
+)
+
+@app.on_event("startup")
+async def open_http_client():
+    global http_client
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE
+        ),
+        timeout=REQUEST_BUDGET
+    )
+
+@app.on_event("shutdown")
+async def close_http_client():
+    if http_client is not None:
+        await http_client.aclose()
+
+@app.on_event("startup")
+async def start_shared_state_flush():
+    global shared_state_flush
+    if shared_state is not None:
+        shared_state_flush = asyncio.ensure_future(shared_state.flush_periodically(SHARED_STATE_FLUSH_INTERVAL))
+
+@app.on_event("shutdown")
+async def close_shared_state():
+    if shared_state is not None:
+        if shared_state_flush is not None:
+            shared_state_flush.cancel()
+        # Writes what is still queued
+        shared_state.close()
+
+@app.on_event("startup")
+async def start_phrase_watch():
+    phrases.start()
+
+@app.on_event("shutdown")
+async def stop_phrase_watch():
+    await phrases.stop()
+
+@app.on_event("startup")
+async def start_process_tier():
+    await process_tier.start()
+
+@app.on_event("shutdown")
+async def stop_process_tier():
+    process_tier.shutdown()
+
+@app.on_event("startup")
+async def start_plugin_loader():
+    # Load what is there before serving, then keep watching
+    await plugin_loader.reload()
+    plugin_loader.start()
+
+@app.on_event("shutdown")
+async def stop_plugin_loader():
+    await plugin_loader.stop()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy"}
 
-@app.post("/process", response_model=ProcessResponse)
-async def process_request(request: ProcessRequest):
-    """Process a conversation request."""
-    try:
-        # Try the AutoFunction service first
+@app.get("/cache/stats")
+async def cache_stats():
+    """Response cache hit/miss/eviction statistics."""
+    return await off_loop(response_cache.stats)
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Stage latencies, executor times and fallback counts in Prometheus text format."""
+    return Response(content=metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+def record_client_timing(value: Optional[str]):
+    """Record the stage times and fallbacks the integration reports for its previous request."""
+    for name, seconds in parse_timing(value).items():
+        if name in CLIENT_STAGES and seconds is not None:
+            client_stage_seconds.observe(seconds, stage=name)
+        elif name.startswith(FALLBACK_PREFIX) and name[len(FALLBACK_PREFIX):] in CLIENT_FALLBACK_REASONS:
+            client_fallbacks_total.inc(reason=name[len(FALLBACK_PREFIX):])
+
+def record_executor_timings(context: dict, started: float):
+    """Executor times into /metrics and as spans of the current trace; started is the run's wall clock start."""
+    for executor_name, timing in context.get("executor_timings", {}).items():
+        executor_seconds.observe(timing.duration, executor=executor_name, status=timing.status)
+        tracer.record(f"executor.{executor_name}", started + timing.started, timing.duration, status=timing.status)
+
+@app.get("/traces")
+async def recent_traces():
+    """Ids of the most recent traces seen here."""
+    return {"traces": await off_loop(tracer.buffer.recent_traces), **await off_loop(tracer.buffer.stats)}
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str, downstream: bool = True):
+    """Spans of one trace as a waterfall, including AutoFunction's spans unless downstream=false."""
+    spans = await off_loop(tracer.trace, trace_id)
+    if downstream:
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(AUTO_FUNCTION_URL, json=request.dict())
-                if response.status_code == 200:
-                    auto_function_response = ProcessResponse(**response.json())
-                    if auto_function_response.error:
-                        return auto_function_response
-                    return auto_function_response
+            response = await http_client.get(f"{AUTO_FUNCTION_TRACES_URL}/{trace_id}", timeout=TRACE_FETCH_TIMEOUT)
+            if response.status_code == 200:
+                spans.extend(response.json().get("spans", []))
         except httpx.HTTPError as e:
-            print(f"Could not connect to AutoFunction service: {e}")
+            print(f"Could not fetch AutoFunction spans: {e}")
+    return {"trace_id": trace_id, "spans": waterfall(spans)}
 
-        # Fallback to local processing using executors
-        text = request.user_input.text.lower()
-        
-        # Determine command based on text
-        if "turn on helix" in text or "schalte helix ein" in text:
-            command = "turn_on_helix"
-        else:
-            command = "default"
-            
-        # Execute command
-        context = {
-            "conversation_id": request.user_input.conversation_id,
-            "states": request.states,
-            "config": request.config,
-            "original_text": request.user_input.text
-        }
+@app.get("/executors/stats")
+async def executor_stats():
+    """Process tier, config validation cache, single-flight, registry and plugin statistics."""
+    return {
+        "process_tier": process_tier.stats(),
+        "registry": registry.stats(),
+        "plugins": plugin_loader.stats(),
+        "validation_cache": registry.validation_cache.stats(),
+        "single_flight": single_flight.stats()
+    }
+
+@app.post("/executors/reload")
+async def reload_executors(raw: Request):
+    """Load changed executor plugins now instead of at the next poll."""
+    if not is_trusted_hop(raw.headers.get(TRUSTED_HOP_HEADER), raw.client.host if raw.client else None):
+        return JSONResponse(status_code=403, content={"detail": "Reloads are only accepted from internal services"})
+    return await plugin_loader.reload()
+
+async def resolve_request_states(request: ProcessRequest):
+    """
+    Resolve delta-encoded states against the client's mirror.
+    Returns (request, state_version, entity_index) or None if a resync is required.
+    """
+    if request.state_sync is None:
+        return request, None, None
+    mirror = await state_mirrors.sync(request.states, request.state_sync)
+    if mirror is None:
+        return None
+    if request.state_sync.base_version is not None:
+        response_cache.invalidate_entities(list(request.states) + request.state_sync.removed)
+    request = request.copy(update={"states": mirror.states, "state_sync": None})
+    return request, mirror.version, mirror.index
+
+async def call_auto_function(request: ProcessRequest, deadline: Deadline) -> Optional[ProcessResponse]:
+    """Forward the request to the AutoFunction service, None if it is unavailable."""
+    global auto_function_codec
+    if deadline.expired:
+        fallbacks_total.inc(reason="deadline")
+        return None
+    codec = auto_function_codec
+    with stage("auto_function_encode"):
+        body = codec.dumps(request.dict())
+    try:
+        with stage("auto_function"):
+            response = await http_client.post(
+                AUTO_FUNCTION_URL,
+                content=body,
+                headers={
+                    **deadline.header(),
+                    **trusted_hop_header(),
+                    **trace_header(),
+                    "Content-Type": codec.content_type,
+                    "Accept": accept_header()
+                },
+                timeout=deadline.remaining()
+            )
+        auto_function_codec = negotiate(response.headers.get(ACCEPT_POST_HEADER))
+        if response.status_code == 200:
+            payload = codec_for_content_type(response.headers.get("content-type")).loads(response.content)
+            # AutoFunction echoes the header when it answered on the trusted path
+            if response.headers.get(TRUSTED_HOP_HEADER):
+                return construct_response(payload)
+            return ProcessResponse(**payload)
+        fallbacks_total.inc(reason=f"status_{response.status_code}")
+    except httpx.TimeoutException as e:
+        print(f"AutoFunction service timed out: {e!r}")
+        fallbacks_total.inc(reason="timeout")
+    except UnsupportedContentType as e:
+        print(f"AutoFunction service answered with an unsupported body: {e}")
+        fallbacks_total.inc(reason="content_type")
+    except httpx.HTTPError as e:
+        print(f"Could not connect to AutoFunction service: {e}")
+        fallbacks_total.inc(reason="unavailable")
+    return None
+
+def build_local_execution(request: ProcessRequest, entity_index: Optional[EntityIndex]):
+    """
+    Build executor configs and context for local processing.
+    Also returns the entity ids the result depends on, for the response cache.
+    """
+    # Determine command based on text
+    command = "default"
+    target = ""
+    match = phrases.match(request.user_input.text)
+    if match and match.intent in LIGHT_INTENTS:
+        command = match.intent
+        target = match.slots.get("target", "")
+
+    if entity_index is None:
+        entity_index = EntityIndex(request.states)
+    dependencies = entity_index.resolve(target, domain="light") if target else []
         
-        # Konfiguriere die parallel auszuführenden Executors
-        executor_configs = {
-            "light": {
-                "command": command,
-                "entity_id": "light.helix",
-                "language": request.user_input.language
-            },
-            "response": {
-                "command": command,
-                "language": request.user_input.language
-            }
+    context = {
+        "conversation_id": request.user_input.conversation_id,
+        "states": request.states,
+        "entity_index": entity_index,
+        "config": request.config,
+        "original_text": request.user_input.text,
+        # Executors read audio with audio_store.open(conversation_id)
+        "audio_store": audio_store
+    }
+    
+    # Konfiguriere die parallel auszuführenden Executors
+    executor_configs = {
+        "light": {
+            "command": command,
+            "target": target,
+            "language": request.user_input.language
+        },
+        "response": {
+            "command": command,
+            "language": request.user_input.language
         }
-        
-        # Führe die Executors parallel aus
-        return await registry.execute_parallel(executor_configs, context)
+    }
+    return executor_configs, context, dependencies
+
+def cache_key_for(request: ProcessRequest, dependencies: List[str]):
+    return ResponseCache.make_key(
+        request.user_input.text, request.user_input.language, request.states, dependencies
+    ) + (registry.generation,)
+
+def from_cache(cached: ProcessResponse, request: ProcessRequest) -> ProcessResponse:
+    return cached.copy(update={"conversation_id": request.user_input.conversation_id})
+
+async def run_local(request: ProcessRequest, entity_index: Optional[EntityIndex], deadline: Deadline) -> ProcessResponse:
+    """Local processing using executors, served from the response cache when possible."""
+    executor_configs, context, dependencies = build_local_execution(request, entity_index)
+    cache_key = cache_key_for(request, dependencies)
+    cached = await off_loop(response_cache.get, cache_key)
+    if cached is not None:
+        return from_cache(cached, request)
+
+    # Führe die Executors parallel aus
+    executors_started = time.time()
+    with stage("executors"):
+        result = await asyncio.wait_for(
+            registry.execute_parallel(executor_configs, context, trusted=not VALIDATE_INTERNAL_CONFIGS),
+            timeout=deadline.remaining()
+        )
+        record_executor_timings(context, executors_started)
+    response_cache.put(cache_key, result.copy(), dependencies)
+    return result
+
+async def race_auto_function_and_local(
+    request: ProcessRequest, entity_index: Optional[EntityIndex], deadline: Deadline
+) -> ProcessResponse:
+    """
+    Start AutoFunction and local processing together. A valid AutoFunction answer
+    is preferred; if local finishes first it waits AUTO_FUNCTION_GRACE for it.
+    If local failed, AutoFunction gets the rest of the budget; the local error is
+    only raised when AutoFunction has no answer either.
+    """
+    auto_task = asyncio.ensure_future(call_auto_function(request, deadline))
+    local_task = asyncio.ensure_future(run_local(request, entity_index, deadline))
+    try:
+        done, _ = await asyncio.wait({auto_task, local_task}, return_when=asyncio.FIRST_COMPLETED)
+        if auto_task not in done:
+            if local_task.exception() is not None:
+                wait = deadline.remaining()
+            else:
+                wait = min(AUTO_FUNCTION_GRACE, deadline.remaining())
+            await asyncio.wait({auto_task}, timeout=wait)
+        if not auto_task.done():
+            fallbacks_total.inc(reason="race_lost")
+        elif not auto_task.cancelled():
+            auto_function_response = auto_task.result()
+            if auto_function_response is not None and auto_function_response.error is None:
+                return auto_function_response
+            if auto_function_response is not None:
+                fallbacks_total.inc(reason="error_response")
+        return await local_task
+    finally:
+        auto_task.cancel()
+        local_task.cancel()
+
+def parse_process_request(payload: dict, trusted: bool) -> ProcessRequest:
+    """Internal hops were validated where they entered, only the edge pays for validation."""
+    if trusted:
+        return construct_request(payload)
+    check_schema_version(payload)
+    return ProcessRequest(**payload)
+
+async def read_process_request(raw: Request):
+    """
+    Decode the body with the codec named by its Content-Type.
+    Returns (request, None) or (None, error response).
+    """
+    trusted = is_trusted_hop(raw.headers.get(TRUSTED_HOP_HEADER), raw.client.host if raw.client else None)
+    with stage("receive"):
+        # Kept by the request, decode_request reads it again without waiting
+        await raw.body()
+    with stage("decode"):
+        return await decode_request(raw, lambda payload: parse_process_request(payload, trusted))
+
+@app.post("/process", response_model=ProcessResponse)
+async def process_request(
+    raw: Request,
+    x_request_budget_ms: Optional[str] = Header(None)
+):
+    """Process a conversation request (JSON or msgpack body, negotiated response)."""
+    timings = begin_request()
+    requests_total.inc(transport="http")
+    record_client_timing(raw.headers.get(CLIENT_TIMING_HEADER))
+    deadline = Deadline.from_header(x_request_budget_ms, REQUEST_BUDGET, REQUEST_BUDGET_MARGIN)
+    with tracer.span("process", TraceContext.parse(raw.headers.get(TRACEPARENT_HEADER)), transport="http") as trace:
+        request, error_response = await read_process_request(raw)
+        if error_response is not None:
+            return error_response
+        result = await handle_process(request, deadline)
+        with stage("encode"):
+            response = encode_response(result, raw.headers.get("accept"))
+    response.headers[SERVER_TIMING_HEADER] = timings.finish(stage_seconds)
+    response.headers[TRACE_ID_HEADER] = trace.trace_id
+    return response
+
+def flight_key(kind: str, request: ProcessRequest, client_id: Optional[str], state_version: Optional[int]):
+    """
+    Single-flight key; requests without state sync carry their own snapshot and are not coalesced.
+    client_id comes from the request as received, the resolved one has no state_sync any more.
+    """
+    if state_version is None or client_id is None:
+        return None
+    # The exact utterance, followers get the leader's wording
+    return (
+        kind,
+        request.user_input.text,
+        request.user_input.language,
+        client_id,
+        state_version
+    )
+
+async def compute_response(request: ProcessRequest, entity_index: Optional[EntityIndex], deadline: Deadline) -> ProcessResponse:
+    """AutoFunction first (or raced), local executors as fallback; commands deduplicated."""
+    if PROCESS_MODE == "race":
+        result = await race_auto_function_and_local(request, entity_index, deadline)
+    else:
+        # Try the AutoFunction service first
+        result = await call_auto_function(request, deadline.reserve(LOCAL_FALLBACK_RESERVE))
+        if result is None:
+            # Fallback to local processing using executors
+            result = await run_local(request, entity_index, deadline)
+    result.commands = dedupe_commands(result.commands)
+    return result
+
+async def handle_process(request: ProcessRequest, deadline: Deadline) -> ProcessResponse:
+    """Run a decoded request, sharing the work with identical concurrent requests."""
+    try:
+        client_id = request.state_sync.client_id if request.state_sync is not None else None
+        with stage("state_sync"):
+            resolved = await resolve_request_states(request)
+        if resolved is None:
+            return ProcessResponse(
+                response="",
+                commands=None,
+                conversation_id=request.user_input.conversation_id,
+                resync_required=True
+            )
+        request, state_version, entity_index = resolved
+
+        key = flight_key("process", request, client_id, state_version)
+        if key is None:
+            result = await compute_response(request, entity_index, deadline)
+        else:
+            result, leader = await single_flight.do(key, lambda: compute_response(request, entity_index, deadline))
+            if not leader:
+                # The leader's client executes the commands, duplicates only get the answer
+                print(f"Coalesced duplicate request: {request.user_input.text!r}")
+                result = result.copy(update={
+                    "commands": None,
+                    "conversation_id": request.user_input.conversation_id
+                })
+        result.state_version = state_version
+        return result
 
     except Exception as e:
         error_details = get_error_details()
         print(f"Error processing request: {e}")
+        errors_total.inc()
         return ProcessResponse(
             response="An error occurred in main server",
             commands=None,
@@ -315,11 +1103,264 @@ async def process_request(request: ProcessRequest):
             error=error_details
         )
 
+def split_speech(text: str) -> List[str]:
+    """Split spoken text into sentences so TTS can start on the first one."""
+    return [part for part in SENTENCE_SPLIT.split(text) if part]
+
+def encode_event(event: StreamEvent) -> str:
+    return event.json(exclude_none=True) + "\n"
+
+def response_events(response: ProcessResponse):
+    """Turn a (partial) response into commands and speech events."""
+    if response.commands:
+        yield StreamEvent(type="commands", commands=response.commands)
+    for part in split_speech(response.response):
+        yield StreamEvent(type="speech", text=part)
+
+async def compute_events(request: ProcessRequest, entity_index: Optional[EntityIndex], state_version: int, deadline: Deadline):
+    """AutoFunction first, local executors as fallback; commands deduplicated across events."""
+    seen_commands = set()
+
+    def unique(events):
+        for event in events:
+            if event.commands:
+                event.commands = dedupe_commands(event.commands, seen_commands)
+                if not event.commands:
+                    continue
+            yield event
+
+    auto_function_response = await call_auto_function(request, deadline.reserve(LOCAL_FALLBACK_RESERVE))
+    if auto_function_response is not None:
+        if auto_function_response.error is None:
+            for event in unique(response_events(auto_function_response)):
+                yield event
+        yield StreamEvent(
+            type="done",
+            conversation_id=auto_function_response.conversation_id,
+            state_version=state_version,
+            error=auto_function_response.error
+        )
+        return
+
+    executor_configs, context, dependencies = build_local_execution(request, entity_index)
+    cache_key = cache_key_for(request, dependencies)
+    cached = await off_loop(response_cache.get, cache_key)
+    if cached is not None:
+        for event in unique(response_events(from_cache(cached, request))):
+            yield event
+    else:
+        partials = {}
+        executors_started = time.time()
+        try:
+            async for executor_name, partial in registry.execute_stream(executor_configs, context, trusted=not VALIDATE_INTERNAL_CONFIGS):
+                partials[executor_name] = partial
+                for event in unique(response_events(partial)):
+                    yield event
+        finally:
+            record_executor_timings(context, executors_started)
+        response_cache.put(cache_key, registry.combine_results(partials, context, context.get("executors")), dependencies)
+    yield StreamEvent(type="done", conversation_id=request.user_input.conversation_id, state_version=state_version)
+
+async def process_events(request: ProcessRequest, deadline: Deadline):
+    """Yield StreamEvents: commands as soon as known, speech in parts, then done."""
+    conversation_id = request.user_input.conversation_id
+    state_version = None
+    try:
+        client_id = request.state_sync.client_id if request.state_sync is not None else None
+        with stage("state_sync"):
+            resolved = await resolve_request_states(request)
+        if resolved is None:
+            yield StreamEvent(type="done", conversation_id=conversation_id, resync_required=True)
+            return
+        request, state_version, entity_index = resolved
+
+        key = flight_key("stream", request, client_id, state_version)
+        if key is None:
+            async for event in compute_events(request, entity_index, state_version, deadline):
+                yield event
+            return
+
+        future, leader = single_flight.claim(key)
+        if not leader:
+            # Replay the leader's answer without its commands, they are executed once
+            print(f"Coalesced duplicate request: {request.user_input.text!r}")
+            for event in await asyncio.shield(future):
+                if event.type == "speech":
+                    yield event
+                elif event.type == "done":
+                    yield event.copy(update={"conversation_id": conversation_id})
+            return
+
+        events = []
+        try:
+            async for event in compute_events(request, entity_index, state_version, deadline):
+                events.append(event)
+                yield event
+        except BaseException as e:
+            single_flight.fail(key, future, e)
+            raise
+        single_flight.finish(key, future, events)
+
+    except Exception as e:
+        error_details = get_error_details()
+        print(f"Error streaming request: {e}")
+        errors_total.inc()
+        yield StreamEvent(
+            type="done",
+            conversation_id=conversation_id,
+            state_version=state_version,
+            error=error_details
+        )
+
+async def timed_process_events(request: ProcessRequest, deadline: Deadline, trace: Optional[TraceContext], transport: str):
+    """process_events in a span continuing the caller's trace, recording the time to the first event and to done."""
+    started = time.perf_counter()
+    first_event = True
+    with tracer.span("process_stream", trace, transport=transport):
+        async for event in process_events(request, deadline):
+            if first_event:
+                stage_seconds.observe(time.perf_counter() - started, stage="first_event")
+                first_event = False
+            yield event
+    stage_seconds.observe(time.perf_counter() - started, stage="stream_total")
+
+async def stream_process_events(request: ProcessRequest, deadline: Deadline, trace: Optional[TraceContext]):
+    """Yield NDJSON lines of process_events."""
+    async for event in timed_process_events(request, deadline, trace, "stream"):
+        yield encode_event(event)
+
+@app.post("/process/stream")
+async def process_request_stream(
+    raw: Request,
+    x_request_budget_ms: Optional[str] = Header(None)
+):
+    """Process a conversation request and stream the result as NDJSON."""
+    requests_total.inc(transport="stream")
+    record_client_timing(raw.headers.get(CLIENT_TIMING_HEADER))
+    deadline = Deadline.from_header(x_request_budget_ms, REQUEST_BUDGET, REQUEST_BUDGET_MARGIN)
+    request, error_response = await read_process_request(raw)
+    if error_response is not None:
+        return error_response
+    return StreamingResponse(
+        stream_process_events(request, deadline, TraceContext.parse(raw.headers.get(TRACEPARENT_HEADER))),
+        media_type="application/x-ndjson",
+        headers={ACCEPT_POST_HEADER: accepted_types()}
+    )
+
+async def push_to_client(client_id: str, event: dict) -> bool:
+    """Send a server-initiated event to a client with an open WebSocket channel."""
+    send = ws_channels.get(client_id)
+    if send is None:
+        return False
+    try:
+        await send({"type": MSG_PUSH, "event": event})
+        return True
+    except Exception as e:
+        print(f"Push to {client_id} failed: {e}")
+        return False
+
+@app.post("/push/{client_id}")
+async def push_endpoint(client_id: str, raw: Request):
+    """Let internal services push progress, follow-up commands or state requests to a client."""
+    if not is_trusted_hop(raw.headers.get(TRUSTED_HOP_HEADER), raw.client.host if raw.client else None):
+        return JSONResponse(status_code=403, content={"detail": "Pushes are only accepted from internal services"})
+    event = await raw.json()
+    return {"delivered": await push_to_client(client_id, event)}
+
+@app.websocket("/ws")
+async def websocket_channel(ws: WebSocket):
+    """
+    Persistent channel: many requests in flight, identified by id, with events
+    streamed back as for /process/stream, plus pushes and heartbeats.
+    """
+    await ws.accept()
+    send_lock = asyncio.Lock()
+    requests_in_flight: Dict[str, asyncio.Task] = {}
+    client_ids = set()
+    last_received = time.monotonic()
+
+    async def send(message: dict):
+        async with send_lock:
+            await ws.send_text(encode_message(message))
+
+    async def run(request_id: str, payload: dict, budget_ms, trace: Optional[TraceContext]):
+        try:
+            deadline = Deadline.from_header(budget_ms, REQUEST_BUDGET, REQUEST_BUDGET_MARGIN)
+            try:
+                request = parse_process_request(payload, trusted=False)
+            except (ValueError, TypeError, KeyError) as e:
+                await send({"type": MSG_EVENT, "id": request_id, "event": StreamEvent(
+                    type="done", error=ErrorDetails(
+                        message=str(e), line_number=0, file_name="", traceback="", service_name=SERVICE_NAME
+                    )
+                ).dict(exclude_none=True)})
+                return
+            if request.state_sync is not None and request.state_sync.client_id not in client_ids:
+                client_ids.add(request.state_sync.client_id)
+                ws_channels[request.state_sync.client_id] = send
+            async for event in timed_process_events(request, deadline, trace, "ws"):
+                await send({"type": MSG_EVENT, "id": request_id, "event": event.dict(exclude_none=True)})
+        finally:
+            requests_in_flight.pop(request_id, None)
+
+    async def heartbeat():
+        try:
+            while True:
+                await asyncio.sleep(WS_HEARTBEAT_INTERVAL)
+                if time.monotonic() - last_received > WS_IDLE_TIMEOUT:
+                    print("WebSocket client stopped answering, closing channel")
+                    await ws.close()
+                    return
+                await send({"type": MSG_PING})
+        except Exception as e:
+            print(f"WebSocket heartbeat stopped: {e}")
+
+    heartbeat_task = asyncio.ensure_future(heartbeat())
+    try:
+        while True:
+            data = await ws.receive_text()
+            last_received = time.monotonic()
+            try:
+                message = decode_message(data)
+            except ValueError as e:
+                print(f"Ignoring malformed WebSocket message: {e}")
+                continue
+
+            if message["type"] == MSG_PROCESS and message.get("id"):
+                requests_total.inc(transport="ws")
+                record_client_timing(message.get("timing"))
+                requests_in_flight[message["id"]] = asyncio.ensure_future(
+                    run(
+                        message["id"], message.get("request") or {}, message.get("budget_ms"),
+                        TraceContext.parse(message.get("traceparent"))
+                    )
+                )
+            elif message["type"] == MSG_CANCEL:
+                task = requests_in_flight.pop(message.get("id"), None)
+                if task is not None:
+                    task.cancel()
+            elif message["type"] == MSG_PING:
+                await send({"type": MSG_PONG})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        heartbeat_task.cancel()
+        for task in requests_in_flight.values():
+            task.cancel()
+        for client_id in client_ids:
+            if ws_channels.get(client_id) is send:
+                del ws_channels[client_id]
+
 if __name__ == "__main__":
+    if SERVER_WORKERS > 1 and SHARED_STATE_BACKEND == BACKEND_MEMORY:
+        print("Warning: several workers with SHARED_STATE_BACKEND=memory, mirrors, caches and audio are per worker")
+    print(f"Starting {SERVER_WORKERS} worker(s), shared state: {SHARED_STATE_BACKEND}")
     uvicorn.run(
-        app,
+        # Workers are separate processes that import the app themselves
+        "ServerInterface.Controller.server:app" if SERVER_WORKERS > 1 else app,
         host="0.0.0.0",
         port=8129,
+        workers=SERVER_WORKERS,
         log_level="debug",
         access_log=True
     )
\ No newline at end of file
@@ -0,0 +1,240 @@
+# audio_store.py
+import mmap
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+
+class AudioClip:
+    """Metadata plus the location of one stored clip (memory buffer or segment file)."""
+
+    __slots__ = ("conversation_id", "filename", "content_type", "timestamp", "size", "expires_at", "buffer", "path")
+
+    def __init__(self, conversation_id: str, filename: str, content_type: str, buffer: bytearray, expires_at: float):
+        self.conversation_id = conversation_id
+        self.filename = filename
+        self.content_type = content_type
+        self.timestamp = time.time()
+        self.size = len(buffer)
+        self.expires_at = expires_at
+        self.buffer: Optional[bytearray] = buffer
+        self.path: Optional[str] = None
+
+    @property
+    def on_disk(self) -> bool:
+        return self.path is not None
+
+
+class AudioWriter:
+    """Collects one upload; nothing is stored before commit(), oversized clips are dropped."""
+
+    def __init__(self, store: "AudioStore", conversation_id: str, filename: str, content_type: str):
+        self._store = store
+        self.conversation_id = conversation_id
+        self.filename = filename
+        self.content_type = content_type
+        self._buffer: Optional[bytearray] = bytearray()
+
+    def write(self, chunk: bytes) -> None:
+        if self._buffer is None:
+            return
+        if len(self._buffer) + len(chunk) > self._store.max_clip_bytes:
+            self._buffer = None
+            self._store.count("rejected")
+            return
+        self._buffer.extend(chunk)
+
+    def commit(self) -> bool:
+        """Store the clip, may write to disk: call from an executor thread."""
+        if self._buffer is None:
+            return False
+        buffer, self._buffer = self._buffer, None
+        self._store.put(self.conversation_id, self.filename, self.content_type, buffer)
+        return True
+
+
+class AudioStore:
+    """
+    Audio clips by conversation id with a memory byte budget, LRU and TTL eviction.
+    With a spill directory, clips pushed out of memory move to segment files that
+    are read back through mmap; the disk has its own budget.
+    """
+
+    def __init__(
+        self,
+        memory_budget: int = 32 * 1024 * 1024,
+        disk_budget: int = 256 * 1024 * 1024,
+        ttl: float = 600.0,
+        max_clip_bytes: int = 16 * 1024 * 1024,
+        spill_dir: Optional[str] = None,
+    ):
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self.ttl = ttl
+        self.max_clip_bytes = max_clip_bytes
+        self.spill_dir = spill_dir
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            # Segments of a previous process are unreachable, its index is gone
+            for name in os.listdir(spill_dir):
+                if name.endswith(".seg"):
+                    os.unlink(os.path.join(spill_dir, name))
+        self._clips: "OrderedDict[str, AudioClip]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        # Commits run in executor threads while reads happen on the loop
+        self._lock = threading.RLock()
+        self._stats = {"puts": 0, "hits": 0, "misses": 0, "spills": 0, "evictions": 0, "expirations": 0, "rejected": 0}
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def writer(self, conversation_id: str, filename: str, content_type: str) -> AudioWriter:
+        return AudioWriter(self, conversation_id, filename, content_type)
+
+    def put(self, conversation_id: str, filename: str, content_type: str, buffer: bytearray) -> None:
+        """Store a clip, replacing an older one of the same conversation."""
+        with self._lock:
+            self._remove(conversation_id)
+            if len(buffer) > self.max_clip_bytes:
+                self._stats["rejected"] += 1
+                return
+            clip = AudioClip(conversation_id, filename, content_type, buffer, time.monotonic() + self.ttl)
+            self._clips[conversation_id] = clip
+            self._memory_bytes += clip.size
+            self._stats["puts"] += 1
+            self._expire()
+            self._enforce_budgets()
+
+    def get(self, conversation_id: str) -> Optional[AudioClip]:
+        """Metadata of a stored clip; counts as a use for LRU."""
+        with self._lock:
+            clip = self._clips.get(conversation_id)
+            if clip is None:
+                self._stats["misses"] += 1
+                return None
+            if clip.expires_at < time.monotonic():
+                self._remove(conversation_id)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._clips.move_to_end(conversation_id)
+            self._stats["hits"] += 1
+            return clip
+
+    @contextmanager
+    def open(self, conversation_id: str) -> Iterator[Optional[memoryview]]:
+        """
+        Read-only view of a clip without copying it, None if unknown. The view is only
+        valid inside the with block; an evicted clip stays readable until it ends.
+        """
+        with self._lock:
+            clip = self.get(conversation_id)
+            buffer, path = (clip.buffer, clip.path) if clip is not None else (None, None)
+            if path is not None:
+                # Map while holding the lock so eviction can't unlink the file first
+                with open(path, "rb") as segment:
+                    mapped = mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) if clip.size else None
+        if clip is None:
+            yield None
+            return
+
+        if path is None:
+            view = memoryview(buffer).toreadonly()
+            try:
+                yield view
+            finally:
+                view.release()
+            return
+
+        if mapped is None:
+            yield memoryview(b"")
+            return
+        view = memoryview(mapped)
+        try:
+            yield view
+        finally:
+            view.release()
+            mapped.close()
+
+    def discard(self, conversation_id: str) -> None:
+        with self._lock:
+            self._remove(conversation_id)
+
+    def _remove(self, conversation_id: str) -> Optional[AudioClip]:
+        clip = self._clips.pop(conversation_id, None)
+        if clip is None:
+            return None
+        if clip.on_disk:
+            self._disk_bytes -= clip.size
+            try:
+                os.unlink(clip.path)
+            except OSError as e:
+                print(f"Could not remove audio segment {clip.path}: {e}")
+        else:
+            self._memory_bytes -= clip.size
+        return clip
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for conversation_id in [cid for cid, clip in self._clips.items() if clip.expires_at < now]:
+            self._remove(conversation_id)
+            self._stats["expirations"] += 1
+
+    def _spill(self, clip: AudioClip) -> bool:
+        path = os.path.join(self.spill_dir, f"{uuid.uuid4().hex}.seg")
+        try:
+            with open(path, "wb") as segment:
+                segment.write(clip.buffer)
+        except OSError as e:
+            print(f"Could not spill audio to {path}: {e}")
+            return False
+        self._memory_bytes -= clip.size
+        self._disk_bytes += clip.size
+        clip.buffer = None
+        clip.path = path
+        self._stats["spills"] += 1
+        return True
+
+    def _enforce_budgets(self) -> None:
+        # Least recently used first: spill to disk if possible, otherwise evict
+        for conversation_id in list(self._clips):
+            if self._memory_bytes <= self.memory_budget:
+                break
+            clip = self._clips[conversation_id]
+            if clip.on_disk:
+                continue
+            if self.spill_dir and clip.size <= self.disk_budget and self._spill(clip):
+                continue
+            self._remove(conversation_id)
+            self._stats["evictions"] += 1
+
+        for conversation_id in list(self._clips):
+            if self._disk_bytes <= self.disk_budget:
+                break
+            if self._clips[conversation_id].on_disk:
+                self._remove(conversation_id)
+                self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            for conversation_id in list(self._clips):
+                self._remove(conversation_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            on_disk = sum(1 for clip in self._clips.values() if clip.on_disk)
+            return {
+                **self._stats,
+                "clips_in_memory": len(self._clips) - on_disk,
+                "clips_on_disk": on_disk,
+                "memory_bytes": self._memory_bytes,
+                "memory_budget": self.memory_budget,
+                "disk_bytes": self._disk_bytes,
+                "disk_budget": self.disk_budget,
+            }
@@ -0,0 +1,100 @@
+# audio_stream.py
+import asyncio
+import uuid
+from typing import AsyncIterator, Callable, Dict, Optional
+
+AUDIO_CHUNK_SIZE = 64 * 1024
+# Chunks buffered between reading the upload and sending it on; bounds memory per upload
+AUDIO_QUEUE_CHUNKS = 8
+
+_END = object()
+
+
+class SourceReader:
+    """
+    Reads a source to its end in a separate task and hands every chunk to record().
+    The chunks are also offered to one consumer through a bounded queue; while the
+    consumer is slower, reading waits, which pushes back on the uploading client.
+    A consumer that stops early (e.g. a failed forward) does not stop the reading,
+    so record() always sees the whole source.
+    """
+
+    def __init__(self, source: AsyncIterator[bytes], record: Callable[[bytes], None], max_queued: int = AUDIO_QUEUE_CHUNKS):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self._consuming = True
+        self.size = 0
+        self._task = asyncio.ensure_future(self._read(source, record))
+
+    async def _read(self, source: AsyncIterator[bytes], record: Callable[[bytes], None]) -> None:
+        try:
+            async for chunk in source:
+                if not chunk:
+                    continue
+                self.size += len(chunk)
+                record(chunk)
+                if self._consuming:
+                    await self._queue.put(chunk)
+        except Exception as e:  # Hand the error to the consumer too
+            if self._consuming:
+                await self._queue.put(e)
+            raise
+        if self._consuming:
+            await self._queue.put(_END)
+
+    def _stop_consuming(self) -> None:
+        self._consuming = False
+        # Frees a reader waiting for room in the queue
+        while not self._queue.empty():
+            self._queue.get_nowait()
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """The chunks for the consumer; leaving the loop early lets the reader go on alone."""
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self._stop_consuming()
+
+    async def finish(self) -> None:
+        """Wait until the whole source was read; raises what reading it raised."""
+        self._stop_consuming()
+        await self._task
+
+    def cancel(self) -> None:
+        self._task.cancel()
+
+
+def _quote(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\r", "").replace("\n", "")
+
+
+async def multipart_stream(
+    fields: Dict[str, str],
+    file_field: str,
+    filename: str,
+    content_type: Optional[str],
+    chunks: AsyncIterator[bytes],
+    boundary: str,
+) -> AsyncIterator[bytes]:
+    """Encode form fields and one file as multipart/form-data without holding the file."""
+    for name, value in fields.items():
+        yield (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{_quote(name)}"\r\n\r\n{value}\r\n'
+        ).encode()
+    yield (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{_quote(file_field)}"; '
+        f'filename="{_quote(filename)}"\r\n'
+        f'Content-Type: {content_type or "application/octet-stream"}\r\n\r\n'
+    ).encode()
+    async for chunk in chunks:
+        yield chunk
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+
+def new_boundary() -> str:
+    return uuid.uuid4().hex
@@ -0,0 +1,122 @@
+# codec.py
+import json
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional, JSON always works
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from fastapi.responses import JSONResponse, Response
+except ImportError:  # only the servers build HTTP responses, the integration just encodes bodies
+    JSONResponse = Response = None
+
+CONTENT_TYPE_JSON = "application/json"
+CONTENT_TYPE_MSGPACK = "application/msgpack"
+
+# Response header listing the body types a server accepts for POST requests
+ACCEPT_POST_HEADER = "Accept-Post"
+
+
+class Codec(NamedTuple):
+    content_type: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+
+
+class UnsupportedContentType(ValueError):
+    """The body's content type has no codec on this side."""
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+JSON_CODEC = Codec(
+    CONTENT_TYPE_JSON,
+    orjson.dumps if orjson is not None else _json_dumps,
+    orjson.loads if orjson is not None else json.loads,
+)
+
+MSGPACK_CODEC = Codec(
+    CONTENT_TYPE_MSGPACK,
+    lambda obj: msgpack.packb(obj, use_bin_type=True),
+    lambda data: msgpack.unpackb(data, raw=False),
+) if msgpack is not None else None
+
+# Most preferred first
+CODECS: List[Codec] = [codec for codec in (MSGPACK_CODEC, JSON_CODEC) if codec is not None]
+_BY_CONTENT_TYPE = {codec.content_type: codec for codec in CODECS}
+
+
+def _media_type(value: Optional[str]) -> str:
+    return (value or "").split(";")[0].strip().lower()
+
+
+def accept_header() -> str:
+    """Accept header value listing our codecs by preference."""
+    return ", ".join(
+        codec.content_type if index == 0 else f"{codec.content_type};q={1 - index / 10:.1f}"
+        for index, codec in enumerate(CODECS)
+    )
+
+
+def accepted_types() -> str:
+    """Value for the Accept-Post header."""
+    return ", ".join(codec.content_type for codec in CODECS)
+
+
+def codec_for_content_type(content_type: Optional[str]) -> Codec:
+    """Codec for a body; a missing content type is taken as JSON."""
+    media_type = _media_type(content_type) or CONTENT_TYPE_JSON
+    codec = _BY_CONTENT_TYPE.get(media_type)
+    if codec is None:
+        raise UnsupportedContentType(f"Unsupported content type: {media_type}")
+    return codec
+
+
+def negotiate(accept: Optional[str]) -> Codec:
+    """
+    Most preferred of our codecs listed in an Accept (or Accept-Post) header,
+    JSON unless the other side names something we have.
+    """
+    accepted = {_media_type(part) for part in (accept or "").split(",")}
+    for codec in CODECS:
+        if codec.content_type in accepted:
+            return codec
+    return JSON_CODEC
+
+
+
+async def decode_request(raw, parse: Callable[[Any], Any] = lambda payload: payload) -> Tuple[Any, Optional["Response"]]:
+    """
+    Decode a request body with the codec named by its Content-Type and parse the payload.
+    Returns (parsed, None) or (None, error response): 415 for an unknown body type,
+    422 when decoding or parse fails.
+    """
+    try:
+        codec = codec_for_content_type(raw.headers.get("content-type"))
+    except UnsupportedContentType as e:
+        return None, JSONResponse(
+            status_code=415, content={"detail": str(e)}, headers={ACCEPT_POST_HEADER: accepted_types()}
+        )
+    try:
+        return parse(codec.loads(await raw.body())), None
+    except (ValueError, TypeError, KeyError) as e:
+        return None, JSONResponse(status_code=422, content={"detail": str(e)})
+
+
+def encode_response(obj: Any, accept: Optional[str], headers: Optional[Dict[str, str]] = None) -> "Response":
+    """Encode a model with the best codec the caller accepts and advertise the body types we take."""
+    codec = negotiate(accept)
+    return Response(
+        content=codec.dumps(obj.dict()),
+        media_type=codec.content_type,
+        headers={ACCEPT_POST_HEADER: accepted_types(), **(headers or {})}
+    )
@@ -0,0 +1,63 @@
+# config_validation.py
+import json
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+# Values the fast path accepts; exact types only, since 1 == 1.0 == True
+_SCALAR_TYPES = (str, int, float, bool, type(None))
+
+# Stored for configs the validator returned unchanged
+_UNCHANGED = object()
+
+
+def config_fingerprint(config: Dict[str, Any]) -> Hashable:
+    """
+    Cheap hashable fingerprint that tells 1, 1.0 and True apart: typed items for
+    flat configs of scalars, canonical JSON otherwise.
+    """
+    try:
+        if all(type(value) in _SCALAR_TYPES for value in config.values()):
+            return tuple(sorted((key, type(value).__name__, value) for key, value in config.items()))
+    except TypeError:
+        pass
+    return json.dumps(config, sort_keys=True, default=str)
+
+
+class ValidationCache:
+    """Bounded LRU of configs that already passed their executor's schema."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        # (executor name, fingerprint) -> validated config, _UNCHANGED if it equals the input
+        self._entries: "OrderedDict[Tuple[str, Hashable], Any]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def validate(self, name: str, validator: Callable[[Dict[str, Any]], Dict[str, Any]], config: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Return the validated config, running validator only for unseen configs. A hit
+        returns the caller's config, or a copy of what the validator made of it (defaults).
+        """
+        fingerprint = config_fingerprint(config)
+        key = (name, fingerprint)
+        validated = self._entries.get(key)
+        if validated is not None:
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return config if validated is _UNCHANGED else dict(validated)
+
+        self._stats["misses"] += 1
+        # Invalid configs raise and are never cached
+        validated = validator(config)
+        unchanged = isinstance(validated, dict) and config_fingerprint(validated) == fingerprint
+        self._entries[key] = _UNCHANGED if unchanged else dict(validated)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+        return validated
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "size": len(self._entries)}
@@ -0,0 +1,45 @@
+# deadline.py
+import time
+from typing import Optional
+
+# Remaining time budget of a request in milliseconds, passed on every hop
+REQUEST_BUDGET_HEADER = "X-Request-Budget-Ms"
+
+
+class Deadline:
+    """Absolute per-request deadline that downstream calls derive their timeouts from."""
+
+    def __init__(self, budget: float):
+        self.expires_at = time.monotonic() + budget
+
+    @classmethod
+    def from_header(cls, value: Optional[str], default: float, margin: float = 0.0) -> "Deadline":
+        """
+        Build a deadline from the caller's budget header.
+        margin is kept back so the answer still reaches the caller in time.
+        """
+        try:
+            budget = int(value) / 1000 if value else default
+        except ValueError:
+            budget = default
+        return cls(max(0.0, min(budget, default) - margin))
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def reserve(self, seconds: float) -> "Deadline":
+        """
+        A deadline ending seconds earlier, leaving that time for a fallback.
+        At most half the remaining time is reserved.
+        """
+        child = Deadline(0.0)
+        child.expires_at = self.expires_at - min(seconds, self.remaining() / 2)
+        return child
+
+    def header(self) -> dict:
+        """Header dict propagating the remaining budget downstream."""
+        return {REQUEST_BUDGET_HEADER: str(int(self.remaining() * 1000))}
@@ -0,0 +1,114 @@
+# entity_index.py
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+_TOKEN_RE = re.compile(r"[^\w]+", re.UNICODE)
+
+# Words that only select a domain, not an entity
+DOMAIN_WORDS = {
+    "light": "light", "lights": "light", "lamp": "light", "lamps": "light",
+    "licht": "light", "lichter": "light", "lampe": "light", "lampen": "light",
+    "switch": "switch", "switches": "switch", "schalter": "switch",
+    "fan": "fan", "fans": "fan", "ventilator": "fan",
+    "cover": "cover", "blinds": "cover", "rollladen": "cover",
+}
+
+STOP_WORDS = {"the", "all", "my", "in", "der", "die", "das", "den", "alle", "im"}
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """Lowercase, split on non-word characters and drop a plural 's'."""
+    tokens = []
+    for token in _TOKEN_RE.split(text.lower().replace("_", " ")):
+        if not token:
+            continue
+        if len(token) > 3 and token.endswith("s") and token not in DOMAIN_WORDS:
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def _entry_fields(value: Any):
+    """Accept plain state strings as well as {"state", "name", "area"} entries."""
+    if isinstance(value, dict):
+        return value.get("name") or "", value.get("area") or ""
+    return "", ""
+
+
+class EntityIndex:
+    """Inverted index over entity states by domain, area and name tokens."""
+
+    def __init__(self, states: Optional[Dict[str, Any]] = None):
+        self._entities: Dict[str, tuple] = {}
+        self._by_domain: Dict[str, Set[str]] = defaultdict(set)
+        self._by_area: Dict[str, Set[str]] = defaultdict(set)
+        self._by_token: Dict[str, Set[str]] = defaultdict(set)
+        if states:
+            self.update(states, ())
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    def _add(self, entity_id: str, value: Any) -> None:
+        domain, object_id = entity_id.split(".", 1)
+        name, area = _entry_fields(value)
+        tokens = set(normalize_tokens(object_id)) | set(normalize_tokens(name))
+        area_tokens = set(normalize_tokens(area))
+
+        self._entities[entity_id] = (domain, tokens, area_tokens)
+        self._by_domain[domain].add(entity_id)
+        for token in tokens:
+            self._by_token[token].add(entity_id)
+        for token in area_tokens:
+            self._by_area[token].add(entity_id)
+
+    def _remove(self, entity_id: str) -> None:
+        entry = self._entities.pop(entity_id, None)
+        if entry is None:
+            return
+        domain, tokens, area_tokens = entry
+        self._by_domain[domain].discard(entity_id)
+        for token in tokens:
+            self._by_token[token].discard(entity_id)
+        for token in area_tokens:
+            self._by_area[token].discard(entity_id)
+
+    def update(self, changed: Dict[str, Any], removed: Iterable[str]) -> None:
+        """Apply changed and removed entities."""
+        for entity_id, value in changed.items():
+            self._remove(entity_id)
+            self._add(entity_id, value)
+        for entity_id in removed:
+            self._remove(entity_id)
+
+    def entities_in_domain(self, domain: str) -> Set[str]:
+        return set(self._by_domain.get(domain, ()))
+
+    def resolve(self, text: str, domain: Optional[str] = None) -> List[str]:
+        """
+        Resolve a spoken target such as "helix" or "kitchen lights" to entity ids.
+
+        Every remaining token has to match a name or area token; if no entity
+        matches all of them, the entities matching the most tokens win.
+        """
+        tokens = []
+        for token in normalize_tokens(text):
+            if token in DOMAIN_WORDS:
+                domain = domain or DOMAIN_WORDS[token]
+            elif token not in STOP_WORDS:
+                tokens.append(token)
+
+        scope = self._by_domain.get(domain, set()) if domain else None
+        if not tokens:
+            return sorted(scope) if scope else []
+
+        hits: Counter = Counter()
+        for token in tokens:
+            for entity_id in self._by_token.get(token, set()) | self._by_area.get(token, set()):
+                if scope is None or entity_id in scope:
+                    hits[entity_id] += 1
+        if not hits:
+            return []
+        best = max(hits.values())
+        return sorted(entity_id for entity_id, count in hits.items() if count == best)
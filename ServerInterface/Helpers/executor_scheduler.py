@@ -0,0 +1,122 @@
+# executor_scheduler.py
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+
+STATUS_OK = "ok"
+STATUS_TIMEOUT = "timeout"
+STATUS_ERROR = "error"
+STATUS_CANCELLED = "cancelled"
+
+
+class ScheduledExecutor(NamedTuple):
+    depends_on: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    priority: int = 0
+    required: bool = True
+
+
+class ExecutorTiming(NamedTuple):
+    status: str
+    # Seconds since the start of the run
+    started: float
+    duration: float
+
+
+class ExecutorFailed(Exception):
+    """A required executor failed or timed out."""
+
+    def __init__(self, name: str, status: str, cause: Optional[BaseException] = None):
+        super().__init__(f"Required executor {name} {status}" + (f": {cause}" if cause else ""))
+        self.name = name
+        self.status = status
+        self.cause = cause
+
+
+class ExecutorScheduler:
+    """
+    Runs executors as soon as their dependencies have finished, each under its own timeout.
+    Results are yielded in completion order; once every required executor is done the
+    remaining tasks are cancelled.
+    """
+
+    def __init__(self, nodes: Dict[str, ScheduledExecutor]):
+        self.nodes = nodes
+        # Dependencies on executors that are not part of this run are ignored
+        self._depends_on = {
+            name: tuple(dep for dep in node.depends_on if dep in nodes)
+            for name, node in nodes.items()
+        }
+        self._check_cycles()
+        self.timings: Dict[str, ExecutorTiming] = {}
+
+    def _check_cycles(self) -> None:
+        remaining = dict(self._depends_on)
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not any(dep in remaining for dep in deps)]
+            if not ready:
+                raise ValueError(f"Executor dependency cycle between {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+
+    async def run(
+        self, start: Callable[[str, Dict[str, Any]], Awaitable[Any]]
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        start(name, results) runs one executor; results holds the outputs of the
+        dependencies that succeeded.
+        """
+        run_started = time.monotonic()
+        results: Dict[str, Any] = {}
+        finished = set()
+        required_left = {name for name, node in self.nodes.items() if node.required}
+        # Without required executors the run waits for all of them
+        wait_for_all = not required_left
+        running: Dict[asyncio.Future, Tuple[str, float]] = {}
+
+        def launch_ready():
+            started_names = {name for name, _ in running.values()}
+            for name in self.nodes:
+                if name in finished or name in started_names:
+                    continue
+                if all(dep in finished for dep in self._depends_on[name]):
+                    dep_results = {dep: results[dep] for dep in self._depends_on[name] if dep in results}
+                    task = asyncio.ensure_future(
+                        asyncio.wait_for(start(name, dep_results), timeout=self.nodes[name].timeout)
+                    )
+                    running[task] = (name, time.monotonic())
+
+        try:
+            launch_ready()
+            while running and (required_left or wait_for_all):
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name, started = running.pop(task)
+                    now = time.monotonic()
+                    error = None
+                    if task.cancelled():
+                        status = STATUS_CANCELLED
+                    elif isinstance(task.exception(), asyncio.TimeoutError):
+                        status = STATUS_TIMEOUT
+                    elif task.exception() is not None:
+                        status, error = STATUS_ERROR, task.exception()
+                    else:
+                        status = STATUS_OK
+                    self.timings[name] = ExecutorTiming(status, started - run_started, now - started)
+                    finished.add(name)
+                    required_left.discard(name)
+
+                    if status != STATUS_OK:
+                        if self.nodes[name].required:
+                            raise ExecutorFailed(name, status, error)
+                        print(f"Optional executor {name} {status}" + (f": {error}" if error else ""))
+                        continue
+                    results[name] = task.result()
+                    yield name, results[name]
+                launch_ready()
+        finally:
+            # Short-circuit: nothing still running is needed any more
+            now = time.monotonic()
+            for task, (name, started) in running.items():
+                task.cancel()
+                self.timings[name] = ExecutorTiming(STATUS_CANCELLED, started - run_started, now - started)
@@ -0,0 +1,226 @@
+# intent_matcher.py
+import asyncio
+import json
+import os
+import re
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+DEFAULT_PHRASES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_phrases.json")
+
+_SLOT_RE = re.compile(r"\{(\w+)\}")
+_WORD_RE = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop punctuation and pad with spaces so literals match whole words."""
+    return " " + " ".join(word for word in _WORD_RE.split(text.lower()) if word) + " "
+
+
+class IntentMatch(NamedTuple):
+    intent: str
+    slots: Dict[str, str]
+    pattern: str
+    score: int
+
+
+class _Pattern(NamedTuple):
+    intent: str
+    source: str
+    # Alternating parts: literal ids (int) and slot names (str)
+    parts: Tuple
+    literal_chars: int
+
+
+class _Automaton:
+    """Aho-Corasick automaton reporting the start positions of every literal."""
+
+    def __init__(self, literals: List[str]):
+        self._literals = literals
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for literal_id, literal in enumerate(literals):
+            state = 0
+            for char in literal:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(literal_id)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> Dict[int, List[int]]:
+        """Return {literal_id: [start positions]} in a single pass over text."""
+        hits: Dict[int, List[int]] = {}
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for literal_id in self._out[state]:
+                hits.setdefault(literal_id, []).append(position - len(self._literals[literal_id]) + 1)
+        return hits
+
+
+class IntentMatcher:
+    """Compiled matcher over all phrases of a registry {intent: [phrase, ...]}."""
+
+    def __init__(self, phrases: Dict[str, List[str]]):
+        literal_ids: Dict[str, int] = {}
+        self._patterns: List[_Pattern] = []
+        # literal id -> patterns whose first literal it is
+        self._by_first_literal: Dict[int, List[int]] = {}
+
+        for intent, intent_phrases in phrases.items():
+            for phrase in intent_phrases:
+                parts = []
+                literal_chars = 0
+                for index, chunk in enumerate(_SLOT_RE.split(phrase)):
+                    if index % 2:
+                        parts.append(chunk)
+                        continue
+                    literal = normalize_text(chunk)
+                    if literal.strip():
+                        literal_chars += len(literal)
+                        parts.append(literal_ids.setdefault(literal, len(literal_ids)))
+                first_literal = next((part for part in parts if isinstance(part, int)), None)
+                if first_literal is None:
+                    continue  # Phrases need at least one literal to anchor on
+                self._by_first_literal.setdefault(first_literal, []).append(len(self._patterns))
+                self._patterns.append(_Pattern(intent, phrase, tuple(parts), literal_chars))
+
+        self._literal_lengths = {literal_id: len(literal) for literal, literal_id in literal_ids.items()}
+        self._automaton = _Automaton(sorted(literal_ids, key=literal_ids.get))
+
+    def match_all(self, text: str) -> List[IntentMatch]:
+        """Return every pattern that matches text, best match first."""
+        normalized = normalize_text(text)
+        hits = self._automaton.find(normalized)
+        matches = []
+        for literal_id in hits:
+            for pattern_index in self._by_first_literal.get(literal_id, ()):
+                pattern = self._patterns[pattern_index]
+                slots = self._extract(pattern, normalized, hits)
+                if slots is not None:
+                    matches.append(IntentMatch(pattern.intent, slots, pattern.source, pattern.literal_chars))
+        matches.sort(key=lambda match: (-match.score, len(match.slots)))
+        return matches
+
+    def match(self, text: str) -> Optional[IntentMatch]:
+        """Return the best matching intent or None."""
+        matches = self.match_all(text)
+        return matches[0] if matches else None
+
+    def _extract(self, pattern: _Pattern, text: str, hits: Dict[int, List[int]]) -> Optional[Dict[str, str]]:
+        """Place the pattern's literals left to right and read the slots in between."""
+        slots: Dict[str, str] = {}
+        pending_slot = None
+        cursor = 0  # end of the previous literal, trailing space included
+        for part in pattern.parts:
+            if isinstance(part, str):
+                pending_slot = part
+                continue
+            positions = hits.get(part)
+            if not positions:
+                return None
+            start_index = bisect_left(positions, cursor)
+            if start_index == len(positions):
+                return None
+            start = positions[start_index]
+            if pending_slot is not None:
+                value = text[cursor:start].strip()
+                if not value:
+                    return None
+                slots[pending_slot] = value
+                pending_slot = None
+            cursor = start + self._literal_lengths[part]
+        if pending_slot is not None:
+            value = text[cursor:].strip()
+            if not value:
+                return None
+            slots[pending_slot] = value
+        return slots
+
+
+class PhraseRegistry:
+    """
+    Phrase file backed matcher that rebuilds itself when the file changes. start()
+    polls the file in the background, off the event loop; match() never touches it.
+    """
+
+    def __init__(self, path: str = DEFAULT_PHRASES_PATH, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._mtime = None
+        self._checked_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self.matcher = IntentMatcher({})
+        self.reload()
+
+    def reload(self) -> bool:
+        """Rebuild the matcher from disk; keep the old one if the file is broken."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+            with open(self.path, encoding="utf-8") as phrase_file:
+                phrases = json.load(phrase_file)
+            matcher = IntentMatcher(phrases)
+        except (OSError, ValueError) as e:
+            print(f"Could not load intent phrases from {self.path}: {e}")
+            return False
+        self.matcher = matcher
+        self._mtime = mtime
+        return True
+
+    def maybe_reload(self) -> None:
+        """Reload if the phrase file changed, checking at most every check_interval seconds."""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.reload()
+
+    async def _watch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.check_interval)
+            # stat and recompiling block, keep them off the loop
+            await loop.run_in_executor(None, self.maybe_reload)
+
+    def start(self) -> None:
+        """Poll the phrase file every check_interval seconds."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._watch())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def match(self, text: str) -> Optional[IntentMatch]:
+        return self.matcher.match(text)
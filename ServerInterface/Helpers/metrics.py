@@ -0,0 +1,214 @@
+# metrics.py
+import bisect
+import contextvars
+import math
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Prometheus text exposition format
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Standard response header with the server's stage times of this request
+SERVER_TIMING_HEADER = "Server-Timing"
+# The integration's stage times of its previous request, in Server-Timing syntax
+CLIENT_TIMING_HEADER = "X-Client-Timing"
+
+# What the server accepts in CLIENT_TIMING_HEADER; anything else is dropped to bound label values
+CLIENT_STAGES = ("snapshot", "serialize", "network", "commands", "total")
+CLIENT_FALLBACK_REASONS = ("no_response", "server_error", "exception")
+# A timing entry without duration named fallback_<reason> counts one fallback
+FALLBACK_PREFIX = "fallback_"
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def collect(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic count per label combination. Not thread-safe, use from the event loop."""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def collect(self) -> List[str]:
+        lines = super().collect()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Bucketed observations (seconds) per label combination. Not thread-safe, use from the event loop."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per series: count of each bucket (not cumulative) plus the +Inf overflow, and the sum
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def collect(self) -> List[str]:
+        lines = super().collect()
+        names = self.labelnames + ("le",)
+        for key, counts in sorted(self._counts.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(self._sums[key])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """The metrics of one service, rendered for a /metrics endpoint."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+def format_timing(stages: Dict[str, Optional[float]]) -> str:
+    """{stage: seconds} -> "stage;dur=<ms>, ..."; a None duration emits the bare name."""
+    return ", ".join(
+        name if seconds is None else f"{name};dur={seconds * 1000:.1f}"
+        for name, seconds in stages.items()
+    )
+
+
+def parse_timing(value: Optional[str]) -> Dict[str, Optional[float]]:
+    """Inverse of format_timing: seconds per name, None for entries without dur. Malformed parts are skipped."""
+    stages = {}
+    for metric in (value or "").split(","):
+        parts = [part.strip() for part in metric.split(";")]
+        if not parts[0]:
+            continue
+        seconds = None
+        for param in parts[1:]:
+            if param.startswith("dur="):
+                try:
+                    seconds = float(param[4:]) / 1000
+                except ValueError:
+                    pass
+        stages[parts[0]] = seconds
+    return stages
+
+
+class RequestTimings:
+    """Stage times of one request, for its Server-Timing header."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def finish(self, histogram: Histogram) -> str:
+        """Record the total under stage "total" and return the Server-Timing value."""
+        total = self.elapsed()
+        histogram.observe(total, stage="total")
+        return format_timing({**self.stages, "total": total})
+
+
+# Timings of the request the current task works on; tasks started from it share the object
+_current_timings: contextvars.ContextVar = contextvars.ContextVar("request_timings", default=None)
+
+
+def begin_request() -> RequestTimings:
+    timings = RequestTimings()
+    _current_timings.set(timings)
+    return timings
+
+
+def record_stage(histogram: Histogram, stage: str, seconds: float) -> None:
+    """Observe into histogram (label "stage") and add to the current request's timings, if any."""
+    histogram.observe(seconds, stage=stage)
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def span(histogram: Histogram, stage: str):
+    """Time the block as a stage, also when it raises or is cancelled."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(histogram, stage, time.perf_counter() - started)
@@ -0,0 +1,266 @@
+# plugin_loader.py
+import asyncio
+import hashlib
+import marshal
+import os
+import sys
+import types
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple, Type
+
+# Package name the plugin modules are registered under in sys.modules
+PLUGIN_PACKAGE = "executor_plugins"
+# Bytecode cache inside the plugin directory
+CACHE_DIR_NAME = "__pycache__"
+
+
+class PluginLoadError(Exception):
+    """A plugin module could not be compiled, executed or does not define valid executors."""
+
+
+class PluginModule(NamedTuple):
+    # (mtime_ns, size) of the source the module was loaded from
+    stamp: Tuple[int, int]
+    module_name: str
+    # Executor names the module registered
+    names: Tuple[str, ...]
+
+
+class PluginLoader:
+    """
+    Loads executor modules from a directory and hot-swaps them into an ExecutorRegistry.
+
+    A plugin module defines EXECUTORS = {"name": ExecutorClass}; the names in the loader's
+    namespace (e.g. BaseExecutor, ProcessResponse) are available as globals without
+    importing the server. Changed files are found by polling their mtime, compiled
+    through a content-addressed bytecode cache and swapped in together. A module that
+    fails to load keeps its previous version registered. Removing a file unregisters
+    its executors, restoring a built-in executor of the same name.
+    """
+
+    def __init__(
+        self,
+        registry,
+        directory: str,
+        base_class: Type,
+        namespace: Optional[Dict[str, Any]] = None,
+        poll_interval: float = 1.0,
+        drain_timeout: float = 30.0,
+    ):
+        self.registry = registry
+        self.directory = directory
+        self.base_class = base_class
+        self.namespace = namespace or {}
+        self.poll_interval = poll_interval
+        self.drain_timeout = drain_timeout
+        self.cache_dir = os.path.join(directory, CACHE_DIR_NAME)
+        self._builtin = registry.classes()
+        self._loaded: Dict[str, PluginModule] = {}
+        # Files that failed at this stamp are not retried until they change
+        self._failed: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._draining: Set[asyncio.Task] = set()
+        self._stats = {"reloads": 0, "loaded": 0, "failed": 0, "unloaded": 0, "drain_timeouts": 0}
+
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        """Plugin sources by path with their (mtime_ns, size); dot and underscore files are skipped."""
+        sources = {}
+        try:
+            entries = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return sources
+        for entry in entries:
+            if not entry.name.endswith(".py") or entry.name.startswith((".", "_")) or not entry.is_file():
+                continue
+            stat = entry.stat()
+            sources[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return sources
+
+    def compile(self, path: str) -> Tuple[types.CodeType, str]:
+        """Code object of a source file, from the bytecode cache when the content is unchanged."""
+        with open(path, "rb") as source_file:
+            source = source_file.read()
+        digest = hashlib.sha256(source).hexdigest()[:16]
+        stem = os.path.splitext(os.path.basename(path))[0]
+        cached = os.path.join(self.cache_dir, f"{stem}.{digest}.{sys.implementation.cache_tag}.bin")
+        try:
+            with open(cached, "rb") as cache_file:
+                return marshal.load(cache_file), digest
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+        try:
+            code = compile(source, path, "exec", dont_inherit=True)
+        except SyntaxError as e:
+            raise PluginLoadError(f"{os.path.basename(path)}: {e}") from e
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temporary = f"{cached}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as cache_file:
+                marshal.dump(code, cache_file)
+            os.replace(temporary, cached)
+            # Older versions of this plugin are not needed any more
+            for name in os.listdir(self.cache_dir):
+                if name.startswith(f"{stem}.") and name.endswith(".bin") and os.path.join(self.cache_dir, name) != cached:
+                    os.unlink(os.path.join(self.cache_dir, name))
+        except OSError as e:
+            print(f"Could not write bytecode cache for {path}: {e}")
+        return code, digest
+
+    def load(self, path: str) -> Tuple[str, Dict[str, Type]]:
+        """Execute a plugin in a fresh, versioned module; returns (module name, executors). Blocking."""
+        code, digest = self.compile(path)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        module_name = f"{PLUGIN_PACKAGE}.{stem}_{digest}"
+        module = types.ModuleType(module_name)
+        module.__file__ = path
+        module.__dict__.update(self.namespace)
+        # Registered while executing, for code that looks itself up (dataclasses, pydantic)
+        sys.modules[module_name] = module
+        try:
+            exec(code, module.__dict__)
+            executors = self._executors_of(module, path)
+        except Exception as e:
+            sys.modules.pop(module_name, None)
+            if isinstance(e, PluginLoadError):
+                raise
+            raise PluginLoadError(f"{os.path.basename(path)}: {type(e).__name__}: {e}") from e
+        return module_name, executors
+
+    def _executors_of(self, module: types.ModuleType, path: str) -> Dict[str, Type]:
+        executors = getattr(module, "EXECUTORS", None)
+        if not isinstance(executors, dict) or not executors:
+            raise PluginLoadError(f"{os.path.basename(path)} defines no EXECUTORS dict")
+        for name, executor_class in executors.items():
+            if not isinstance(executor_class, type) or not issubclass(executor_class, self.base_class):
+                raise PluginLoadError(f"{name}: not a {self.base_class.__name__} subclass")
+            # Worker processes could not import the class by reference
+            if getattr(executor_class, "cpu_bound", False):
+                raise PluginLoadError(f"{name}: cpu_bound executors can't be loaded as plugins")
+        return dict(executors)
+
+    async def reload(self) -> Dict[str, Any]:
+        """One pass: load changed plugins, unload removed ones, swap and drain. Returns a report."""
+        async with self._lock:
+            report, replaced, retired_modules = await self._reload()
+        return await self._drain(report, replaced, retired_modules)
+
+    async def _drain(self, report: Dict[str, Any], replaced: List[Any], retired_modules: List[str]) -> Dict[str, Any]:
+        """Wait for the replaced executors outside the lock, so the next reload can swap meanwhile."""
+        if not replaced and not retired_modules:
+            return report
+        # Old versions finish the requests that started with them
+        report["drained"] = await self.registry.drain(replaced, self.drain_timeout)
+        if not report["drained"]:
+            self._stats["drain_timeouts"] += 1
+            print(f"Replaced executors still in use after {self.drain_timeout}s")
+        # A later reload may have loaded the same content (same module name) again
+        current = {plugin.module_name for plugin in self._loaded.values()}
+        for module_name in retired_modules:
+            if module_name not in current:
+                sys.modules.pop(module_name, None)
+        return report
+
+    async def _reload(self) -> Tuple[Dict[str, Any], List[Any], List[str]]:
+        """Load and swap under the lock; returns (report, replaced executors, retired module names)."""
+        sources = self.scan()
+        changed = [
+            path for path, stamp in sources.items()
+            if (path not in self._loaded or self._loaded[path].stamp != stamp)
+            and self._failed.get(path, (None,))[0] != stamp
+        ]
+        removed = [path for path in self._loaded if path not in sources]
+        for path in [path for path in self._failed if path not in sources]:
+            del self._failed[path]
+        report = {"loaded": [], "unloaded": [], "failed": {}, "drained": True}
+        if not changed and not removed:
+            return report, [], []
+
+        loop = asyncio.get_running_loop()
+        changes: Dict[str, Optional[Type]] = {}
+        loaded: Dict[str, PluginModule] = {}
+        for path in changed:
+            try:
+                # Compiling and executing module code may block, keep it off the loop
+                module_name, executors = await loop.run_in_executor(None, self.load, path)
+            except PluginLoadError as e:
+                print(f"Plugin failed to load, keeping the previous version: {e}")
+                self._failed[path] = (sources[path], str(e))
+                report["failed"][path] = str(e)
+                self._stats["failed"] += 1
+                continue
+            previous = self._loaded.get(path)
+            for name in previous.names if previous else ():
+                if name not in executors:
+                    changes[name] = self._builtin.get(name)
+            changes.update(executors)
+            loaded[path] = PluginModule(sources[path], module_name, tuple(executors))
+        for path in removed:
+            for name in self._loaded[path].names:
+                changes.setdefault(name, self._builtin.get(name))
+
+        if not changes:
+            return report, [], []
+        try:
+            replaced = self.registry.swap(changes)
+        except Exception as e:
+            # e.g. a constructor or schema failed: nothing was swapped
+            print(f"Plugin swap failed, keeping the previous executors: {e}")
+            for path, plugin in loaded.items():
+                sys.modules.pop(plugin.module_name, None)
+                self._failed[path] = (plugin.stamp, str(e))
+                report["failed"][path] = str(e)
+            self._stats["failed"] += len(loaded)
+            return report, [], []
+
+        retired_modules = [self._loaded[path].module_name for path in list(loaded) + removed if path in self._loaded]
+        for path in removed:
+            del self._loaded[path]
+        for path, plugin in loaded.items():
+            self._loaded[path] = plugin
+            self._failed.pop(path, None)
+        self._stats["reloads"] += 1
+        self._stats["loaded"] += len(loaded)
+        self._stats["unloaded"] += len(removed)
+        report["loaded"] = sorted(name for plugin in loaded.values() for name in plugin.names)
+        report["unloaded"] = [os.path.basename(path) for path in removed]
+        print(f"Executor plugins swapped: loaded {report['loaded']}, unloaded {report['unloaded']}")
+        return report, replaced, retired_modules
+
+    async def _watch(self) -> None:
+        while True:
+            try:
+                async with self._lock:
+                    report, replaced, retired_modules = await self._reload()
+                if replaced or retired_modules:
+                    # Polling goes on while the replaced executors drain
+                    draining = asyncio.ensure_future(self._drain(report, replaced, retired_modules))
+                    self._draining.add(draining)
+                    draining.add_done_callback(self._draining.discard)
+            except Exception as e:
+                print(f"Plugin reload failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self) -> None:
+        """Poll the directory in the background."""
+        os.makedirs(self.directory, exist_ok=True)
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._watch())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for draining in list(self._draining):
+            draining.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "plugins": {os.path.basename(path): list(plugin.names) for path, plugin in self._loaded.items()},
+            "failing": {os.path.basename(path): error for path, (_, error) in self._failed.items()},
+        }
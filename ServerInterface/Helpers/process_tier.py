@@ -0,0 +1,101 @@
+# process_tier.py
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+class ProcessTierBusy(Exception):
+    """All workers are busy and the queue is full."""
+
+
+class ProcessTierCrashed(Exception):
+    """A worker process died, failing every call that was running or queued in the pool."""
+
+
+# Per worker process: one instance per class, built on first use
+_instances: Dict[type, Any] = {}
+
+
+def _warm_up() -> int:
+    return os.getpid()
+
+
+def _call_instance(cls: type, method: str, args: tuple) -> Any:
+    instance = _instances.get(cls)
+    if instance is None:
+        instance = _instances[cls] = cls()
+    return getattr(instance, method)(*args)
+
+
+def transfer_context(context: Dict[str, Any], keys: Iterable[str]) -> Dict[str, Any]:
+    """Only the listed context keys cross the process boundary, everything else stays local."""
+    return {key: context[key] for key in keys if key in context}
+
+
+class ProcessTier:
+    """
+    Warm process pool for CPU-bound work. Calls beyond max_workers + max_queued are
+    rejected instead of piling up. A crashed worker breaks the whole pool: every call
+    running or queued in it fails with ProcessTierCrashed, and the pool is rebuilt for
+    the next call. Calls are not retried, the one that crashed can't be told apart.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queued: int = 8):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        # crashes: pools broken by a dying worker; failed_calls: calls failed by those crashes
+        self._stats = {"calls": 0, "rejected": 0, "crashes": 0, "failed_calls": 0, "restarts": 0}
+
+    async def start(self) -> None:
+        """Create the pool and start every worker so the first request does not pay for it."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_queued)
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self._pool, _warm_up) for _ in range(self.max_workers)
+        ))
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _restart(self, broken: ProcessPoolExecutor) -> None:
+        # Several calls may see the same broken pool, only the first rebuilds it
+        if self._pool is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._stats["crashes"] += 1
+            self._stats["restarts"] += 1
+            await self.start()
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Run a picklable func(*args) in a worker process."""
+        if self._pool is None:
+            await self.start()
+        if self._slots.locked():
+            self._stats["rejected"] += 1
+            raise ProcessTierBusy(f"Process tier full ({self.max_workers} workers, {self.max_queued} queued)")
+
+        async with self._slots:
+            self._stats["calls"] += 1
+            pool = self._pool
+            try:
+                # Cancelling the awaiting task does not stop a call a worker already picked up
+                return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+            except BrokenProcessPool as e:
+                self._stats["failed_calls"] += 1
+                print(f"Worker process crashed, restarting process pool: {e}")
+                await self._restart(pool)
+                raise ProcessTierCrashed(str(e)) from e
+
+    async def run_method(self, cls: type, method: str, *args) -> Any:
+        """Call method on a worker-local instance of cls, so only the class is pickled."""
+        return await self.run(_call_instance, cls, method, args)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "workers": self.max_workers, "max_queued": self.max_queued}
@@ -0,0 +1,87 @@
+# response_cache.py
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+def state_fingerprint(states: Dict[str, Any], entity_ids: Iterable[str]) -> str:
+    """Hash only the states of the given entities."""
+    digest = hashlib.sha1()
+    for entity_id in sorted(entity_ids):
+        digest.update(f"{entity_id}={states.get(entity_id)!r};".encode())
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """LRU + TTL cache of responses keyed by utterance and relevant entity states."""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (expires_at, response, entity_ids)
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any, List[str]]]" = OrderedDict()
+        self._by_entity: Dict[str, Set[Tuple]] = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    @staticmethod
+    def make_key(text: str, language: str, states: Dict[str, Any], entity_ids: Iterable[str]) -> Tuple:
+        # The exact utterance: responses may quote it, so "Licht an" must not get the answer to "licht an"
+        return (text, language, state_fingerprint(states, entity_ids))
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+        if entry[0] < time.monotonic():
+            self._remove(key)
+            self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        return entry[1]
+
+    def put(self, key: Tuple, response: Any, entity_ids: Iterable[str]) -> None:
+        if key in self._entries:
+            self._remove(key)
+        entity_ids = list(entity_ids)
+        self._entries[key] = (time.monotonic() + self.ttl, response, entity_ids)
+        for entity_id in entity_ids:
+            self._by_entity.setdefault(entity_id, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self._stats["evictions"] += 1
+
+    def invalidate_entities(self, entity_ids: Iterable[str]) -> int:
+        """Drop every entry that depends on one of the given entities."""
+        removed = 0
+        for entity_id in entity_ids:
+            for key in self._by_entity.pop(entity_id, ()):
+                if key in self._entries:
+                    self._remove(key)
+                    removed += 1
+        self._stats["invalidations"] += removed
+        return removed
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_entity.clear()
+
+    def _remove(self, key: Tuple) -> None:
+        _, _, entity_ids = self._entries.pop(key)
+        for entity_id in entity_ids:
+            keys = self._by_entity.get(entity_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_entity[entity_id]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "size": len(self._entries),
+            "hit_ratio": self._stats["hits"] / lookups if lookups else 0.0,
+        }
@@ -2,6 +2,9 @@
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 
+# Bumped on incompatible payload changes; checked once where a request enters the system
+SCHEMA_VERSION = 1
+
 class UserInput(BaseModel):
     text: str
     language: str
@@ -13,10 +16,18 @@ class Command(BaseModel):
     service: str
     data: Dict[str, Any]
 
+class StateSync(BaseModel):
+    client_id: str
+    version: int
+    base_version: Optional[int] = None  # None: states is a full snapshot
+    removed: List[str] = []
+
 class ProcessRequest(BaseModel):
     user_input: UserInput
     states: Dict[str, Any]
     config: Dict[str, Any]
+    state_sync: Optional[StateSync] = None
+    schema_version: int = SCHEMA_VERSION
 
 class ErrorDetails(BaseModel):
     message: str
@@ -24,9 +35,23 @@ class ErrorDetails(BaseModel):
     file_name: str
     traceback: str
     service_name: Optional[str] = None
+    trace_id: Optional[str] = None
 
 class ProcessResponse(BaseModel):
     response: str
     commands: Optional[List[Command]]
     conversation_id: Optional[str]
     error: Optional[ErrorDetails] = None
+    state_version: Optional[int] = None
+    resync_required: bool = False
+
+
+class StreamEvent(BaseModel):
+    # "commands", "speech" or the final "done"
+    type: str
+    text: Optional[str] = None
+    commands: Optional[List[Command]] = None
+    conversation_id: Optional[str] = None
+    state_version: Optional[int] = None
+    resync_required: bool = False
+    error: Optional[ErrorDetails] = None
\ No newline at end of file
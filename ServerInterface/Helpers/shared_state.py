@@ -0,0 +1,595 @@
+# shared_state.py
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from .audio_store import AudioClip, AudioWriter
+from .codec import JSON_CODEC
+from .response_cache import ResponseCache
+from .state_mirror import StateMirror
+from .tracing import DEFAULT_BUFFER_SIZE, SpanRecord
+
+# "memory": process-local state, one worker only; "sqlite": one database file shared by all workers
+BACKEND_MEMORY = "memory"
+BACKEND_SQLITE = "sqlite"
+
+DEFAULT_SHARED_STATE_PATH = os.path.join(tempfile.gettempdir(), "conversation_server_state.sqlite")
+
+# Queued cache and span writes of a worker are committed together this often (seconds)
+DEFAULT_FLUSH_INTERVAL = 0.25
+
+# Bumped on incompatible schema changes; the file only holds caches, so it is rebuilt
+SCHEMA_VERSION = 2
+TABLES = ("state_mirrors", "state_mirror_entities", "response_cache", "response_cache_deps", "audio_clips", "spans")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS state_mirrors (
+    client_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    -- Bumped by every full snapshot of the client
+    generation INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS state_mirror_entities (
+    client_id TEXT NOT NULL,
+    entity_id TEXT NOT NULL,
+    -- Mirror version that last changed the entity, a NULL state marks a removal
+    version INTEGER NOT NULL,
+    state BLOB,
+    PRIMARY KEY (client_id, entity_id)
+);
+CREATE INDEX IF NOT EXISTS state_mirror_entities_version ON state_mirror_entities (client_id, version);
+CREATE TABLE IF NOT EXISTS response_cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS response_cache_deps (
+    entity_id TEXT NOT NULL,
+    key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS response_cache_deps_entity ON response_cache_deps (entity_id);
+CREATE INDEX IF NOT EXISTS response_cache_deps_key ON response_cache_deps (key);
+CREATE TABLE IF NOT EXISTS audio_clips (
+    conversation_id TEXT PRIMARY KEY,
+    filename TEXT,
+    content_type TEXT,
+    timestamp REAL NOT NULL,
+    expires REAL NOT NULL,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS spans (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    trace_id TEXT NOT NULL,
+    span_id TEXT NOT NULL,
+    parent_id TEXT,
+    service TEXT NOT NULL,
+    name TEXT NOT NULL,
+    start REAL NOT NULL,
+    duration REAL NOT NULL,
+    attributes BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS spans_trace ON spans (trace_id);
+"""
+
+
+class SharedStateDB:
+    """
+    SQLite database in WAL mode shared by the worker processes, one connection per
+    process. Readers never block the writer; writes are short transactions.
+
+    Blocking calls belong on the database thread: await run(). Writes other workers
+    may see a little later (caches, spans) are queued with defer() and committed in
+    one transaction per flush instead of one each.
+    """
+
+    def __init__(self, path: str = DEFAULT_SHARED_STATE_PATH, busy_timeout: float = 5.0):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Autocommit; explicit transactions via transaction()
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        # Audio commits also run in the default executor
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-state")
+        self._pending: List[Callable[[sqlite3.Connection], None]] = []
+        self._pending_lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # Survives a crashed worker, only an OS crash may lose the last commits; it is a cache
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            with self.transaction() as conn:
+                if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                    for table in TABLES:
+                        conn.execute(f"DROP TABLE IF EXISTS {table}")
+                    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                for statement in SCHEMA.split(";"):
+                    if statement.strip():
+                        conn.execute(statement)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def execute(self, sql: str, params: Tuple = ()) -> int:
+        """Run one statement in its own transaction, returns the changed row count."""
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Run a blocking call on the database thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    def defer(self, write: Callable[[sqlite3.Connection], None]) -> None:
+        """Queue write(conn) for the next flush."""
+        with self._pending_lock:
+            self._pending.append(write)
+
+    def flush(self) -> int:
+        """Commit the queued writes in one transaction; blocks. Returns how many were applied."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+        with self.transaction() as conn:
+            for write in pending:
+                write(conn)
+        return len(pending)
+
+    async def flush_periodically(self, interval: float = DEFAULT_FLUSH_INTERVAL) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.run(self.flush)
+            except sqlite3.Error as e:
+                # Only cache entries and spans are lost
+                print(f"Shared state flush failed: {e}")
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            print(f"Shared state flush failed: {e}")
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
+
+
+class MirrorChanges(NamedTuple):
+    """What the shared mirror of one client holds beyond a worker's local copy."""
+    version: int
+    generation: int
+    # Whole mirror (the generation changed) instead of the entities changed since the local version
+    full: bool
+    changed: Dict[str, Any]
+    removed: List[str]
+
+
+class SharedStateMirrorStore:
+    """
+    StateMirrorStore over the shared database, one row per entity. A delta writes only
+    its entities; a full snapshot replaces the client's rows and starts a new generation.
+    Each worker keeps the mirrors it loaded and fetches only the entities changed since.
+    Database work runs on the database thread, local mirrors change on the event loop.
+    """
+
+    def __init__(self, db: SharedStateDB, max_clients: int = 32):
+        self.db = db
+        self.max_clients = max_clients
+        # client_id -> (generation, mirror)
+        self._local: "OrderedDict[str, Tuple[int, StateMirror]]" = OrderedDict()
+
+    async def sync(self, states: Dict[str, Any], sync) -> Optional[StateMirror]:
+        """Same contract as StateMirrorStore.sync."""
+        if sync.base_version is None:
+            rows = {entity_id: JSON_CODEC.dumps(state) for entity_id, state in states.items()}
+            generation = await self.db.run(self._write_snapshot, sync.client_id, sync.version, rows)
+            mirror = StateMirror(sync.version, dict(states))
+            self._remember(sync.client_id, generation, mirror)
+            return mirror
+
+        mirror = await self._refresh(sync.client_id)
+        if mirror is None or sync.base_version > mirror.version:
+            return None
+        if sync.version > mirror.version:
+            generation = self._local[sync.client_id][0]
+            rows = {entity_id: JSON_CODEC.dumps(state) for entity_id, state in states.items()}
+            await self.db.run(self._write_delta, sync.client_id, generation, sync.version, rows, list(sync.removed))
+            mirror.apply_delta(sync.version, states, sync.removed)
+        return mirror
+
+    def drop(self, client_id: str) -> None:
+        """Forget a client's mirror; blocks."""
+        self._local.pop(client_id, None)
+        self._delete_clients([client_id])
+
+    async def _refresh(self, client_id: str) -> Optional[StateMirror]:
+        """Bring the local mirror up to the shared one."""
+        while True:
+            entry = self._local.get(client_id)
+            generation, mirror = entry if entry is not None else (None, None)
+            changes = await self.db.run(
+                self._load_changes, client_id, generation, mirror.version if mirror is not None else None
+            )
+            # Another request of this client replaced the local mirror in the meantime
+            if self._local.get(client_id) is not entry:
+                continue
+            if changes is None:
+                self._local.pop(client_id, None)
+                return None
+            if changes.full:
+                mirror = StateMirror(changes.version, changes.changed)
+            elif changes.version > mirror.version:
+                mirror.apply_delta(changes.version, changes.changed, changes.removed)
+            self._remember(client_id, changes.generation, mirror)
+            return mirror
+
+    def _load_changes(self, client_id: str, generation: Optional[int], version: Optional[int]) -> Optional[MirrorChanges]:
+        """Database thread: the shared mirror's changes since (generation, version), None if unknown."""
+        rows = self.db.query("SELECT version, generation FROM state_mirrors WHERE client_id = ?", (client_id,))
+        if not rows:
+            return None
+        shared_version, shared_generation = rows[0]
+        if generation != shared_generation or version is None:
+            entities = self.db.query(
+                "SELECT entity_id, state FROM state_mirror_entities WHERE client_id = ? AND state IS NOT NULL",
+                (client_id,)
+            )
+            return MirrorChanges(
+                shared_version, shared_generation, True,
+                {entity_id: JSON_CODEC.loads(state) for entity_id, state in entities}, []
+            )
+        if shared_version <= version:
+            return MirrorChanges(shared_version, shared_generation, False, {}, [])
+        entities = self.db.query(
+            "SELECT entity_id, state FROM state_mirror_entities WHERE client_id = ? AND version > ?",
+            (client_id, version)
+        )
+        return MirrorChanges(
+            shared_version, shared_generation, False,
+            {entity_id: JSON_CODEC.loads(state) for entity_id, state in entities if state is not None},
+            [entity_id for entity_id, state in entities if state is None]
+        )
+
+    def _write_snapshot(self, client_id: str, version: int, rows: Dict[str, bytes]) -> int:
+        """Database thread: replace the client's mirror, returns its new generation."""
+        with self.db.transaction() as conn:
+            previous = conn.execute(
+                "SELECT generation FROM state_mirrors WHERE client_id = ?", (client_id,)
+            ).fetchone()
+            generation = previous[0] + 1 if previous else 1
+            conn.execute(
+                "INSERT OR REPLACE INTO state_mirrors (client_id, version, generation, updated) VALUES (?, ?, ?, ?)",
+                (client_id, version, generation, time.time())
+            )
+            conn.execute("DELETE FROM state_mirror_entities WHERE client_id = ?", (client_id,))
+            conn.executemany(
+                "INSERT INTO state_mirror_entities (client_id, entity_id, version, state) VALUES (?, ?, ?, ?)",
+                [(client_id, entity_id, version, state) for entity_id, state in rows.items()]
+            )
+            # A new client may push the least recently updated one out
+            evicted = [row[0] for row in conn.execute(
+                "SELECT client_id FROM state_mirrors ORDER BY updated DESC LIMIT -1 OFFSET ?", (self.max_clients,)
+            )]
+            self._delete_clients(evicted, conn)
+        return generation
+
+    def _write_delta(self, client_id: str, generation: int, version: int, rows: Dict[str, bytes], removed: List[str]) -> bool:
+        """Database thread: apply a delta unless the shared mirror moved past it or was replaced."""
+        with self.db.transaction() as conn:
+            moved = conn.execute(
+                "UPDATE state_mirrors SET version = ?, updated = ? WHERE client_id = ? AND generation = ? AND version < ?",
+                (version, time.time(), client_id, generation, version)
+            ).rowcount
+            if not moved:
+                return False
+            conn.executemany(
+                "INSERT OR REPLACE INTO state_mirror_entities (client_id, entity_id, version, state) VALUES (?, ?, ?, ?)",
+                [(client_id, entity_id, version, state) for entity_id, state in rows.items()]
+                + [(client_id, entity_id, version, None) for entity_id in removed]
+            )
+        return True
+
+    def _delete_clients(self, client_ids: List[str], conn: Optional[sqlite3.Connection] = None) -> None:
+        if not client_ids:
+            return
+        if conn is None:
+            with self.db.transaction() as conn:
+                return self._delete_clients(client_ids, conn)
+        conn.executemany("DELETE FROM state_mirror_entities WHERE client_id = ?", [(cid,) for cid in client_ids])
+        conn.executemany("DELETE FROM state_mirrors WHERE client_id = ?", [(cid,) for cid in client_ids])
+
+    def _remember(self, client_id: str, generation: int, mirror: StateMirror) -> None:
+        self._local[client_id] = (generation, mirror)
+        self._local.move_to_end(client_id)
+        while len(self._local) > self.max_clients:
+            self._local.popitem(last=False)
+
+
+class SharedResponseCache:
+    """
+    ResponseCache over the shared database. Entries leave in insertion order (TTL is
+    fixed), so reads stay read-only instead of updating an LRU position. get() blocks,
+    run it on the database thread; writes are queued for the next flush. Keys carry
+    the state fingerprint, so an invalidation that lands a little later never serves
+    a stale answer.
+    """
+
+    make_key = staticmethod(ResponseCache.make_key)
+
+    def __init__(
+        self,
+        db: SharedStateDB,
+        max_entries: int = 256,
+        ttl: float = 300.0,
+        dump: Callable[[Any], Any] = lambda value: value,
+        load: Callable[[Any], Any] = lambda value: value,
+    ):
+        self.db = db
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # Convert cached values to and from JSON-compatible data
+        self._dump = dump
+        self._load = load
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    @staticmethod
+    def _key(key: Tuple) -> str:
+        return "\x1f".join(str(part) for part in key)
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        rows = self.db.query("SELECT value, expires FROM response_cache WHERE key = ?", (self._key(key),))
+        if not rows:
+            self._stats["misses"] += 1
+            return None
+        value, expires = rows[0]
+        if expires < time.time():
+            expired = [self._key(key)]
+            self.db.defer(lambda conn: self._delete(expired, conn))
+            self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        return self._load(JSON_CODEC.loads(value))
+
+    def put(self, key: Tuple, response: Any, entity_ids: Iterable[str]) -> None:
+        key = self._key(key)
+        value = JSON_CODEC.dumps(self._dump(response))
+        expires = time.time() + self.ttl
+        entity_ids = set(entity_ids)
+
+        def write(conn: sqlite3.Connection) -> None:
+            conn.execute("DELETE FROM response_cache_deps WHERE key = ?", (key,))
+            conn.execute("INSERT OR REPLACE INTO response_cache (key, value, expires) VALUES (?, ?, ?)", (key, value, expires))
+            conn.executemany(
+                "INSERT INTO response_cache_deps (entity_id, key) VALUES (?, ?)",
+                [(entity_id, key) for entity_id in entity_ids]
+            )
+            overflow = [row[0] for row in conn.execute(
+                "SELECT key FROM response_cache ORDER BY expires DESC LIMIT -1 OFFSET ?", (self.max_entries,)
+            )]
+            self._stats["evictions"] += self._delete(overflow, conn)
+
+        self.db.defer(write)
+
+    def invalidate_entities(self, entity_ids: Iterable[str]) -> None:
+        """Queue dropping every entry that depends on one of the given entities."""
+        entity_ids = list(entity_ids)
+        if not entity_ids:
+            return
+
+        def write(conn: sqlite3.Connection) -> None:
+            placeholders = ",".join("?" * len(entity_ids))
+            keys = [row[0] for row in conn.execute(
+                f"SELECT DISTINCT key FROM response_cache_deps WHERE entity_id IN ({placeholders})", entity_ids
+            )]
+            self._stats["invalidations"] += self._delete(keys, conn)
+
+        self.db.defer(write)
+
+    def _delete(self, keys: List[str], conn: sqlite3.Connection) -> int:
+        if not keys:
+            return 0
+        conn.executemany("DELETE FROM response_cache_deps WHERE key = ?", [(key,) for key in keys])
+        return sum(
+            conn.execute("DELETE FROM response_cache WHERE key = ?", (key,)).rowcount for key in keys
+        )
+
+    def clear(self) -> None:
+        """Drop every entry, including queued ones; blocks."""
+        self.db.flush()
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM response_cache_deps")
+            conn.execute("DELETE FROM response_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            # Counters are per worker, the size is shared
+            **self._stats,
+            "size": self.db.query("SELECT COUNT(*) FROM response_cache")[0][0],
+            "hit_ratio": self._stats["hits"] / lookups if lookups else 0.0,
+        }
+
+
+class SharedAudioStore:
+    """
+    AudioStore over the shared database: clips are blobs, so any worker can serve a
+    clip another one received. The byte budget covers all clips; the oldest leave first.
+    """
+
+    def __init__(
+        self,
+        db: SharedStateDB,
+        budget: int = 256 * 1024 * 1024,
+        ttl: float = 600.0,
+        max_clip_bytes: int = 16 * 1024 * 1024,
+    ):
+        self.db = db
+        self.budget = budget
+        self.ttl = ttl
+        self.max_clip_bytes = max_clip_bytes
+        self._stats_lock = threading.Lock()
+        self._stats = {"puts": 0, "hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "rejected": 0}
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def writer(self, conversation_id: str, filename: str, content_type: str) -> AudioWriter:
+        return AudioWriter(self, conversation_id, filename, content_type)
+
+    def put(self, conversation_id: str, filename: str, content_type: str, buffer: bytearray) -> None:
+        """Store a clip, replacing an older one of the same conversation; blocks, call from an executor."""
+        if len(buffer) > self.max_clip_bytes:
+            self.db.execute("DELETE FROM audio_clips WHERE conversation_id = ?", (conversation_id,))
+            self.count("rejected")
+            return
+        now = time.time()
+        with self.db.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO audio_clips "
+                "(conversation_id, filename, content_type, timestamp, expires, size, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (conversation_id, filename, content_type, now, now + self.ttl, len(buffer), bytes(buffer))
+            )
+            expired = conn.execute("DELETE FROM audio_clips WHERE expires < ?", (now,)).rowcount
+            evicted = 0
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM audio_clips").fetchone()[0]
+            for oldest, size in conn.execute(
+                "SELECT conversation_id, size FROM audio_clips ORDER BY timestamp"
+            ).fetchall():
+                if total <= self.budget:
+                    break
+                conn.execute("DELETE FROM audio_clips WHERE conversation_id = ?", (oldest,))
+                total -= size
+                evicted += 1
+        self.count("puts")
+        self.count("expirations", expired)
+        self.count("evictions", evicted)
+
+    def get(self, conversation_id: str) -> Optional[AudioClip]:
+        """Metadata of a stored clip (without its data)."""
+        rows = self.db.query(
+            "SELECT filename, content_type, timestamp, expires, size FROM audio_clips WHERE conversation_id = ?",
+            (conversation_id,)
+        )
+        if not rows or rows[0][3] < time.time():
+            self.count("misses")
+            return None
+        filename, content_type, timestamp, expires, size = rows[0]
+        clip = AudioClip(conversation_id, filename, content_type, bytearray(), expires)
+        clip.timestamp = timestamp
+        clip.size = size
+        clip.buffer = None
+        self.count("hits")
+        return clip
+
+    @contextmanager
+    def open(self, conversation_id: str) -> Iterator[Optional[memoryview]]:
+        """Read-only view of a clip, None if unknown; valid inside the with block."""
+        rows = self.db.query(
+            "SELECT data FROM audio_clips WHERE conversation_id = ? AND expires >= ?", (conversation_id, time.time())
+        )
+        if not rows:
+            self.count("misses")
+            yield None
+            return
+        self.count("hits")
+        view = memoryview(rows[0][0])
+        try:
+            yield view
+        finally:
+            view.release()
+
+    def discard(self, conversation_id: str) -> None:
+        self.db.execute("DELETE FROM audio_clips WHERE conversation_id = ?", (conversation_id,))
+
+    def clear(self) -> None:
+        self.db.execute("DELETE FROM audio_clips")
+
+    def stats(self) -> Dict[str, Any]:
+        clips, stored = self.db.query("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM audio_clips")[0]
+        with self._stats_lock:
+            return {**self._stats, "clips": clips, "bytes": stored, "budget": self.budget}
+
+
+class SharedSpanBuffer:
+    """
+    SpanBuffer over the shared database, so /traces finds spans recorded by any worker.
+    Spans are kept per worker and written in one batch per flush; lookups include the
+    ones not written yet. Lookups block, run them on the database thread.
+    """
+
+    def __init__(self, db: SharedStateDB, capacity: int = DEFAULT_BUFFER_SIZE):
+        self.db = db
+        self.capacity = capacity
+        self._pending: List[SpanRecord] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: SpanRecord) -> None:
+        with self._lock:
+            self._pending.append(span)
+            if len(self._pending) == 1:
+                self.db.defer(self._write)
+
+    def _write(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            spans, self._pending = self._pending, []
+        if not spans:
+            return
+        conn.executemany(
+            "INSERT INTO spans (trace_id, span_id, parent_id, service, name, start, duration, attributes) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(*span[:7], JSON_CODEC.dumps(span.attributes)) for span in spans]
+        )
+        conn.execute("DELETE FROM spans WHERE id <= (SELECT MAX(id) FROM spans) - ?", (self.capacity,))
+
+    def _unwritten(self) -> List[SpanRecord]:
+        with self._lock:
+            return list(self._pending)
+
+    def trace(self, trace_id: str) -> List[SpanRecord]:
+        rows = self.db.query(
+            "SELECT trace_id, span_id, parent_id, service, name, start, duration, attributes "
+            "FROM spans WHERE trace_id = ?",
+            (trace_id,)
+        )
+        spans = [SpanRecord(*row[:7], JSON_CODEC.loads(row[7])) for row in rows]
+        spans.extend(span for span in self._unwritten() if span.trace_id == trace_id)
+        return sorted(spans, key=lambda span: span.start)
+
+    def recent_traces(self, limit: int = 20) -> List[str]:
+        trace_ids = []
+        for span in reversed(self._unwritten()):
+            if span.trace_id not in trace_ids:
+                trace_ids.append(span.trace_id)
+        rows = self.db.query(
+            "SELECT trace_id FROM spans GROUP BY trace_id ORDER BY MAX(id) DESC LIMIT ?", (limit,)
+        )
+        trace_ids.extend(row[0] for row in rows if row[0] not in trace_ids)
+        return trace_ids[:limit]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "spans": self.db.query("SELECT COUNT(*) FROM spans")[0][0] + len(self._unwritten()),
+            "capacity": self.capacity,
+        }
@@ -0,0 +1,85 @@
+# single_flight.py
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class LeaderCancelled(Exception):
+    """The request the followers were waiting on was cancelled."""
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one computation. The result stays
+    available for window seconds after it finished, so a duplicate arriving just
+    after the first one completed is coalesced as well.
+    """
+
+    def __init__(self, window: float = 0.5):
+        self.window = window
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self._stats = {"leaders": 0, "followers": 0}
+
+    def claim(self, key: Hashable) -> Tuple[asyncio.Future, bool]:
+        """
+        Return (future, is_leader). The leader computes and must call finish() or fail();
+        followers await the future (shielded, so leaving does not cancel it).
+        """
+        future = self._flights.get(key)
+        if future is not None:
+            self._stats["followers"] += 1
+            return future, False
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = future
+        self._stats["leaders"] += 1
+        return future, True
+
+    def finish(self, key: Hashable, future: asyncio.Future, result: Any) -> None:
+        future.set_result(result)
+        asyncio.get_running_loop().call_later(self.window, self._expire, key, future)
+
+    def fail(self, key: Hashable, future: asyncio.Future, error: BaseException) -> None:
+        # Failures are not kept for the window, the next duplicate tries again
+        self._expire(key, future)
+        if isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+            error = LeaderCancelled()
+        future.set_exception(error)
+        # Retrieved here so a failure without followers is not reported as unhandled
+        future.exception()
+
+    async def do(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Return (result, is_leader); only the leader runs compute."""
+        future, leader = self.claim(key)
+        if not leader:
+            return await asyncio.shield(future), False
+        try:
+            result = await compute()
+        except BaseException as e:
+            self.fail(key, future, e)
+            raise
+        self.finish(key, future, result)
+        return result, True
+
+    def _expire(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._flights.get(key) is future:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "tracked": len(self._flights)}
+
+
+def dedupe_commands(commands: Optional[List[Any]], seen: Optional[set] = None) -> Optional[List[Any]]:
+    """
+    Drop repeated commands (same domain, service and data), keeping the first of each.
+    Pass the same seen set to dedupe across the events of one stream.
+    """
+    if not commands:
+        return commands
+    seen = set() if seen is None else seen
+    unique = []
+    for command in commands:
+        key = (command.domain, command.service, json.dumps(command.data, sort_keys=True, default=str))
+        if key not in seen:
+            seen.add(key)
+            unique.append(command)
+    return unique or None
@@ -0,0 +1,64 @@
+# state_mirror.py
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from .entity_index import EntityIndex
+
+
+class StateMirror:
+    """Server-side copy of one client's entity states at a known version."""
+
+    def __init__(self, version: int, states: Dict[str, Any]):
+        self.version = version
+        self.states = states
+        self.index = EntityIndex(states)
+
+    def apply_delta(self, version: int, changed: Dict[str, Any], removed: List[str]) -> None:
+        """Apply a delta and move the mirror to the new version."""
+        self.states.update(changed)
+        for entity_id in removed:
+            self.states.pop(entity_id, None)
+        self.index.update(changed, removed)
+        self.version = version
+
+
+class StateMirrorStore:
+    """Keeps a bounded number of client mirrors, least recently used evicted first."""
+
+    def __init__(self, max_clients: int = 32):
+        self.max_clients = max_clients
+        self._mirrors: "OrderedDict[str, StateMirror]" = OrderedDict()
+
+    def get(self, client_id: str) -> Optional[StateMirror]:
+        mirror = self._mirrors.get(client_id)
+        if mirror is not None:
+            self._mirrors.move_to_end(client_id)
+        return mirror
+
+    async def sync(self, states: Dict[str, Any], sync) -> Optional[StateMirror]:
+        """
+        Bring the mirror of sync.client_id up to date.
+
+        Returns None if the delta cannot be applied and the client has to
+        resend a full snapshot. A coroutine like SharedStateMirrorStore.sync,
+        which waits for the database; this one never suspends.
+        """
+        if sync.base_version is None:
+            mirror = StateMirror(sync.version, dict(states))
+            self._mirrors[sync.client_id] = mirror
+            self._mirrors.move_to_end(sync.client_id)
+            while len(self._mirrors) > self.max_clients:
+                self._mirrors.popitem(last=False)
+            return mirror
+
+        mirror = self.get(sync.client_id)
+        # Deltas are cumulative since the client's last acknowledged version,
+        # so they apply on top of any mirror version in [base_version, version].
+        if mirror is None or sync.base_version > mirror.version:
+            return None
+        if sync.version > mirror.version:
+            mirror.apply_delta(sync.version, states, sync.removed)
+        return mirror
+
+    def drop(self, client_id: str) -> None:
+        self._mirrors.pop(client_id, None)
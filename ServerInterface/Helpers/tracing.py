@@ -0,0 +1,146 @@
+# tracing.py
+import contextvars
+import os
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, NamedTuple, Optional
+
+# W3C Trace Context header: "00-<32 hex trace id>-<16 hex parent span id>-<flags>"
+TRACEPARENT_HEADER = "traceparent"
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+# Response header naming the trace of a request, also when the caller did not send one
+TRACE_ID_HEADER = "X-Trace-Id"
+
+DEFAULT_BUFFER_SIZE = 4096
+
+
+class TraceContext(NamedTuple):
+    trace_id: str
+    span_id: str
+
+    def header(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    @classmethod
+    def parse(cls, value: Optional[str]) -> Optional["TraceContext"]:
+        """None for a missing or malformed traceparent."""
+        match = TRACEPARENT_PATTERN.match((value or "").strip().lower())
+        return cls(match.group(1), match.group(2)) if match else None
+
+
+class SpanRecord(NamedTuple):
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    service: str
+    name: str
+    # Wall clock start (epoch seconds), comparable across services on synced hosts
+    start: float
+    duration: float
+    attributes: Dict[str, Any]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return self._asdict()
+
+
+def new_trace_id() -> str:
+    return os.urandom(16).hex()
+
+
+def new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+class SpanBuffer:
+    """The most recent finished spans of one service, oldest dropped first."""
+
+    def __init__(self, capacity: int = DEFAULT_BUFFER_SIZE):
+        self._spans: deque = deque(maxlen=capacity)
+
+    def add(self, span: SpanRecord) -> None:
+        self._spans.append(span)
+
+    def trace(self, trace_id: str) -> List[SpanRecord]:
+        """Spans of one trace ordered by start time."""
+        return sorted((span for span in self._spans if span.trace_id == trace_id), key=lambda span: span.start)
+
+    def recent_traces(self, limit: int = 20) -> List[str]:
+        """Trace ids of the newest spans, newest first."""
+        trace_ids = []
+        for span in reversed(self._spans):
+            if span.trace_id not in trace_ids:
+                trace_ids.append(span.trace_id)
+                if len(trace_ids) == limit:
+                    break
+        return trace_ids
+
+    def stats(self) -> Dict[str, int]:
+        return {"spans": len(self._spans), "capacity": self._spans.maxlen}
+
+
+# Span the current task works in; tasks started from it inherit it as their parent
+_current_span: contextvars.ContextVar = contextvars.ContextVar("trace_span", default=None)
+
+
+def current_context() -> Optional[TraceContext]:
+    return _current_span.get()
+
+
+def trace_header() -> Dict[str, str]:
+    """traceparent header for an outgoing call from the current span, empty outside a trace."""
+    context = _current_span.get()
+    return {TRACEPARENT_HEADER: context.header()} if context is not None else {}
+
+
+class Tracer:
+    """Records the spans of one service into its buffer."""
+
+    def __init__(self, service: str, buffer: Optional[SpanBuffer] = None):
+        self.service = service
+        self.buffer = buffer if buffer is not None else SpanBuffer()
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[TraceContext] = None, **attributes):
+        """
+        Time the block as a span: child of parent, else of the current span, else the
+        root of a new trace. Yields the span's TraceContext.
+        """
+        previous = _current_span.get()
+        parent = parent if parent is not None else previous
+        context = TraceContext(parent.trace_id if parent is not None else new_trace_id(), new_span_id())
+        _current_span.set(context)
+        start = time.time()
+        started = time.perf_counter()
+        try:
+            yield context
+        finally:
+            # set, not reset: async generators may finish in another context than they started
+            _current_span.set(previous)
+            self.buffer.add(SpanRecord(
+                context.trace_id, context.span_id, parent.span_id if parent is not None else None,
+                self.service, name, start, time.perf_counter() - started, attributes
+            ))
+
+    def record(self, name: str, start: float, duration: float, **attributes) -> None:
+        """Add an already finished span (wall clock start) under the current span; ignored outside a trace."""
+        parent = _current_span.get()
+        if parent is not None:
+            self.buffer.add(SpanRecord(
+                parent.trace_id, new_span_id(), parent.span_id, self.service, name, start, duration, attributes
+            ))
+
+    def trace(self, trace_id: str) -> List[Dict[str, Any]]:
+        return [span.as_dict() for span in self.buffer.trace(trace_id)]
+
+
+def waterfall(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Order spans of several services by start and add their offset from the first one in ms."""
+    ordered = sorted(spans, key=lambda span: span["start"])
+    origin = ordered[0]["start"] if ordered else 0.0
+    return [
+        {**span, "offset_ms": round((span["start"] - origin) * 1000, 3), "duration_ms": round(span["duration"] * 1000, 3)}
+        for span in ordered
+    ]
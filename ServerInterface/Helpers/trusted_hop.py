@@ -0,0 +1,65 @@
+# trusted_hop.py
+import hmac
+import os
+from typing import Any, Dict, Optional
+
+from .shared_models import (
+    SCHEMA_VERSION,
+    Command,
+    ErrorDetails,
+    ProcessRequest,
+    ProcessResponse,
+    StateSync,
+    UserInput,
+)
+
+# Marks a call between our own services whose payload was already validated at the edge
+TRUSTED_HOP_HEADER = "X-Trusted-Hop"
+
+# Shared secret for hops between hosts; without it only loopback callers are trusted
+TRUSTED_HOP_TOKEN = os.environ.get("TRUSTED_HOP_TOKEN", "")
+
+LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+def trusted_hop_header() -> Dict[str, str]:
+    return {TRUSTED_HOP_HEADER: TRUSTED_HOP_TOKEN or "1"}
+
+
+def is_trusted_hop(header_value: Optional[str], peer_host: Optional[str]) -> bool:
+    """A hop is trusted if it carries the header and either the token or a loopback address."""
+    if not header_value:
+        return False
+    if TRUSTED_HOP_TOKEN:
+        return hmac.compare_digest(header_value, TRUSTED_HOP_TOKEN)
+    return peer_host in LOOPBACK_HOSTS
+
+
+def check_schema_version(payload: Dict[str, Any]) -> None:
+    """Edge check, raises ValueError for payloads of another schema version."""
+    version = payload.get("schema_version", SCHEMA_VERSION)
+    if version != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported schema_version {version}, expected {SCHEMA_VERSION}")
+
+
+def construct_request(payload: Dict[str, Any]) -> ProcessRequest:
+    """Build a ProcessRequest from trusted data without field validation."""
+    state_sync = payload.get("state_sync")
+    return ProcessRequest.construct(
+        user_input=UserInput.construct(**payload["user_input"]),
+        states=payload["states"],
+        config=payload["config"],
+        state_sync=StateSync.construct(**state_sync) if state_sync is not None else None,
+        schema_version=payload.get("schema_version", SCHEMA_VERSION),
+    )
+
+
+def construct_response(payload: Dict[str, Any]) -> ProcessResponse:
+    """Build a ProcessResponse from trusted data without field validation."""
+    commands = payload.get("commands")
+    error = payload.get("error")
+    return ProcessResponse.construct(**{
+        **payload,
+        "commands": [Command.construct(**command) for command in commands] if commands is not None else None,
+        "error": ErrorDetails.construct(**error) if error is not None else None,
+    })
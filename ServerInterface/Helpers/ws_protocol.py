@@ -0,0 +1,30 @@
+# ws_protocol.py
+import json
+from typing import Any, Dict
+
+# Messages on the /ws channel, JSON text frames with a "type" field.
+# client -> server
+MSG_PROCESS = "process"  # {id, request, budget_ms, timing, traceparent}: like POST /process/stream with its headers
+MSG_CANCEL = "cancel"  # {id}: the client gave up on a request
+# server -> client
+MSG_EVENT = "event"  # {id, event}: one StreamEvent of a request, "done" ends it
+MSG_PUSH = "push"  # {event}: server-initiated, not tied to a request
+# both directions
+MSG_PING = "ping"
+MSG_PONG = "pong"
+
+# Push event types the integration understands
+PUSH_COMMANDS = "commands"  # {commands}: follow-up commands to execute
+PUSH_STATE_REQUEST = "state_request"  # the server wants a full state snapshot
+PUSH_PROGRESS = "progress"  # {text}: informational
+
+
+def encode_message(message: Dict[str, Any]) -> str:
+    return json.dumps(message, separators=(",", ":"))
+
+
+def decode_message(data: str) -> Dict[str, Any]:
+    message = json.loads(data)
+    if not isinstance(message, dict) or "type" not in message:
+        raise ValueError("WebSocket message without type")
+    return message
@@ -0,0 +1,39 @@
+# autofunction_spawner_service.py
+import os
+import re
+
+# Plugin file names the server's PluginLoader picks up
+MODULE_NAME_PATTERN = re.compile(r"^[a-z][a-z0-9_]*$")
+
+
+def write_executor_module(directory: str, name: str, source: str) -> str:
+    """
+    Write a generated executor module into the server's plugin directory. The source
+    is syntax checked first and replaces the file atomically, so the loader never
+    sees a partial module. Returns the module path.
+    """
+    if not MODULE_NAME_PATTERN.match(name):
+        raise ValueError(f"Invalid executor module name: {name}")
+    path = os.path.join(directory, f"{name}.py")
+    compile(source, path, "exec", dont_inherit=True)
+
+    os.makedirs(directory, exist_ok=True)
+    # Dot files are skipped by the loader
+    temporary = os.path.join(directory, f".{name}.py.tmp")
+    with open(temporary, "w", encoding="utf-8") as module_file:
+        module_file.write(source)
+        module_file.flush()
+        os.fsync(module_file.fileno())
+    os.replace(temporary, path)
+    return path
+
+
+def remove_executor_module(directory: str, name: str) -> bool:
+    """Remove a generated module; the loader unregisters its executors. False if it did not exist."""
+    if not MODULE_NAME_PATTERN.match(name):
+        raise ValueError(f"Invalid executor module name: {name}")
+    try:
+        os.unlink(os.path.join(directory, f"{name}.py"))
+        return True
+    except FileNotFoundError:
+        return False
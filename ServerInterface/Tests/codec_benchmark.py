@@ -0,0 +1,86 @@
+# codec_benchmark.py
+"""
+Micro-benchmark of the wire codecs over ProcessRequest payloads of realistic size.
+
+    python ServerInterface/Tests/codec_benchmark.py [--sizes 50 500 2000] [--rounds 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add parent folder to Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(parent_dir)
+
+from ServerInterface.Helpers.codec import CODECS, MSGPACK_CODEC, orjson
+from ServerInterface.Helpers.shared_models import ProcessRequest, StateSync, UserInput
+
+DOMAINS = ["light", "switch", "sensor", "binary_sensor", "climate", "media_player", "cover"]
+AREAS = ["Wohnzimmer", "Küche", "Schlafzimmer", "Büro", "Bad", "Flur", None]
+SENSOR_STATES = ["on", "off", "unavailable", "21.5", "1013.2", "playing", "open"]
+
+
+def build_request(entity_count: int, seed: int = 0) -> ProcessRequest:
+    """Request shaped like the integration's snapshot: {entity_id: {state, name, area}}."""
+    rng = random.Random(seed)
+    states = {}
+    for index in range(entity_count):
+        domain = rng.choice(DOMAINS)
+        states[f"{domain}.device_{index}"] = {
+            "state": rng.choice(SENSOR_STATES),
+            "name": f"{domain.replace('_', ' ').title()} {index}",
+            "area": rng.choice(AREAS),
+        }
+    return ProcessRequest(
+        user_input=UserInput(
+            text="Turn on the helix light",
+            language="en",
+            conversation_id="benchmark",
+            device_id=None
+        ),
+        states=states,
+        config={"server_url": "http://localhost:8129"},
+        state_sync=StateSync(client_id="benchmark", version=1)
+    )
+
+
+def measure(func, rounds: int) -> float:
+    """Median seconds per call."""
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 500, 2000])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"msgpack: {'yes' if MSGPACK_CODEC else 'not installed'}, orjson: {'yes' if orjson else 'not installed'}")
+    print(f"{'entities':>8} {'codec':<20} {'bytes':>9} {'to dict µs':>11} {'encode µs':>10} {'decode µs':>10} {'parse µs':>10}")
+    for size in args.sizes:
+        request = build_request(size)
+        to_dict = measure(request.dict, args.rounds)
+        payload = request.dict()
+        for codec in CODECS:
+            body = codec.dumps(payload)
+            encode = measure(lambda: codec.dumps(payload), args.rounds)
+            decode = measure(lambda: codec.loads(body), args.rounds)
+            # Decoding plus pydantic validation, what the server pays per request
+            parse = measure(lambda: ProcessRequest(**codec.loads(body)), args.rounds)
+            print(
+                f"{size:>8} {codec.content_type:<20} {len(body):>9} "
+                f"{to_dict * 1e6:>11.0f} {encode * 1e6:>10.0f} {decode * 1e6:>10.0f} {parse * 1e6:>10.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
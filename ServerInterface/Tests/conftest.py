@@ -0,0 +1,12 @@
+# conftest.py
+import os
+import sys
+
+# Add the repository root to the Python path, as the servers do
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+# Command line benchmarks, not test modules
+collect_ignore = ["load_test.py", "codec_benchmark.py", "testsuit.py"]
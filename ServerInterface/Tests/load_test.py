@@ -0,0 +1,330 @@
+# load_test.py
+"""
+Async load generator and latency benchmark for the /process pipeline.
+
+Run a benchmark (server.py on 8129, AutoFunction replaced by a local stub):
+    python ServerInterface/Tests/load_test.py run --mode closed --concurrency 8 --duration 30 \
+        --states 500 --mix mixed --stub auto --output results/closed_500.json
+
+Open loop (fixed arrival rate, latency counted from the scheduled send time):
+    python ServerInterface/Tests/load_test.py run --mode open --rate 50 --duration 30
+
+Compare two result files, exit code 1 on regressions above the threshold:
+    python ServerInterface/Tests/load_test.py compare results/old.json results/new.json --threshold 0.1
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import httpx
+
+# Add parent folder to Python path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(os.path.dirname(current_dir))
+sys.path.append(parent_dir)
+
+from ServerInterface.Helpers.codec import CONTENT_TYPE_JSON, CONTENT_TYPE_MSGPACK, JSON_CODEC, MSGPACK_CODEC
+from ServerInterface.Helpers.metrics import SERVER_TIMING_HEADER, parse_timing
+from ServerInterface.Tests.codec_benchmark import build_request
+
+UTTERANCE_MIXES = {
+    "light": {"turn on helix": 3, "turn off helix": 3, "schalte helix ein": 1, "switch on device 3": 1},
+    "chat": {"hello": 2, "what time is it": 1, "tell me a joke": 1},
+    "mixed": {"turn on helix": 2, "turn off helix": 2, "hello": 2, "schalte helix aus": 1, "what time is it": 1},
+}
+
+PERCENTILES = (50, 95, 99)
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """A preset name or "text:weight;text:weight"."""
+    if value in UTTERANCE_MIXES:
+        return UTTERANCE_MIXES[value]
+    mix = {}
+    for part in value.split(";"):
+        text, _, weight = part.rpartition(":")
+        mix[text.strip() or weight.strip()] = int(weight) if text else 1
+    return mix
+
+
+def percentile(ordered: List[float], percent: float) -> float:
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    summary = {"count": len(ordered)}
+    if ordered:
+        summary.update({f"p{p}": percentile(ordered, p) * 1000 for p in PERCENTILES})
+        summary["mean"] = sum(ordered) / len(ordered) * 1000
+        summary["max"] = ordered[-1] * 1000
+    return summary
+
+
+class Recorder:
+    """Per-stage latency samples, status counts and errors of one run."""
+
+    def __init__(self):
+        self.stages: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.completed = 0
+
+    def add(self, stage: str, seconds: float):
+        self.stages.setdefault(stage, []).append(seconds)
+
+    def count(self, table: Dict[str, int], key: str):
+        table[key] = table.get(key, 0) + 1
+
+
+class PayloadFactory:
+    """Builds request bodies for a state size, utterance mix and codec."""
+
+    def __init__(self, states: int, mix: Dict[str, int], codec, state_sync: bool, seed: int):
+        self._template = build_request(states, seed).dict()
+        self._texts = list(mix)
+        self._weights = list(mix.values())
+        self._codec = codec
+        self._state_sync = state_sync
+        self._random = random.Random(seed)
+
+    def next(self) -> bytes:
+        payload = dict(self._template)
+        payload["user_input"] = {
+            **payload["user_input"],
+            "text": self._random.choices(self._texts, self._weights)[0],
+            "conversation_id": uuid.uuid4().hex,
+        }
+        # A fresh client per request: full snapshots, and no single-flight coalescing between requests
+        payload["state_sync"] = {"client_id": uuid.uuid4().hex, "version": 1} if self._state_sync else None
+        return self._codec.dumps(payload)
+
+
+async def send_one(client: httpx.AsyncClient, args, body: bytes, recorder: Recorder, scheduled: float):
+    """One request; stream requests also record time to the first command, speech and done."""
+    started = time.perf_counter()
+    headers = {"Content-Type": args.codec_type, "Accept": args.codec_type}
+    try:
+        if args.endpoint.endswith("/stream"):
+            async with client.stream("POST", args.endpoint, content=body, headers=headers) as response:
+                first = {}
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    event_type = json.loads(line).get("type")
+                    if event_type not in first:
+                        first[event_type] = time.perf_counter()
+                for event_type, at in first.items():
+                    recorder.add(f"first_{event_type}", at - started)
+        else:
+            response = await client.post(args.endpoint, content=body, headers=headers)
+            await response.aread()
+        done = time.perf_counter()
+        recorder.count(recorder.statuses, str(response.status_code))
+        recorder.add("total", done - started)
+        # Open loop: include time spent waiting behind earlier requests (coordinated omission)
+        recorder.add("latency_from_schedule", done - scheduled)
+        for stage, seconds in parse_timing(response.headers.get(SERVER_TIMING_HEADER)).items():
+            if seconds is not None:
+                recorder.add(f"server.{stage}", seconds)
+        recorder.completed += 1
+    except httpx.HTTPError as e:
+        recorder.count(recorder.errors, type(e).__name__)
+
+
+async def run_closed(client, args, factory: PayloadFactory, recorder: Recorder, until: float):
+    async def worker():
+        while time.perf_counter() < until:
+            await send_one(client, args, factory.next(), recorder, time.perf_counter())
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+async def run_open(client, args, factory: PayloadFactory, recorder: Recorder, until: float):
+    tasks = set()
+    next_at = time.perf_counter()
+    rng = random.Random(args.seed)
+    while next_at < until:
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.ensure_future(send_one(client, args, factory.next(), recorder, next_at))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        interval = 1 / args.rate
+        next_at += rng.expovariate(1 / interval) if args.poisson else interval
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+async def start_stub(args):
+    """Stand-in for autofunction_server.py on its port, with a fixed latency."""
+    import uvicorn
+    from fastapi import FastAPI, Request
+    from fastapi.responses import Response
+
+    stub = FastAPI()
+
+    @stub.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @stub.post("/process")
+    async def process(raw: Request):
+        await asyncio.sleep(args.stub_latency / 1000)
+        if args.stub == "local":
+            # Makes the server fall back to its local executors
+            return Response(status_code=503)
+        return Response(
+            content=JSON_CODEC.dumps({"response": "stub", "commands": None, "conversation_id": None}),
+            media_type=CONTENT_TYPE_JSON
+        )
+
+    server = uvicorn.Server(uvicorn.Config(stub, host="127.0.0.1", port=args.stub_port, log_level="warning"))
+    task = asyncio.ensure_future(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server, task
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=current_dir, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args):
+    codec = MSGPACK_CODEC if args.codec == "msgpack" else JSON_CODEC
+    if codec is None:
+        sys.exit("msgpack is not installed")
+    args.codec_type = CONTENT_TYPE_MSGPACK if args.codec == "msgpack" else CONTENT_TYPE_JSON
+    factory = PayloadFactory(args.states, parse_mix(args.mix), codec, args.state_sync, args.seed)
+    recorder = Recorder()
+
+    stub = await start_stub(args) if args.stub != "none" else None
+    limits = httpx.Limits(max_connections=max(args.concurrency, 100))
+    try:
+        async with httpx.AsyncClient(base_url=args.target, limits=limits, timeout=args.timeout) as client:
+            for _ in range(args.warmup):
+                await send_one(client, args, factory.next(), Recorder(), time.perf_counter())
+            started = time.perf_counter()
+            until = started + args.duration
+            if args.mode == "open":
+                await run_open(client, args, factory, recorder, until)
+            else:
+                await run_closed(client, args, factory, recorder, until)
+            elapsed = time.perf_counter() - started
+    finally:
+        if stub is not None:
+            server, task = stub
+            server.should_exit = True
+            await task
+
+    result = {
+        "timestamp": datetime.datetime.now().isoformat(),
+        "revision": git_revision(),
+        "config": {
+            key: getattr(args, key) for key in (
+                "target", "endpoint", "mode", "rate", "poisson", "concurrency", "duration",
+                "states", "mix", "codec", "state_sync", "stub", "stub_latency", "seed"
+            )
+        },
+        "elapsed": elapsed,
+        "completed": recorder.completed,
+        "throughput": recorder.completed / elapsed if elapsed else 0.0,
+        "statuses": recorder.statuses,
+        "errors": recorder.errors,
+        "stages": {stage: summarize(samples) for stage, samples in sorted(recorder.stages.items())},
+    }
+    print_result(result)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(result, output, indent=2)
+        print(f"Results written to {args.output}")
+
+
+def print_result(result: dict):
+    print(f"{result['completed']} requests in {result['elapsed']:.1f}s, {result['throughput']:.1f} req/s")
+    print(f"statuses: {result['statuses']}  errors: {result['errors']}")
+    print(f"{'stage':<28} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for stage, summary in result["stages"].items():
+        if summary["count"]:
+            print(
+                f"{stage:<28} {summary['count']:>7} {summary['p50']:>9.1f} "
+                f"{summary['p95']:>9.1f} {summary['p99']:>9.1f} {summary['max']:>9.1f}"
+            )
+
+
+def compare(args) -> int:
+    """Print per-stage percentile changes; returns 1 if any grew more than the threshold."""
+    with open(args.baseline, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    with open(args.candidate, encoding="utf-8") as candidate_file:
+        candidate = json.load(candidate_file)
+
+    regressions = 0
+    print(f"{'stage':<28} {'metric':>7} {'baseline':>10} {'candidate':>10} {'change':>8}")
+    rows = [("throughput", "req/s", baseline["throughput"], candidate["throughput"], True)]
+    for stage, summary in candidate["stages"].items():
+        old = baseline["stages"].get(stage)
+        if not old or not old.get("count") or not summary.get("count"):
+            continue
+        for p in PERCENTILES:
+            rows.append((stage, f"p{p}", old[f"p{p}"], summary[f"p{p}"], False))
+
+    for stage, metric, old, new, higher_is_better in rows:
+        change = (new - old) / old if old else 0.0
+        regressed = (-change if higher_is_better else change) > args.threshold
+        regressions += regressed
+        print(f"{stage:<28} {metric:>7} {old:>10.1f} {new:>10.1f} {change:>+8.1%}{'  REGRESSION' if regressed else ''}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the /process pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run a load test")
+    run_parser.add_argument("--target", default="http://localhost:8129", help="server.py or autofunction_server.py (8128)")
+    run_parser.add_argument("--endpoint", default="/process", choices=["/process", "/process/stream"])
+    run_parser.add_argument("--mode", default="closed", choices=["closed", "open"])
+    run_parser.add_argument("--concurrency", type=int, default=4, help="closed loop: parallel clients")
+    run_parser.add_argument("--rate", type=float, default=20.0, help="open loop: requests per second")
+    run_parser.add_argument("--poisson", action="store_true", help="open loop: exponential inter-arrival times")
+    run_parser.add_argument("--duration", type=float, default=20.0, help="seconds")
+    run_parser.add_argument("--warmup", type=int, default=5, help="unrecorded requests before the run")
+    run_parser.add_argument("--states", type=int, default=200, help="entities in the states dict")
+    run_parser.add_argument("--mix", default="mixed", help=f"{', '.join(UTTERANCE_MIXES)} or 'text:weight;...'")
+    run_parser.add_argument("--codec", default="json", choices=["json", "msgpack"])
+    run_parser.add_argument("--state-sync", action="store_true", help="send a state_sync block (full snapshots)")
+    run_parser.add_argument("--stub", default="none", choices=["none", "auto", "local"],
+                            help="replace AutoFunction: 'auto' answers, 'local' forces the local executors")
+    run_parser.add_argument("--stub-port", type=int, default=8128)
+    run_parser.add_argument("--stub-latency", type=float, default=5.0, help="ms")
+    run_parser.add_argument("--timeout", type=float, default=30.0)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--output", help="write the JSON result here")
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="allowed relative slowdown")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        sys.exit(compare(args))
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
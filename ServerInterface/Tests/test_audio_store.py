@@ -0,0 +1,75 @@
+# test_audio_store.py
+import asyncio
+
+import pytest
+
+from ServerInterface.Helpers.audio_store import AudioStore
+from ServerInterface.Helpers.audio_stream import SourceReader
+
+CHUNK = b"x" * 1000
+
+
+async def upload(count: int, fail_after: int = None):
+    for index in range(count):
+        if index == fail_after:
+            raise ConnectionError("client went away")
+        await asyncio.sleep(0)
+        yield CHUNK
+
+
+def store_upload(store: AudioStore, source, consume: int = -1):
+    """Read source through a SourceReader whose consumer stops after consume chunks (-1: reads all)."""
+    async def scenario():
+        writer = store.writer("c1", "clip.wav", "audio/wav")
+        reader = SourceReader(source, writer.write, max_queued=2)
+        if consume:
+            seen = 0
+            async for _ in reader.chunks():
+                seen += 1
+                if seen == consume:
+                    break
+        await reader.finish()
+        return reader.size, writer.commit()
+    return asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("consume", [-1, 0, 3])
+def test_whole_upload_is_stored_when_consumer_stops_early(consume):
+    store = AudioStore()
+    size, stored = store_upload(store, upload(20), consume=consume)
+    assert stored
+    assert size == 20 * len(CHUNK)
+    assert store.get("c1").size == size
+    with store.open("c1") as view:
+        assert bytes(view) == CHUNK * 20
+
+
+def test_broken_upload_is_not_stored():
+    store = AudioStore()
+    with pytest.raises(ConnectionError):
+        store_upload(store, upload(20, fail_after=5))
+    assert store.get("c1") is None
+
+
+def test_oversized_clip_is_rejected():
+    store = AudioStore(max_clip_bytes=5 * len(CHUNK))
+    _, stored = store_upload(store, upload(20))
+    assert not stored
+    assert store.stats()["rejected"] == 1
+
+
+def test_memory_budget_spills_least_recently_used(tmp_path):
+    store = AudioStore(memory_budget=1500, spill_dir=str(tmp_path))
+    store.put("old", "a.wav", "audio/wav", bytearray(CHUNK))
+    store.put("new", "b.wav", "audio/wav", bytearray(CHUNK))
+    assert store.get("old").on_disk and not store.get("new").on_disk
+    with store.open("old") as view:
+        assert bytes(view) == CHUNK
+
+
+def test_memory_budget_evicts_without_spill_dir():
+    store = AudioStore(memory_budget=1500)
+    store.put("old", "a.wav", "audio/wav", bytearray(CHUNK))
+    store.put("new", "b.wav", "audio/wav", bytearray(CHUNK))
+    assert store.get("old") is None
+    assert store.stats()["evictions"] == 1
@@ -0,0 +1,62 @@
+# test_backend_pool.py
+import asyncio
+
+import pytest
+
+backend_pool = pytest.importorskip("custom_components.extended_openai_conversation.backend_pool")
+
+
+class FakeBreaker:
+    state = "closed"
+
+    def __init__(self):
+        self.failures = 0
+
+    def allow_request(self):
+        return True
+
+    def record_failure(self):
+        self.failures += 1
+
+
+class FakeBackend:
+    def __init__(self, url, delay=None):
+        self.url = url
+        self.breaker = FakeBreaker()
+        self.outstanding = 0
+        self.ewma = None
+        self.delay = delay
+
+    def hedge_delay(self):
+        return self.delay
+
+    def record_success(self, latency):
+        pass
+
+
+def test_failed_primary_fails_over_before_hedge_delay():
+    primary, secondary = FakeBackend("a", delay=1.0), FakeBackend("b")
+    pool = backend_pool.BackendPool([primary, secondary])
+    asked = []
+
+    async def send(backend, on_commands):
+        asked.append(backend.url)
+        return None if backend is primary else "answer"
+
+    assert asyncio.run(pool.async_request(send, lambda commands: None)) == "answer"
+    assert asked == ["a", "b"]
+    assert primary.breaker.failures == 1
+
+
+def test_no_failover_after_commands_ran():
+    primary, secondary = FakeBackend("a"), FakeBackend("b")
+    pool = backend_pool.BackendPool([primary, secondary])
+    asked = []
+
+    async def send(backend, on_commands):
+        asked.append(backend.url)
+        on_commands(["light.turn_on"])
+        return None
+
+    assert asyncio.run(pool.async_request(send, lambda commands: None)) is None
+    assert asked == ["a"]
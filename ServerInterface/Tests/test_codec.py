@@ -0,0 +1,59 @@
+# test_codec.py
+import asyncio
+
+import pytest
+
+from ServerInterface.Helpers.codec import (
+    CONTENT_TYPE_JSON, CONTENT_TYPE_MSGPACK, JSON_CODEC, MSGPACK_CODEC,
+    UnsupportedContentType, codec_for_content_type, negotiate
+)
+
+
+def test_json_round_trip():
+    payload = {"text": "Licht an", "states": {"light.kitchen": {"state": "on"}}}
+    assert JSON_CODEC.loads(JSON_CODEC.dumps(payload)) == payload
+
+
+def test_content_type_parameters_are_ignored():
+    assert codec_for_content_type("application/json; charset=utf-8") is JSON_CODEC
+    assert codec_for_content_type(None) is JSON_CODEC
+
+
+def test_unknown_content_type_is_rejected():
+    with pytest.raises(UnsupportedContentType):
+        codec_for_content_type("text/xml")
+
+
+def test_negotiate_prefers_msgpack_when_available():
+    codec = negotiate(f"{CONTENT_TYPE_JSON};q=0.9, {CONTENT_TYPE_MSGPACK}")
+    assert codec is (MSGPACK_CODEC or JSON_CODEC)
+    assert negotiate("text/html") is JSON_CODEC
+
+
+class FakeRequest:
+    """What decode_request reads from a Starlette request."""
+
+    def __init__(self, body: bytes, content_type: str):
+        self.headers = {"content-type": content_type}
+        self._body = body
+
+    async def body(self):
+        return self._body
+
+
+def test_decode_request_maps_errors_to_status_codes():
+    pytest.importorskip("fastapi")
+    from ServerInterface.Helpers.codec import decode_request, encode_response
+
+    parsed, error = asyncio.run(decode_request(FakeRequest(b'{"a": 1}', CONTENT_TYPE_JSON)))
+    assert parsed == {"a": 1} and error is None
+    assert asyncio.run(decode_request(FakeRequest(b"{}", "text/xml")))[1].status_code == 415
+    assert asyncio.run(decode_request(FakeRequest(b"{", CONTENT_TYPE_JSON)))[1].status_code == 422
+
+    class Model:
+        def dict(self):
+            return {"response": "ok"}
+
+    response = encode_response(Model(), CONTENT_TYPE_JSON, {"X-Extra": "1"})
+    assert response.media_type == CONTENT_TYPE_JSON
+    assert response.headers["X-Extra"] == "1"
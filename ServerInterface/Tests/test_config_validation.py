@@ -0,0 +1,40 @@
+# test_config_validation.py
+from ServerInterface.Helpers.config_validation import ValidationCache, config_fingerprint
+
+
+def test_fingerprint_tells_equal_values_of_other_types_apart():
+    fingerprints = {config_fingerprint({"x": value}) for value in (1, 1.0, True)}
+    assert len(fingerprints) == 3
+    nested = {config_fingerprint({"x": [value]}) for value in (1, 1.0, True)}
+    assert len(nested) == 3
+
+
+def test_hit_returns_the_callers_config():
+    cache = ValidationCache()
+    calls = []
+
+    def validator(config):
+        calls.append(config)
+        return dict(config)
+
+    assert cache.validate("light#1", validator, {"x": 1}) == {"x": 1}
+    config = {"x": True}
+    assert cache.validate("light#1", validator, config)["x"] is True
+    assert len(calls) == 2
+
+    again = {"x": True}
+    assert cache.validate("light#1", validator, again) is again
+    assert len(calls) == 2
+
+
+def test_hit_keeps_the_validators_defaults():
+    cache = ValidationCache()
+
+    def with_default(config):
+        return {"brightness": 255, **config}
+
+    first = cache.validate("light#1", with_default, {"command": "turn_on"})
+    second = cache.validate("light#1", with_default, {"command": "turn_on"})
+    assert first == second == {"brightness": 255, "command": "turn_on"}
+    assert first is not second
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,27 @@
+# test_deadline.py
+from ServerInterface.Helpers.deadline import REQUEST_BUDGET_HEADER, Deadline
+
+
+def test_from_header_caps_budget_and_keeps_margin():
+    deadline = Deadline.from_header("60000", default=2.0, margin=0.5)
+    assert 1.4 < deadline.remaining() <= 1.5
+
+
+def test_from_header_ignores_malformed_budget():
+    assert 1.9 < Deadline.from_header("soon", default=2.0).remaining() <= 2.0
+
+
+def test_reserve_leaves_time_for_fallback():
+    deadline = Deadline(2.0)
+    child = deadline.reserve(0.25)
+    assert deadline.remaining() - child.remaining() >= 0.249
+    assert not child.expired
+
+
+def test_reserve_takes_at_most_half():
+    deadline = Deadline(0.2)
+    assert 0.09 < deadline.reserve(1.0).remaining() <= 0.1
+
+
+def test_header_propagates_remaining_ms():
+    assert int(Deadline(1.0).header()[REQUEST_BUDGET_HEADER]) in (999, 1000)
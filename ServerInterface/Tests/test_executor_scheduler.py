@@ -0,0 +1,61 @@
+# test_executor_scheduler.py
+import asyncio
+
+import pytest
+
+from ServerInterface.Helpers.executor_scheduler import (
+    STATUS_CANCELLED, STATUS_OK, STATUS_TIMEOUT, ExecutorFailed, ExecutorScheduler, ScheduledExecutor
+)
+
+
+def run(scheduler, start):
+    async def collect():
+        return [item async for item in scheduler.run(start)]
+    return asyncio.run(collect())
+
+
+def test_dependencies_run_first_and_see_results():
+    scheduler = ExecutorScheduler({
+        "response": ScheduledExecutor(depends_on=("light",)),
+        "light": ScheduledExecutor(),
+    })
+    seen = {}
+
+    async def start(name, results):
+        seen[name] = dict(results)
+        return name.upper()
+
+    assert run(scheduler, start) == [("light", "LIGHT"), ("response", "RESPONSE")]
+    assert seen == {"light": {}, "response": {"light": "LIGHT"}}
+    assert scheduler.timings["response"].status == STATUS_OK
+
+
+def test_cycle_is_rejected():
+    with pytest.raises(ValueError):
+        ExecutorScheduler({"a": ScheduledExecutor(depends_on=("b",)), "b": ScheduledExecutor(depends_on=("a",))})
+
+
+def test_required_timeout_fails_the_run():
+    scheduler = ExecutorScheduler({"slow": ScheduledExecutor(timeout=0.01)})
+
+    async def start(name, results):
+        await asyncio.sleep(1)
+
+    with pytest.raises(ExecutorFailed) as failed:
+        run(scheduler, start)
+    assert failed.value.status == STATUS_TIMEOUT
+
+
+def test_optional_executor_is_cancelled_once_required_ones_are_done():
+    scheduler = ExecutorScheduler({
+        "light": ScheduledExecutor(),
+        "extra": ScheduledExecutor(required=False),
+    })
+
+    async def start(name, results):
+        if name == "extra":
+            await asyncio.sleep(1)
+        return name
+
+    assert run(scheduler, start) == [("light", "light")]
+    assert scheduler.timings["extra"].status == STATUS_CANCELLED
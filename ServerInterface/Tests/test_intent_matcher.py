@@ -0,0 +1,68 @@
+# test_intent_matcher.py
+import asyncio
+import json
+
+from ServerInterface.Helpers.intent_matcher import IntentMatcher, PhraseRegistry, normalize_text
+
+PHRASES = {
+    "turn_on": ["turn on {target}", "turn {target} on", "schalte {target} ein"],
+    "turn_off": ["turn off {target}", "schalte {target} aus"],
+    "cause_error": ["cause error"],
+}
+
+
+def test_normalize_text_pads_and_drops_punctuation():
+    assert normalize_text("Turn ON, the Light!") == " turn on the light "
+
+
+def test_slots_are_read_between_literals():
+    matcher = IntentMatcher(PHRASES)
+    match = matcher.match("Turn the kitchen light on.")
+    assert (match.intent, match.slots) == ("turn_on", {"target": "the kitchen light"})
+    assert matcher.match("Schalte das Licht aus").slots == {"target": "das licht"}
+
+
+def test_literals_match_whole_words_only():
+    matcher = IntentMatcher(PHRASES)
+    assert matcher.match("return on investment") is None
+    assert matcher.match("turn on") is None
+    assert matcher.match("please cause error now").intent == "cause_error"
+
+
+def test_match_all_ranks_by_literal_text():
+    matcher = IntentMatcher(PHRASES)
+    matches = matcher.match_all("turn on the fan on")
+    assert {match.pattern for match in matches} == {"turn on {target}", "turn {target} on"}
+    assert [match.score for match in matches] == sorted((match.score for match in matches), reverse=True)
+    assert matcher.match("turn on the fan on") == matches[0]
+
+
+def test_broken_phrase_file_keeps_previous_matcher(tmp_path):
+    path = tmp_path / "phrases.json"
+    path.write_text(json.dumps(PHRASES), encoding="utf-8")
+    registry = PhraseRegistry(str(path), check_interval=0.0)
+    assert registry.match("turn off the fan").intent == "turn_off"
+
+    path.write_text("{ not json", encoding="utf-8")
+    assert registry.reload() is False
+    assert registry.match("turn off the fan").intent == "turn_off"
+
+
+def test_watch_picks_up_changed_phrases(tmp_path):
+    path = tmp_path / "phrases.json"
+    path.write_text(json.dumps(PHRASES), encoding="utf-8")
+    registry = PhraseRegistry(str(path), check_interval=0.01)
+
+    async def scenario():
+        registry.start()
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if registry.match("good morning") is not None:
+                break
+        await registry.stop()
+
+    path.write_text(json.dumps({**PHRASES, "greet": ["good morning"]}), encoding="utf-8")
+    # match() itself never reads the file
+    assert registry.match("good morning") is None
+    asyncio.run(scenario())
+    assert registry.match("good morning").intent == "greet"
@@ -0,0 +1,161 @@
+# test_plugin_loader.py
+import asyncio
+import os
+import sys
+
+from ServerInterface.Helpers.plugin_loader import PluginLoader
+
+
+class BaseExecutor:
+    pass
+
+
+PLUGIN = """
+class EchoExecutor(BaseExecutor):
+    answer = {answer!r}
+
+EXECUTORS = {{"echo": EchoExecutor}}
+"""
+
+
+class FakeRegistry:
+    """ExecutorRegistry stand-in whose replaced executors stay busy until released."""
+
+    def __init__(self):
+        self.executors = {}
+        self.swaps = 0
+        self.released = asyncio.Event()
+
+    def classes(self):
+        return {name: type(executor) for name, executor in self.executors.items()}
+
+    def swap(self, changes):
+        replaced = [self.executors[name] for name in changes if name in self.executors]
+        for name, executor_class in changes.items():
+            if executor_class is None:
+                self.executors.pop(name, None)
+            else:
+                self.executors[name] = executor_class()
+        self.swaps += 1
+        return replaced
+
+    async def drain(self, executors, timeout):
+        if not executors:
+            return True
+        try:
+            await asyncio.wait_for(self.released.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+def write_plugin(directory, answer):
+    with open(os.path.join(directory, "echo.py"), "w") as plugin_file:
+        plugin_file.write(PLUGIN.format(answer=answer))
+
+
+def make_loader(tmp_path, registry, drain_timeout=5.0):
+    return PluginLoader(
+        registry, str(tmp_path), BaseExecutor, namespace={"BaseExecutor": BaseExecutor}, drain_timeout=drain_timeout
+    )
+
+
+def test_reload_does_not_wait_for_a_previous_drain(tmp_path):
+    registry = FakeRegistry()
+    loader = make_loader(tmp_path, registry)
+
+    async def scenario():
+        write_plugin(tmp_path, "one")
+        await loader.reload()
+        write_plugin(tmp_path, "second")
+        # Replaces "one", which is still in use
+        draining = asyncio.ensure_future(loader.reload())
+        await asyncio.sleep(0.05)
+        assert not draining.done()
+
+        write_plugin(tmp_path, "third one")
+        later = asyncio.ensure_future(loader.reload())
+        for _ in range(100):
+            if registry.swaps == 3:
+                break
+            await asyncio.sleep(0.01)
+        # Swapped while the previous reload is still draining
+        assert registry.swaps == 3
+        assert not draining.done()
+        registry.released.set()
+        return await asyncio.gather(draining, later)
+
+    reports = asyncio.run(scenario())
+    assert [report["drained"] for report in reports] == [True, True]
+    assert registry.executors["echo"].answer == "third one"
+
+
+def test_retired_module_is_dropped_after_drain(tmp_path):
+    registry = FakeRegistry()
+    registry.released.set()
+    loader = make_loader(tmp_path, registry)
+
+    async def scenario():
+        write_plugin(tmp_path, "one")
+        await loader.reload()
+        first_module = type(registry.executors["echo"]).__module__
+        write_plugin(tmp_path, "three")
+        await loader.reload()
+        return first_module, type(registry.executors["echo"]).__module__
+
+    first_module, second_module = asyncio.run(scenario())
+    assert first_module not in sys.modules
+    assert second_module in sys.modules
+
+
+def test_drain_timeout_is_reported(tmp_path):
+    registry = FakeRegistry()
+    loader = make_loader(tmp_path, registry, drain_timeout=0.05)
+
+    async def scenario():
+        write_plugin(tmp_path, "one")
+        await loader.reload()
+        write_plugin(tmp_path, "three")
+        return await loader.reload()
+
+    assert asyncio.run(scenario())["drained"] is False
+    assert loader.stats()["drain_timeouts"] == 1
+
+
+def test_failing_plugin_keeps_previous_version(tmp_path):
+    registry = FakeRegistry()
+    registry.released.set()
+    loader = make_loader(tmp_path, registry)
+
+    async def scenario():
+        write_plugin(tmp_path, "one")
+        await loader.reload()
+        with open(os.path.join(tmp_path, "echo.py"), "w") as plugin_file:
+            plugin_file.write("EXECUTORS = {'echo': object}\n")
+        return await loader.reload()
+
+    report = asyncio.run(scenario())
+    assert list(report["failed"]) == [os.path.join(str(tmp_path), "echo.py")]
+    assert registry.executors["echo"].answer == "one"
+    assert "echo.py" in loader.stats()["failing"]
+
+
+def test_watcher_keeps_swapping_while_draining(tmp_path):
+    registry = FakeRegistry()
+    loader = PluginLoader(
+        registry, str(tmp_path), BaseExecutor, namespace={"BaseExecutor": BaseExecutor}, poll_interval=0.01
+    )
+
+    async def scenario():
+        write_plugin(tmp_path, "one")
+        loader.start()
+        for answer in ("second", "third one"):
+            await asyncio.sleep(0.05)
+            write_plugin(tmp_path, answer)
+        await asyncio.sleep(0.05)
+        answer = registry.executors["echo"].answer
+        await loader.stop()
+        return answer
+
+    assert asyncio.run(scenario()) == "third one"
+    assert registry.swaps == 3
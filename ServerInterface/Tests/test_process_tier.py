@@ -0,0 +1,51 @@
+# test_process_tier.py
+import asyncio
+import os
+import time
+
+import pytest
+
+from ServerInterface.Helpers.process_tier import ProcessTier, ProcessTierBusy, ProcessTierCrashed
+
+
+def crash():
+    os._exit(1)
+
+
+def slow_square(value):
+    time.sleep(0.5)
+    return value * value
+
+
+def test_crash_fails_every_call_in_the_pool_and_restarts_once():
+    async def scenario():
+        tier = ProcessTier(max_workers=2, max_queued=2)
+        await tier.start()
+        try:
+            results = await asyncio.gather(tier.run(slow_square, 3), tier.run(crash), return_exceptions=True)
+            assert all(isinstance(result, ProcessTierCrashed) for result in results)
+            assert await tier.run(slow_square, 4) == 16
+            return tier.stats()
+        finally:
+            tier.shutdown()
+
+    stats = asyncio.run(scenario())
+    assert stats["crashes"] == 1
+    assert stats["restarts"] == 1
+    assert stats["failed_calls"] == 2
+
+
+def test_full_tier_rejects_calls():
+    async def scenario():
+        tier = ProcessTier(max_workers=1, max_queued=0)
+        await tier.start()
+        try:
+            first = asyncio.ensure_future(tier.run(slow_square, 2))
+            await asyncio.sleep(0)
+            with pytest.raises(ProcessTierBusy):
+                await tier.run(slow_square, 3)
+            assert await first == 4
+        finally:
+            tier.shutdown()
+
+    asyncio.run(scenario())
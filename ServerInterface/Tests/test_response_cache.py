@@ -0,0 +1,54 @@
+# test_response_cache.py
+import time
+
+from ServerInterface.Helpers.response_cache import ResponseCache
+
+STATES = {"light.kitchen": "off", "light.helix": "on"}
+
+
+def test_key_only_depends_on_listed_entities():
+    key = ResponseCache.make_key("turn on the light", "en", STATES, ["light.kitchen"])
+    assert key == ResponseCache.make_key("turn on the light", "en", {**STATES, "light.helix": "off"}, ["light.kitchen"])
+    assert key != ResponseCache.make_key("turn on the light", "en", {**STATES, "light.kitchen": "on"}, ["light.kitchen"])
+
+
+def test_key_keeps_the_utterance_as_spoken():
+    # Cached responses may quote the utterance
+    assert ResponseCache.make_key("Turn on the light", "en", STATES, []) != ResponseCache.make_key(
+        "turn on the light", "en", STATES, []
+    )
+
+
+def test_invalidation_drops_dependent_entries():
+    cache = ResponseCache()
+    kitchen = ResponseCache.make_key("kitchen", "en", STATES, ["light.kitchen"])
+    helix = ResponseCache.make_key("helix", "en", STATES, ["light.helix"])
+    cache.put(kitchen, "kitchen answer", ["light.kitchen"])
+    cache.put(helix, "helix answer", ["light.helix"])
+
+    assert cache.invalidate_entities(["light.kitchen", "switch.unknown"]) == 1
+    assert cache.get(kitchen) is None
+    assert cache.get(helix) == "helix answer"
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.put(("a",), 1, [])
+    cache.put(("b",), 2, [])
+    cache.get(("a",))
+    cache.put(("c",), 3, [])
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) == 1
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entry_is_a_miss():
+    cache = ResponseCache(ttl=0.01)
+    cache.put(("a",), 1, ["light.kitchen"])
+    time.sleep(0.02)
+    assert cache.get(("a",)) is None
+    stats = cache.stats()
+    assert (stats["expirations"], stats["size"]) == (1, 0)
+    # The dependency index is cleaned up as well
+    assert cache.invalidate_entities(["light.kitchen"]) == 0
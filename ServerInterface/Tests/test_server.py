@@ -0,0 +1,179 @@
+# test_server.py
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+httpx = pytest.importorskip("httpx")
+
+from ServerInterface.Controller import server
+from ServerInterface.Helpers.deadline import Deadline
+from ServerInterface.Helpers.shared_models import ProcessRequest
+
+
+class HangingClient:
+    """AutoFunction that never answers; honours the timeout like httpx does."""
+
+    async def post(self, url, content=None, headers=None, timeout=None):
+        await asyncio.sleep(timeout)
+        raise httpx.ReadTimeout("AutoFunction hung")
+
+
+def make_request(text="turn on the kitchen light"):
+    return ProcessRequest(
+        user_input={"text": text, "language": "en", "conversation_id": "c1", "device_id": None},
+        states={"light.kitchen": {"state": "off", "name": "Kitchen", "area": "Küche"}},
+        config={}
+    )
+
+
+@pytest.fixture
+def hanging_auto_function(monkeypatch):
+    monkeypatch.setattr(server, "http_client", HangingClient())
+    monkeypatch.setattr(server, "PROCESS_MODE", "sequential")
+    server.response_cache.clear()
+
+
+def test_sequential_falls_back_to_local_when_auto_function_hangs(hanging_auto_function):
+    started = time.monotonic()
+    response = asyncio.run(server.compute_response(make_request(), None, Deadline(1.0)))
+    assert time.monotonic() - started < 1.0
+    assert response.error is None
+    assert response.response.endswith("remote")
+    assert response.commands[0].data == {"entity_id": "light.kitchen"}
+
+
+def test_stream_falls_back_to_local_when_auto_function_hangs(hanging_auto_function):
+    async def collect():
+        return [event async for event in server.compute_events(make_request(), None, None, Deadline(1.0))]
+
+    events = asyncio.run(collect())
+    assert [event.type for event in events][-1] == "done"
+    assert any(event.type == "commands" for event in events)
+
+
+class UnreachableAudioService:
+    """Audio service that fails after reading part of the upload (or none with read=0)."""
+
+    def __init__(self, read: int):
+        self.read = read
+
+    async def post(self, url, content=None, headers=None, timeout=None):
+        seen = 0
+        async for _ in content:
+            seen += 1
+            if seen > self.read:
+                break
+        raise httpx.ConnectError("audio service unreachable")
+
+
+async def audio_upload(count: int, size: int):
+    for _ in range(count):
+        await asyncio.sleep(0)
+        yield b"a" * size
+
+
+@pytest.mark.parametrize("read", [0, 3])
+def test_stored_size_equals_upload_size_when_forwarding_fails(monkeypatch, read):
+    monkeypatch.setattr(server, "http_client", UnreachableAudioService(read))
+    server.audio_store.clear()
+    response = asyncio.run(server.forward_audio(audio_upload(40, 4096), "clip.wav", "c-audio", "audio/wav"))
+    body = server.codec_for_content_type("application/json").loads(response.body)
+    assert body["forward_status"] == "failed"
+    assert body["stored"] is True
+    assert body["size"] == 40 * 4096
+    assert server.audio_store.get("c-audio").size == 40 * 4096
+
+
+def test_plugin_swap_invalidates_cached_responses():
+    class PluginResponseExecutor(server.ResponseExecutor):
+        async def execute(self, config, context):
+            return server.ProcessResponse(response="plugin", commands=None, conversation_id=None)
+
+    server.response_cache.clear()
+    generation = server.registry.generation
+    try:
+        first = asyncio.run(server.run_local(make_request(), None, Deadline(1.0)))
+        assert first.response.endswith("remote")
+        server.registry.swap({"response": PluginResponseExecutor})
+        assert server.registry.generation != generation
+        second = asyncio.run(server.run_local(make_request(), None, Deadline(1.0)))
+        assert "plugin" in second.response and "remote" not in second.response
+    finally:
+        server.registry.swap({"response": server.ResponseExecutor})
+    # Swapping back restores the generation the first answer was cached under
+    assert server.registry.generation == generation
+
+
+def test_identical_concurrent_requests_are_computed_once(monkeypatch):
+    calls = []
+
+    async def counting_compute_response(request, entity_index, deadline):
+        calls.append(request.user_input.text)
+        await asyncio.sleep(0.05)
+        return server.ProcessResponse(response="done", commands=None, conversation_id=request.user_input.conversation_id)
+
+    monkeypatch.setattr(server, "compute_response", counting_compute_response)
+
+    def synced_request(conversation_id):
+        request = make_request()
+        return request.copy(update={
+            "user_input": request.user_input.copy(update={"conversation_id": conversation_id}),
+            "state_sync": server.StateSync(client_id="coalesce-client", version=1),
+        })
+
+    async def scenario():
+        return await asyncio.gather(
+            server.handle_process(synced_request("c1"), Deadline(1.0)),
+            server.handle_process(synced_request("c2"), Deadline(1.0)),
+        )
+
+    first, second = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert (first.response, second.response) == ("done", "done")
+    assert (first.conversation_id, second.conversation_id) == ("c1", "c2")
+    assert first.state_version == second.state_version == 1
+
+
+def test_cached_response_keeps_the_callers_wording():
+    server.response_cache.clear()
+    first = asyncio.run(server.run_local(make_request("Turn on the kitchen light"), None, Deadline(1.0)))
+    second = asyncio.run(server.run_local(make_request("turn on the kitchen light"), None, Deadline(1.0)))
+    assert first.response.startswith("Turn on the kitchen light")
+    assert second.response.startswith("turn on the kitchen light")
+
+
+class SlowAutoFunction:
+    """AutoFunction that answers after delay seconds, well past AUTO_FUNCTION_GRACE."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def post(self, url, content=None, headers=None, timeout=None):
+        await asyncio.sleep(self.delay)
+        body = server.codec_for_content_type("application/json").dumps(
+            {"response": "from auto function", "commands": None, "conversation_id": "c1"}
+        )
+        return httpx.Response(200, content=body, headers={"content-type": "application/json"})
+
+
+@pytest.fixture
+def failing_local(monkeypatch):
+    async def broken_run_local(request, entity_index, deadline):
+        raise RuntimeError("executor failed")
+
+    monkeypatch.setattr(server, "run_local", broken_run_local)
+    monkeypatch.setattr(server, "PROCESS_MODE", "race")
+
+
+def test_race_waits_for_auto_function_when_local_fails(monkeypatch, failing_local):
+    monkeypatch.setattr(server, "http_client", SlowAutoFunction(server.AUTO_FUNCTION_GRACE + 0.2))
+    response = asyncio.run(server.compute_response(make_request(), None, Deadline(1.0)))
+    assert response.response == "from auto function"
+
+
+def test_race_raises_local_error_when_both_fail(monkeypatch, failing_local):
+    monkeypatch.setattr(server, "http_client", HangingClient())
+    with pytest.raises(RuntimeError):
+        asyncio.run(server.compute_response(make_request(), None, Deadline(0.3)))
@@ -0,0 +1,129 @@
+# test_shared_state.py
+import asyncio
+from typing import List, NamedTuple, Optional
+
+import pytest
+
+from ServerInterface.Helpers.shared_state import (
+    SharedResponseCache,
+    SharedSpanBuffer,
+    SharedStateDB,
+    SharedStateMirrorStore,
+)
+from ServerInterface.Helpers.tracing import SpanRecord
+
+
+class Sync(NamedTuple):
+    client_id: str
+    version: int
+    base_version: Optional[int] = None
+    removed: List[str] = []
+
+
+SNAPSHOT = {"light.kitchen": "off", "light.helix": "on", "switch.kettle": "off"}
+
+
+@pytest.fixture
+def databases(tmp_path):
+    """Two workers' connections to the same file."""
+    path = str(tmp_path / "state.sqlite")
+    first, second = SharedStateDB(path), SharedStateDB(path)
+    yield first, second
+    first.close()
+    second.close()
+
+
+def test_mirror_delta_round_trip_between_workers(databases):
+    first, second = (SharedStateMirrorStore(db) for db in databases)
+
+    async def scenario():
+        await first.sync(SNAPSHOT, Sync("ha", 1))
+        # The other worker loads the snapshot and applies a delta on top of it
+        mirror = await second.sync({"light.kitchen": "on"}, Sync("ha", 2, 1, ["switch.kettle"]))
+        assert mirror.states == {"light.kitchen": "on", "light.helix": "on"}
+        # The first worker only fetches what changed since its version
+        return await first.sync({"light.helix": "off"}, Sync("ha", 3, 2))
+
+    mirror = asyncio.run(scenario())
+    assert mirror.version == 3
+    assert mirror.states == {"light.kitchen": "on", "light.helix": "off"}
+    assert mirror.index.entities_in_domain("switch") == set()
+
+
+def test_mirror_delta_writes_only_changed_rows(databases):
+    store = SharedStateMirrorStore(databases[0])
+
+    async def scenario():
+        await store.sync(SNAPSHOT, Sync("ha", 1))
+        await store.sync({"light.kitchen": "on"}, Sync("ha", 2, 1, ["switch.kettle"]))
+
+    asyncio.run(scenario())
+    rows = dict(databases[0].query("SELECT entity_id, version FROM state_mirror_entities WHERE client_id = 'ha'"))
+    assert rows == {"light.kitchen": 2, "light.helix": 1, "switch.kettle": 2}
+
+
+def test_mirror_snapshot_replaces_other_workers_copy(databases):
+    first, second = (SharedStateMirrorStore(db) for db in databases)
+
+    async def scenario():
+        await first.sync(SNAPSHOT, Sync("ha", 1))
+        await second.sync({}, Sync("ha", 1, 1))
+        # The client restarted and starts over at a lower version
+        await first.sync({"light.helix": "on"}, Sync("ha", 1))
+        return await second.sync({"light.helix": "off"}, Sync("ha", 2, 1))
+
+    mirror = asyncio.run(scenario())
+    assert mirror.states == {"light.helix": "off"}
+
+
+def test_mirror_unknown_base_version_needs_snapshot(databases):
+    first, second = (SharedStateMirrorStore(db) for db in databases)
+
+    async def scenario():
+        assert await second.sync({}, Sync("ha", 2, 1)) is None
+        await first.sync(SNAPSHOT, Sync("ha", 1))
+        assert await second.sync({}, Sync("ha", 5, 4)) is None
+
+    asyncio.run(scenario())
+
+
+def test_spans_are_written_in_one_batch(databases):
+    db = databases[0]
+    buffer = SharedSpanBuffer(db, capacity=3)
+    for index in range(5):
+        buffer.add(SpanRecord("trace", f"span{index}", None, "server", "stage", float(index), 0.1, {"n": index}))
+
+    # Not written yet, but visible to this worker
+    assert db.query("SELECT COUNT(*) FROM spans")[0][0] == 0
+    assert len(buffer.trace("trace")) == 5
+    assert buffer.recent_traces() == ["trace"]
+
+    assert db.flush() == 1
+    spans = buffer.trace("trace")
+    assert [span.span_id for span in spans] == ["span2", "span3", "span4"]
+    assert spans[0].attributes == {"n": 2}
+    assert buffer.stats()["spans"] == 3
+
+
+def test_response_cache_is_shared_after_flush(databases):
+    first, second = (SharedResponseCache(db) for db in databases)
+    key = first.make_key("turn on the light", "en", {"light.kitchen": "off"}, ["light.kitchen"])
+    first.put(key, {"response": "done"}, ["light.kitchen"])
+
+    assert second.get(key) is None
+    databases[0].flush()
+    assert second.get(key) == {"response": "done"}
+
+    second.invalidate_entities(["light.kitchen"])
+    databases[1].flush()
+    assert first.get(key) is None
+    assert second.stats()["invalidations"] == 1
+
+
+def test_response_cache_clear_drops_queued_entries(databases):
+    cache = SharedResponseCache(databases[0])
+    key = cache.make_key("hello", "en", {}, [])
+    cache.put(key, "hi", [])
+    cache.clear()
+    databases[0].flush()
+    assert cache.get(key) is None
@@ -0,0 +1,64 @@
+# test_single_flight.py
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from ServerInterface.Helpers.single_flight import LeaderCancelled, SingleFlight, dedupe_commands
+
+
+def test_concurrent_calls_share_one_computation():
+    flights = SingleFlight(window=0.05)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def scenario():
+        return await asyncio.gather(*(flights.do("key", compute) for _ in range(3)))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert [leader for _, leader in results] == [True, False, False]
+    assert {result for result, _ in results} == {"result"}
+
+
+def test_result_is_kept_for_the_window():
+    flights = SingleFlight(window=0.05)
+
+    async def scenario():
+        await flights.do("key", lambda: asyncio.sleep(0))
+        _, leader_in_window = await flights.do("key", lambda: asyncio.sleep(0))
+        await asyncio.sleep(0.1)
+        _, leader_after_window = await flights.do("key", lambda: asyncio.sleep(0))
+        return leader_in_window, leader_after_window
+
+    assert asyncio.run(scenario()) == (False, True)
+
+
+def test_cancelled_leader_fails_followers():
+    flights = SingleFlight()
+
+    async def scenario():
+        leader = asyncio.ensure_future(flights.do("key", lambda: asyncio.sleep(1)))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.do("key", lambda: asyncio.sleep(0)))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(LeaderCancelled):
+            await follower
+        # Failures are not kept, the next call leads again
+        return await flights.do("key", lambda: asyncio.sleep(0, "again"))
+
+    assert asyncio.run(scenario()) == ("again", True)
+
+
+def test_dedupe_commands_across_a_stream():
+    def command(entity_id):
+        return SimpleNamespace(domain="light", service="turn_on", data={"entity_id": entity_id})
+
+    seen = set()
+    assert len(dedupe_commands([command("light.a"), command("light.a"), command("light.b")], seen)) == 2
+    assert dedupe_commands([command("light.b")], seen) is None
@@ -0,0 +1,71 @@
+# test_state_mirror.py
+import asyncio
+from typing import List, NamedTuple, Optional
+
+from ServerInterface.Helpers.entity_index import EntityIndex
+from ServerInterface.Helpers.state_mirror import StateMirrorStore
+
+
+class Sync(NamedTuple):
+    client_id: str
+    version: int
+    base_version: Optional[int] = None
+    removed: List[str] = []
+
+
+SNAPSHOT = {
+    "light.kitchen": {"state": "off", "name": "Kitchen Light", "area": "Kitchen"},
+    "light.helix": {"state": "on", "name": "Helix", "area": "Living Room"},
+    "switch.kettle": "off",
+}
+
+
+def test_delta_round_trip():
+    store = StateMirrorStore()
+    asyncio.run(store.sync(SNAPSHOT, Sync("ha", 1)))
+    mirror = asyncio.run(store.sync(
+        {"light.kitchen": {"state": "on", "name": "Kitchen Light", "area": "Kitchen"}},
+        Sync("ha", 2, base_version=1, removed=["switch.kettle"]),
+    ))
+
+    assert mirror.version == 2
+    assert mirror.states["light.kitchen"]["state"] == "on"
+    assert "switch.kettle" not in mirror.states
+    assert mirror.index.entities_in_domain("switch") == set()
+
+
+def test_cumulative_delta_applies_on_newer_mirror():
+    store = StateMirrorStore()
+    asyncio.run(store.sync(SNAPSHOT, Sync("ha", 1)))
+    asyncio.run(store.sync({"switch.kettle": "on"}, Sync("ha", 2, base_version=1)))
+    # The client did not see the ack of version 2 and resends from 1
+    mirror = asyncio.run(store.sync({"switch.kettle": "on", "light.helix": "off"}, Sync("ha", 3, base_version=1)))
+    assert mirror.version == 3
+    assert mirror.states["light.helix"] == "off"
+
+
+def test_unknown_base_version_needs_snapshot():
+    store = StateMirrorStore()
+    assert asyncio.run(store.sync({}, Sync("ha", 2, base_version=1))) is None
+    asyncio.run(store.sync(SNAPSHOT, Sync("ha", 1)))
+    assert asyncio.run(store.sync({}, Sync("ha", 5, base_version=4))) is None
+
+
+def test_least_recent_client_is_evicted():
+    store = StateMirrorStore(max_clients=2)
+    for client_id in ("a", "b", "c"):
+        asyncio.run(store.sync(SNAPSHOT, Sync(client_id, 1)))
+    assert store.get("a") is None
+    assert store.get("c") is not None
+
+
+def test_entity_index_resolves_names_and_areas():
+    index = EntityIndex(SNAPSHOT)
+    assert index.resolve("helix") == ["light.helix"]
+    assert index.resolve("kitchen lights") == ["light.kitchen"]
+    assert index.resolve("all lights") == ["light.helix", "light.kitchen"]
+
+    index.update({"light.helix": {"state": "on", "name": "Sofa", "area": "Living Room"}}, ["light.kitchen"])
+    assert index.resolve("sofa") == ["light.helix"]
+    assert index.resolve("living room") == ["light.helix"]
+    assert index.resolve("kitchen lights") == []
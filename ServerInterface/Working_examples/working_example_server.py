@@ -1,10 +1,11 @@
 """External processing server for Home Assistant conversation integration."""
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import uvicorn
 import traceback
 import sys
+from custom_components.extended_openai_conversation.ServerInterface.Helpers.codec import decode_request, encode_response
 
 app = FastAPI()
 
@@ -54,8 +55,14 @@ async def health_check():
     return {"status": "healthy"}
 
 @app.post("/process", response_model=ProcessResponse)
-async def process_request(request: ProcessRequest):
-    """Process a conversation request."""
+async def process_request(raw: Request):
+    """Process a conversation request (JSON or msgpack body, negotiated response)."""
+    request, error_response = await decode_request(raw, lambda payload: ProcessRequest(**payload))
+    if error_response is not None:
+        return error_response
+    return encode_response(handle_process(request), raw.headers.get("accept"))
+
+def handle_process(request: ProcessRequest) -> ProcessResponse:
     try:
         # Simulate an error for testing
         if "cause error" in request.user_input.text.lower():
@@ -1,27 +1,80 @@
 """The Extended Conversation Client integration."""
 from homeassistant.components import conversation
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
 from homeassistant.helpers import intent
 from homeassistant.exceptions import HomeAssistantError, ConfigEntryNotReady
 import aiohttp
 import asyncio
+import voluptuous as vol
+import json
 import logging
-from typing import Optional
+import time
+from collections.abc import AsyncIterator
+from functools import partial
+from typing import Callable, Optional
 
 from .ServerInterface.Helpers.shared_models import (
+    SCHEMA_VERSION,
     ProcessRequest,
     UserInput,
     ProcessResponse,
-    ErrorDetails
+    ErrorDetails,
+    Command,
+    StreamEvent
 )
 
+from .ServerInterface.Helpers.codec import (
+    ACCEPT_POST_HEADER,
+    accept_header,
+    codec_for_content_type,
+    negotiate,
+)
+from .ServerInterface.Helpers.deadline import REQUEST_BUDGET_HEADER
+from .ServerInterface.Helpers.intent_matcher import PhraseRegistry
+from .ServerInterface.Helpers.metrics import (
+    CLIENT_TIMING_HEADER,
+    FALLBACK_PREFIX,
+    SERVER_TIMING_HEADER,
+    format_timing,
+)
+from .ServerInterface.Helpers.tracing import (
+    TRACEPARENT_HEADER,
+    Tracer,
+    trace_header,
+    waterfall,
+)
+from .ServerInterface.Helpers.ws_protocol import (
+    PUSH_COMMANDS,
+    PUSH_PROGRESS,
+    PUSH_STATE_REQUEST,
+)
+from .backend_pool import Backend, BackendPool, parse_server_urls
+from .command_executor import CommandExecutor, CommandResult
+from .state_snapshot import StateSnapshot
+from .ws_channel import WebSocketChannel
 from .const import (
     DOMAIN,
     CONF_SERVER_URL,
     DEFAULT_SERVER_URL,
     CONF_SERVER_ENABLED,
-    DEFAULT_SERVER_ENABLED
+    DEFAULT_SERVER_ENABLED,
+    CONF_STREAMING,
+    DEFAULT_STREAMING,
+    CONF_HEDGING,
+    DEFAULT_HEDGING,
+    CONF_COMMAND_CONCURRENCY,
+    DEFAULT_COMMAND_CONCURRENCY,
+    CONF_TRANSPORT,
+    DEFAULT_TRANSPORT,
+    TRANSPORT_WEBSOCKET,
+    CONF_EXPOSED_ONLY,
+    DEFAULT_EXPOSED_ONLY,
+    CONF_STATE_DOMAINS,
+    DEFAULT_STATE_DOMAINS,
+    SERVICE_GET_TRACE,
+    ATTR_TRACE_ID,
+    TRACE_SERVICE_NAME
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -32,49 +85,105 @@ async def async_setup(hass: HomeAssistant, config) -> bool:
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Extended Conversation Client from a config entry."""
+    server_urls = parse_server_urls(entry.options.get(CONF_SERVER_URL, DEFAULT_SERVER_URL))
+
+    domains = entry.options.get(CONF_STATE_DOMAINS, DEFAULT_STATE_DOMAINS)
+    snapshot = StateSnapshot(
+        hass,
+        domains={domain.strip() for domain in domains.split(",") if domain.strip()},
+        exposed_only=entry.options.get(CONF_EXPOSED_ONLY, DEFAULT_EXPOSED_ONLY),
+    )
+    backends = BackendPool(
+        [Backend(hass, url, entry.entry_id, snapshot) for url in server_urls],
+        hedging=entry.options.get(CONF_HEDGING, DEFAULT_HEDGING),
+    )
     try:
-        # Test server connection
-        server_url = entry.options.get(CONF_SERVER_URL, DEFAULT_SERVER_URL)
-        _LOGGER.info("Attempting to connect to server at %s", server_url)
-        
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.get(f"{server_url}/health", timeout=10) as response:
-                    if response.status != 200:
-                        _LOGGER.error("Server returned status %s", response.status)
-                        raise ConfigEntryNotReady(f"Server returned status {response.status}")
-                    _LOGGER.info("Successfully connected to server")
-            except aiohttp.ClientError as err:
-                _LOGGER.error("Connection error: %s", str(err))
-                raise ConfigEntryNotReady(f"Connection error: {err}")
-            except asyncio.TimeoutError:
-                _LOGGER.error("Connection timeout")
-                raise ConfigEntryNotReady("Connection timeout")
-            
+        # Test server connections
+        _LOGGER.info("Attempting to connect to servers at %s", ", ".join(server_urls))
+        if not await backends.async_start():
+            raise ConfigEntryNotReady("No server is reachable")
+        _LOGGER.info("Successfully connected to server")
+
     except Exception as err:
+        await backends.async_close()
         _LOGGER.error("Failed to connect to server: %s", str(err), exc_info=True)
         raise ConfigEntryNotReady(f"Failed to connect to server: {err}")
 
-    agent = ExternalServerAgent(hass, entry)
-    hass.data.setdefault(DOMAIN, {}).setdefault(entry.entry_id, {})
+    snapshot.async_start()
+
+    phrases = await hass.async_add_executor_job(PhraseRegistry)
+
+    agent = ExternalServerAgent(hass, entry, backends, phrases)
+    if entry.options.get(CONF_TRANSPORT, DEFAULT_TRANSPORT) == TRANSPORT_WEBSOCKET:
+        for backend in backends.backends:
+            backend.channel = WebSocketChannel(
+                hass, backend.pool, partial(agent.async_handle_push, backend)
+            )
+            backend.channel.async_start()
+    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {
+        "backends": backends,
+        "snapshot": snapshot,
+        "tracer": agent.tracer,
+    }
     conversation.async_set_agent(hass, entry, agent)
+    if not hass.services.has_service(DOMAIN, SERVICE_GET_TRACE):
+        hass.services.async_register(
+            DOMAIN,
+            SERVICE_GET_TRACE,
+            partial(_async_get_trace, hass),
+            schema=vol.Schema({vol.Required(ATTR_TRACE_ID): str}),
+            supports_response=SupportsResponse.ONLY,
+        )
     return True
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload Extended Conversation Client."""
-    hass.data[DOMAIN].pop(entry.entry_id)
+    data = hass.data[DOMAIN].pop(entry.entry_id)
     conversation.async_unset_agent(hass, entry)
+    data["snapshot"].async_stop()
+    await data["backends"].async_close()
+    if not hass.data[DOMAIN]:
+        hass.services.async_remove(DOMAIN, SERVICE_GET_TRACE)
     return True
 
+async def _async_get_trace(hass: HomeAssistant, call: ServiceCall) -> ServiceResponse:
+    """Return the end-to-end waterfall of one trace: our spans plus those of the servers."""
+    trace_id = call.data[ATTR_TRACE_ID]
+    spans = []
+    for data in hass.data[DOMAIN].values():
+        spans.extend(data["tracer"].trace(trace_id))
+        for backend in data["backends"].backends:
+            try:
+                spans.extend(await backend.pool.async_get_trace(trace_id))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                _LOGGER.debug("Could not fetch spans from %s: %s", backend.url, err)
+    return {"trace_id": trace_id, "spans": waterfall(spans)}
+
 class ExternalServerAgent(conversation.AbstractConversationAgent):
     """Agent that delegates processing to external server."""
 
-    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        backends: BackendPool,
+        phrases: PhraseRegistry,
+    ) -> None:
         """Initialize the agent."""
         self.hass = hass
         self.entry = entry
+        self.backends = backends
+        self.phrases = phrases
         self.server_enabled = entry.options.get(CONF_SERVER_ENABLED, DEFAULT_SERVER_ENABLED)
-        self.server_url = entry.options.get(CONF_SERVER_URL, DEFAULT_SERVER_URL)
+        self.streaming = entry.options.get(CONF_STREAMING, DEFAULT_STREAMING)
+        self.command_executor = CommandExecutor(
+            hass,
+            entry.options.get(CONF_COMMAND_CONCURRENCY, DEFAULT_COMMAND_CONCURRENCY),
+        )
+        # Stage times of the previous request, sent along with the next one for the server's /metrics
+        self._client_timing: Optional[str] = None
+        # Spans of recent turns, queried with the get_trace service
+        self.tracer = Tracer(TRACE_SERVICE_NAME)
 
     @property
     def supported_languages(self) -> list[str]:
@@ -90,7 +199,10 @@ class ExternalServerAgent(conversation.AbstractConversationAgent):
                 _LOGGER.info("Server is disabled, using local processing")
                 return await self._process_locally(user_input)
 
-            return await self._process_with_server(user_input)
+            # Root of the trace; the id travels to the servers in the traceparent header
+            with self.tracer.span("conversation") as trace:
+                _LOGGER.debug("Processing %r in trace %s", user_input.text, trace.trace_id)
+                return await self._process_with_server(user_input)
 
         except Exception as err:
             _LOGGER.error("Error processing request: %s", err)
@@ -105,107 +217,329 @@ class ExternalServerAgent(conversation.AbstractConversationAgent):
             )
 
     async def _process_with_server(
-                self, user_input: conversation.ConversationInput
-            ) -> conversation.ConversationResult:
-                """Process request using external server."""
+        self, user_input: conversation.ConversationInput
+    ) -> conversation.ConversationResult:
+        """Process request using external server."""
+        # Streamed commands start executing while the rest of the response arrives
+        command_tasks: list[asyncio.Task] = []
+        # Once commands of this turn ran, a fallback must not run them again
+        commands_ran = False
+
+        def _on_commands(commands: list[Command]) -> None:
+            nonlocal commands_ran
+            commands_ran = True
+            command_tasks.append(
+                self.hass.async_create_task(self._async_execute_commands(commands))
+            )
+
+        timings: dict[str, Optional[float]] = {}
+        started = time.perf_counter()
+        try:
+            response_obj = await self.backends.async_request(
+                lambda backend, on_commands: self._async_send(
+                    backend, user_input, on_commands, timings
+                ),
+                _on_commands,
+            )
+            if response_obj is None:
+                self._record_timing(timings, started, "no_response")
+                return await self._process_locally(user_input, execute_commands=not commands_ran)
+
+            # Check for error in response
+            if response_obj.error:
+                error_details = response_obj.error
+                _LOGGER.error("Server error: %s", error_details.traceback)
+                self._record_timing(timings, started, "server_error")
+                return await self._process_locally(user_input, execute_commands=not commands_ran)
+
+            # Execute any commands returned by server
+            commands_started = time.perf_counter()
+            if response_obj.commands:
+                commands_ran = True
+                await self._async_execute_commands(response_obj.commands)
+            if command_tasks:
+                await asyncio.gather(*command_tasks)
+            timings["commands"] = time.perf_counter() - commands_started
+            self._record_timing(timings, started)
+
+            # Return the response
+            intent_response = intent.IntentResponse(language=user_input.language)
+            intent_response.async_set_speech(response_obj.response)
+            return conversation.ConversationResult(
+                response=intent_response,
+                conversation_id=response_obj.conversation_id
+            )
+
+        except Exception as err:
+            _LOGGER.error("Server processing failed: %s", str(err), exc_info=True)
+            self._record_timing(timings, started, "exception")
+            return await self._process_locally(user_input, execute_commands=not commands_ran)
+
+    def _record_timing(
+        self,
+        timings: dict[str, Optional[float]],
+        started: float,
+        fallback: Optional[str] = None,
+    ) -> None:
+        """Keep this request's stage times and fallback reason for the next request's header."""
+        timings["total"] = time.perf_counter() - started
+        if fallback is not None:
+            timings[f"{FALLBACK_PREFIX}{fallback}"] = None
+        self._client_timing = format_timing(timings)
+
+    async def _async_execute_commands(
+        self, commands: list[Command]
+    ) -> list[CommandResult]:
+        """Execute commands returned by the server, coalesced and concurrent."""
+        with self.tracer.span("commands", count=len(commands)):
+            results = await self.command_executor.async_execute(commands)
+        for result in results:
+            if not result.success:
+                _LOGGER.error(
+                    "Command %s failed: %s", result.command.dict(), result.error
+                )
+        return results
+
+    async def _async_send(
+        self,
+        backend: Backend,
+        user_input: conversation.ConversationInput,
+        on_commands: Callable[[list[Command]], None],
+        timings: dict[str, Optional[float]],
+    ) -> Optional[ProcessResponse]:
+        """Send to one backend, resyncing its state mirror once if it asks for it."""
+        with self.tracer.span("request", backend=backend.url):
+            response_obj = await self._async_post(backend, user_input, on_commands, timings)
+        if response_obj is not None and response_obj.resync_required:
+            _LOGGER.info("Server %s requested a full state resync", backend.url)
+            backend.state_sync.reset()
+            with self.tracer.span("request", backend=backend.url, resync=True):
+                response_obj = await self._async_post(backend, user_input, on_commands, timings)
+        if response_obj is None or response_obj.resync_required:
+            return None
+
+        backend.state_sync.acknowledge(response_obj.state_version)
+        return response_obj
+
+    async def _async_post(
+        self,
+        backend: Backend,
+        user_input: conversation.ConversationInput,
+        on_commands: Callable[[list[Command]], None],
+        timings: dict[str, Optional[float]],
+    ) -> Optional[ProcessResponse]:
+        """Send one /process request, returning None if the server can't be used."""
+        started = time.perf_counter()
+        wall_started = time.time()
+        # States come from the event-driven snapshot, only changes since the last ack
+        payload_states, state_sync = backend.state_sync.build()
+        timings["snapshot"] = time.perf_counter() - started
+        self.tracer.record("snapshot", wall_started, timings["snapshot"], entities=len(payload_states))
+
+        # Built from our own typed data, so skip pydantic validation; the server checks at its edge
+        request = ProcessRequest.construct(
+            user_input=UserInput.construct(
+                text=user_input.text,
+                language=user_input.language,
+                conversation_id=user_input.conversation_id,
+                device_id=user_input.device_id
+            ),
+            states=dict(payload_states),
+            config={"server_url": backend.url},
+            state_sync=state_sync,
+            schema_version=SCHEMA_VERSION
+        )
+
+        request_data = request.dict()
+        timings["serialize"] = time.perf_counter() - started - timings["snapshot"]
+        self.tracer.record("serialize", wall_started + timings["snapshot"], timings["serialize"])
+
+        _LOGGER.info("Attempting server request to: %s", backend.url)
+        _LOGGER.debug("Request data: %s", request_data)
+
+        # Sent once; lost if this request fails, the metrics are best effort
+        client_timing, self._client_timing = self._client_timing, None
+        timeout = backend.breaker.timeout()
+        if backend.channel is not None and backend.channel.connected:
+            sent = time.perf_counter()
+            received = False
+
+            async def _tracked(events: AsyncIterator[StreamEvent]) -> AsyncIterator[StreamEvent]:
+                nonlocal received
                 try:
-                    # Get current states of entities
-                    states = {
-                        state.entity_id: state.state
-                        for state in self.hass.states.async_all()
-                    }
-
-                    # Create request using shared models
-                    request = ProcessRequest(
-                        user_input=UserInput(
-                            text=user_input.text,
-                            language=user_input.language,
-                            conversation_id=user_input.conversation_id,
-                            device_id=user_input.device_id
-                        ),
-                        states=states,
-                        config={"server_url": self.server_url}
+                    async for event in events:
+                        received = True
+                        yield event
+                finally:
+                    await events.aclose()
+
+            try:
+                return await asyncio.wait_for(
+                    self._async_consume_events(
+                        _tracked(backend.channel.async_events(
+                            request_data,
+                            int(timeout * 1000),
+                            client_timing,
+                            trace_header().get(TRACEPARENT_HEADER),
+                        )),
+                        on_commands,
+                    ),
+                    timeout,
+                )
+            except ConnectionError as err:
+                if received:
+                    # Streamed commands may already have run, resending would repeat them
+                    _LOGGER.error("WebSocket channel dropped during the response: %s", err)
+                    return None
+                _LOGGER.info("WebSocket channel unavailable, using POST: %s", err)
+            except asyncio.TimeoutError:
+                _LOGGER.error("Server request timed out")
+                return None
+            finally:
+                timings["network"] = time.perf_counter() - sent
+            # The POST only gets what is left of the budget
+            timeout -= time.perf_counter() - sent
+            if timeout <= 0:
+                _LOGGER.error("Server request timed out")
+                return None
+
+        streaming = self.streaming
+        response_obj = None
+        codec = backend.codec
+        headers = {
+            "Content-Type": codec.content_type,
+            "Accept": accept_header(),
+            # The server derives its downstream timeouts from our budget
+            REQUEST_BUDGET_HEADER: str(int(timeout * 1000)),
+            **trace_header(),
+        }
+        if client_timing:
+            headers[CLIENT_TIMING_HEADER] = client_timing
+        sent = time.perf_counter()
+        body = codec.dumps(request_data)
+        timings["serialize"] += time.perf_counter() - sent
+        sent = time.perf_counter()
+        try:
+            async with backend.pool.post(
+                "/process/stream" if streaming else "/process",
+                data=body,
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                _LOGGER.debug("Server timing: %s", response.headers.get(SERVER_TIMING_HEADER))
+                # Switch to the most compact body type the server advertises
+                backend.codec = negotiate(response.headers.get(ACCEPT_POST_HEADER))
+                if response.status == 415 and backend.codec is not codec:
+                    _LOGGER.info("Server rejected %s, using %s", codec.content_type, backend.codec.content_type)
+                    return await self._async_post(backend, user_input, on_commands, timings)
+                if response.status == 404 and streaming:
+                    _LOGGER.warning("Server has no streaming endpoint, disabling streaming")
+                    self.streaming = False
+                    return await self._async_post(backend, user_input, on_commands, timings)
+                if response.status != 200:
+                    _LOGGER.error("Server returned error status: %s", response.status)
+                    text = await response.text()
+                    _LOGGER.error("Server error response: %s", text)
+                elif streaming:
+                    response_obj = await self._async_read_stream(response, on_commands)
+                    _LOGGER.debug("Connection pool stats: %s", backend.pool.stats_dict())
+                else:
+                    result = codec_for_content_type(response.content_type).loads(await response.read())
+                    if result is None:
+                        _LOGGER.error("Server returned None response")
+                    else:
+                        _LOGGER.debug("Received response from server: %s", result)
+                        _LOGGER.debug("Connection pool stats: %s", backend.pool.stats_dict())
+                        response_obj = ProcessResponse(**result)
+
+        except aiohttp.ClientError as err:
+            _LOGGER.error("Failed to communicate with server: %s", str(err))
+        except asyncio.TimeoutError:
+            _LOGGER.error("Server request timed out")
+        except ValueError as err:
+            _LOGGER.error("Failed to parse server response: %s", str(err))
+        finally:
+            timings["network"] = time.perf_counter() - sent
+        return response_obj
+
+    async def _async_read_stream(
+        self,
+        response: aiohttp.ClientResponse,
+        on_commands: Callable[[list[Command]], None],
+    ) -> Optional[ProcessResponse]:
+        """Consume an NDJSON event stream, handing commands off as they arrive."""
+
+        async def _events() -> AsyncIterator[StreamEvent]:
+            async for line in response.content:
+                if line.strip():
+                    yield StreamEvent(**json.loads(line))
+
+        return await self._async_consume_events(_events(), on_commands)
+
+    async def _async_consume_events(
+        self,
+        events: AsyncIterator[StreamEvent],
+        on_commands: Callable[[list[Command]], None],
+    ) -> Optional[ProcessResponse]:
+        """Collect stream events into a response, handing commands off as they arrive."""
+        speech: list[str] = []
+        try:
+            async for event in events:
+                if event.type == "commands" and event.commands:
+                    on_commands(event.commands)
+                elif event.type == "speech" and event.text:
+                    speech.append(event.text)
+                elif event.type == "done":
+                    return ProcessResponse(
+                        response=" ".join(speech),
+                        commands=None,
+                        conversation_id=event.conversation_id,
+                        error=event.error,
+                        state_version=event.state_version,
+                        resync_required=event.resync_required
                     )
+        finally:
+            await events.aclose()
+        _LOGGER.error("Server stream ended without a done event")
+        return None
 
-                    _LOGGER.info("Attempting server request to: %s", self.server_url)
-                    _LOGGER.debug("Request data: %s", request.dict())
-
-                    async with aiohttp.ClientSession() as session:
-                        try:
-                            async with session.post(
-                                f"{self.server_url}/process",
-                                json=request.dict(),
-                                timeout=30
-                            ) as response:
-                                if response.status != 200:
-                                    _LOGGER.error("Server returned error status: %s", response.status)
-                                    text = await response.text()
-                                    _LOGGER.error("Server error response: %s", text)
-                                    return await self._process_locally(user_input)
-                                    
-                                result = await response.json()
-                                if result is None:
-                                    _LOGGER.error("Server returned None response")
-                                    return await self._process_locally(user_input)
-                                    
-                                _LOGGER.debug("Received response from server: %s", result)
-
-                                response_obj = ProcessResponse(**result)
-                                
-                                # Check for error in response
-                                if response_obj.error:
-                                    error_details = response_obj.error
-                                    _LOGGER.error("Server error: %s", error_details.traceback)
-                                    return await self._process_locally(user_input)
-
-                                # Execute any commands returned by server
-                                if response_obj.commands:
-                                    for command in response_obj.commands:
-                                        _LOGGER.debug("Executing command: %s", command.dict())
-                                        await self.hass.services.async_call(
-                                            command.domain,
-                                            command.service,
-                                            command.data,
-                                            blocking=True
-                                        )
-
-                                # Return the response
-                                intent_response = intent.IntentResponse(language=user_input.language)
-                                intent_response.async_set_speech(response_obj.response)
-                                return conversation.ConversationResult(
-                                    response=intent_response,
-                                    conversation_id=response_obj.conversation_id
-                                )
-
-                        except aiohttp.ClientError as err:
-                            _LOGGER.error("Failed to communicate with server: %s", str(err))
-                            return await self._process_locally(user_input)
-                        except asyncio.TimeoutError:
-                            _LOGGER.error("Server request timed out")
-                            return await self._process_locally(user_input)
-                        except ValueError as err:
-                            _LOGGER.error("Failed to parse server response: %s", str(err))
-                            return await self._process_locally(user_input)
-
-                except Exception as err:
-                    _LOGGER.error("Server processing failed: %s", str(err), exc_info=True)
-                    return await self._process_locally(user_input)
+    def async_handle_push(self, backend: Backend, event: dict) -> None:
+        """Handle a server-initiated message from a WebSocket channel."""
+        push_type = event.get("type")
+        if push_type == PUSH_COMMANDS and event.get("commands"):
+            commands = [Command(**command) for command in event["commands"]]
+            self.hass.async_create_task(self._async_execute_commands(commands))
+        elif push_type == PUSH_STATE_REQUEST:
+            _LOGGER.info("Server %s requested a full state snapshot", backend.url)
+            backend.state_sync.reset()
+        elif push_type == PUSH_PROGRESS:
+            _LOGGER.info("Server progress: %s", event.get("text"))
+        else:
+            _LOGGER.debug("Ignoring push of unknown type %s", push_type)
 
     async def _process_locally(
-        self, user_input: conversation.ConversationInput
+        self, user_input: conversation.ConversationInput, execute_commands: bool = True
     ) -> conversation.ConversationResult:
-        """Fallback local processing."""
+        """Fallback local processing; only the answer if the server's commands already ran."""
         try:
-            if "turn on helix" in user_input.text.lower():
-                await self.hass.services.async_call(
-                    "light", 
-                    "turn_on",
-                    {"entity_id": "light.helix"},
-                    blocking=True,
-                )
-                response_text = "Turned on Helix light"
-            else:
-                response_text = "Hello World local"
+            # Phrases are loaded once at setup; no file polling on the event loop
+            with self.tracer.span("local"):
+                match = self.phrases.matcher.match(user_input.text)
+                if (
+                    execute_commands
+                    and match
+                    and match.intent == "turn_on"
+                    and match.slots.get("target") == "helix"
+                ):
+                    await self.hass.services.async_call(
+                        "light", 
+                        "turn_on",
+                        {"entity_id": "light.helix"},
+                        blocking=True,
+                    )
+                    response_text = "Turned on Helix light"
+                else:
+                    response_text = "Hello World local"
             intent_response = intent.IntentResponse(language=user_input.language)
             intent_response.async_set_speech(user_input.text.lower()+" local")
             return conversation.ConversationResult(
@@ -0,0 +1,204 @@
+"""Load-balanced, hedged requests across several processing servers."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Optional
+
+from homeassistant.core import HomeAssistant
+
+from .ServerInterface.Helpers.codec import JSON_CODEC
+from .ServerInterface.Helpers.shared_models import Command, ProcessResponse
+from .circuit_breaker import MIN_LATENCY_SAMPLES, STATE_OPEN, CircuitBreaker
+from .client import ServerConnectionPool
+from .state_snapshot import StateSnapshot
+from .state_sync import StateSyncClient
+from .ws_channel import WebSocketChannel
+
+_LOGGER = logging.getLogger(__name__)
+
+# Weight of the newest sample in the latency EWMA
+EWMA_ALPHA = 0.3
+
+OnCommands = Callable[[list[Command]], None]
+
+
+def parse_server_urls(value: str) -> list[str]:
+    """Split a comma separated list of server URLs."""
+    return [url.strip().rstrip("/") for url in value.split(",") if url.strip()]
+
+
+class Backend:
+    """One processing server with its own pool, breaker and state mirror."""
+
+    def __init__(
+        self, hass: HomeAssistant, url: str, entry_id: str, snapshot: StateSnapshot
+    ) -> None:
+        """Initialize the backend."""
+        self.url = url
+        self.pool = ServerConnectionPool(hass, url)
+        self.breaker = CircuitBreaker(hass, self._probe)
+        # Each server keeps its own mirror, so acks are tracked per backend
+        self.state_sync = StateSyncClient(entry_id, snapshot)
+        self.outstanding = 0
+        self.ewma: Optional[float] = None
+        # Request body codec, upgraded once the server advertises a better one
+        self.codec = JSON_CODEC
+        # Persistent channel when the websocket transport is enabled
+        self.channel: Optional[WebSocketChannel] = None
+
+    async def _probe(self, timeout: float) -> bool:
+        return await self.pool.async_check_health(timeout) == 200
+
+    def record_success(self, latency: float) -> None:
+        """Record a successful request."""
+        self.ewma = latency if self.ewma is None else (
+            EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.ewma
+        )
+        self.breaker.record_success(latency)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Return the p95 latency after which a second backend is asked."""
+        if len(self.breaker.latencies) < MIN_LATENCY_SAMPLES:
+            return None
+        return self.breaker.latencies.percentile(95)
+
+
+class _Claim:
+    """Lets exactly one of the hedged attempts deliver commands and a result."""
+
+    def __init__(self) -> None:
+        self.winner: Optional[Backend] = None
+
+    def take(self, backend: Backend) -> bool:
+        if self.winner is None:
+            self.winner = backend
+        return self.winner is backend
+
+
+class BackendPool:
+    """Picks backends by outstanding requests and latency, hedging slow ones."""
+
+    def __init__(self, backends: list[Backend], hedging: bool = True) -> None:
+        """Initialize the pool."""
+        self.backends = backends
+        self.hedging = hedging
+
+    def pick(self, exclude: tuple[Backend, ...] = ()) -> Optional[Backend]:
+        """Return the least loaded backend whose circuit admits a request."""
+        candidates = sorted(
+            (
+                backend
+                for backend in self.backends
+                if backend not in exclude and backend.breaker.state != STATE_OPEN
+            ),
+            key=lambda backend: (backend.outstanding, backend.ewma or 0.0),
+        )
+        for backend in candidates:
+            if backend.breaker.allow_request():
+                return backend
+        return None
+
+    async def async_start(self) -> bool:
+        """Check and warm all backends, return whether any is healthy."""
+        healthy = False
+        for backend in self.backends:
+            try:
+                healthy |= await backend.pool.async_check_health() == 200
+            except Exception as err:  # pylint: disable=broad-except
+                _LOGGER.warning("Backend %s is not reachable: %s", backend.url, err)
+                backend.breaker.record_failure()
+                continue
+            await backend.pool.async_start()
+        return healthy
+
+    async def async_close(self) -> None:
+        """Close all backends."""
+        for backend in self.backends:
+            backend.breaker.stop()
+            if backend.channel is not None:
+                await backend.channel.async_close()
+            await backend.pool.async_close()
+
+    async def async_request(
+        self,
+        send: Callable[[Backend, OnCommands], Awaitable[Optional[ProcessResponse]]],
+        on_commands: OnCommands,
+    ) -> Optional[ProcessResponse]:
+        """Send through the best backend, hedging to a second one after its p95."""
+        primary = self.pick()
+        if primary is None:
+            _LOGGER.debug("No backend admits requests, all circuits are open")
+            return None
+
+        claim = _Claim()
+        first = asyncio.ensure_future(self._attempt(primary, send, on_commands, claim))
+        delay = primary.hedge_delay() if self.hedging else None
+        if delay is None:
+            return await self._failover(await first, primary, send, on_commands, claim)
+
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        secondary = None if done or claim.winner else self.pick(exclude=(primary,))
+        if secondary is None:
+            return await self._failover(await first, primary, send, on_commands, claim)
+
+        _LOGGER.debug("Hedging request from %s to %s", primary.url, secondary.url)
+        second = asyncio.ensure_future(self._attempt(secondary, send, on_commands, claim))
+        pending = {first, second}
+        result = None
+        while pending and result is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if result is None:
+                    result = task.result()
+        for task in pending:
+            task.cancel()
+        return result
+
+    async def _failover(
+        self,
+        result: Optional[ProcessResponse],
+        primary: Backend,
+        send: Callable[[Backend, OnCommands], Awaitable[Optional[ProcessResponse]]],
+        on_commands: OnCommands,
+        claim: _Claim,
+    ) -> Optional[ProcessResponse]:
+        """Retry a failed unhedged attempt once on another backend."""
+        # Once commands were executed the request must not run twice
+        if result is not None or claim.winner is not None:
+            return result
+        secondary = self.pick(exclude=(primary,))
+        if secondary is None:
+            return None
+        _LOGGER.debug("Failing over request from %s to %s", primary.url, secondary.url)
+        return await self._attempt(secondary, send, on_commands, claim)
+
+    async def _attempt(
+        self,
+        backend: Backend,
+        send: Callable[[Backend, OnCommands], Awaitable[Optional[ProcessResponse]]],
+        on_commands: OnCommands,
+        claim: _Claim,
+    ) -> Optional[ProcessResponse]:
+        """Run one attempt; only the claiming attempt may execute commands."""
+
+        def _claimed_commands(commands: list[Command]) -> None:
+            if claim.take(backend):
+                on_commands(commands)
+
+        backend.outstanding += 1
+        started = time.monotonic()
+        try:
+            response = await send(backend, _claimed_commands)
+        finally:
+            backend.outstanding -= 1
+
+        if response is None:
+            backend.breaker.record_failure()
+            return None
+        backend.record_success(time.monotonic() - started)
+        if not claim.take(backend):
+            return None
+        return response
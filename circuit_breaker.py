@@ -0,0 +1,143 @@
+"""Circuit breaker with latency-adaptive timeouts for the processing server."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Optional
+
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    DEFAULT_BREAKER_FAILURE_THRESHOLD,
+    DEFAULT_BREAKER_MAX_TIMEOUT,
+    DEFAULT_BREAKER_MIN_TIMEOUT,
+    DEFAULT_BREAKER_PROBE_INTERVAL,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+# Samples needed before timeouts follow observed latency
+MIN_LATENCY_SAMPLES = 5
+
+
+class LatencyWindow:
+    """Sliding window of recent request latencies."""
+
+    def __init__(self, size: int = 100) -> None:
+        """Initialize the window."""
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, latency: float) -> None:
+        """Record one latency in seconds."""
+        self._samples.append(latency)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Return the given percentile, None without samples."""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker that probes /health while open."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        probe: Callable[[float], Awaitable[bool]],
+        failure_threshold: int = DEFAULT_BREAKER_FAILURE_THRESHOLD,
+        probe_interval: float = DEFAULT_BREAKER_PROBE_INTERVAL,
+        min_timeout: float = DEFAULT_BREAKER_MIN_TIMEOUT,
+        max_timeout: float = DEFAULT_BREAKER_MAX_TIMEOUT,
+        timeout_factor: float = 2.0,
+    ) -> None:
+        """Initialize the breaker."""
+        self.hass = hass
+        self._probe = probe
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_factor = timeout_factor
+        self.latencies = LatencyWindow()
+        self.state = STATE_CLOSED
+        self._failures = 0
+        self._trial_started: Optional[float] = None
+        self._probe_task: Optional[asyncio.Task] = None
+
+    def allow_request(self) -> bool:
+        """Return whether a request may go to the server right now."""
+        if self.state == STATE_CLOSED:
+            return True
+        if self.state == STATE_HALF_OPEN:
+            now = time.monotonic()
+            # One trial request at a time; a lost trial frees the slot after max_timeout
+            if self._trial_started is None or now - self._trial_started > self.max_timeout:
+                self._trial_started = now
+                return True
+        return False
+
+    def timeout(self) -> float:
+        """Return the request timeout derived from the observed p99 latency."""
+        if len(self.latencies) < MIN_LATENCY_SAMPLES:
+            return self.max_timeout
+        p99 = self.latencies.percentile(99)
+        return max(self.min_timeout, min(self.max_timeout, p99 * self.timeout_factor))
+
+    def record_success(self, latency: float) -> None:
+        """Record a successful request."""
+        self.latencies.add(latency)
+        self._failures = 0
+        self._trial_started = None
+        if self.state != STATE_CLOSED:
+            _LOGGER.info("Server recovered, closing circuit")
+            self.state = STATE_CLOSED
+
+    def record_failure(self) -> None:
+        """Record a failed or timed out request."""
+        self._failures += 1
+        self._trial_started = None
+        if self.state == STATE_HALF_OPEN or self._failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        if self.state != STATE_OPEN:
+            _LOGGER.warning(
+                "Opening circuit after %s failures, using local processing", self._failures
+            )
+        self.state = STATE_OPEN
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = self.hass.async_create_background_task(
+                self._probe_loop(), "extended_conversation_client recovery probe"
+            )
+
+    async def _probe_loop(self) -> None:
+        """Probe /health in the background until the server answers again."""
+        while self.state == STATE_OPEN:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                healthy = await self._probe(self.min_timeout)
+            except Exception as err:  # pylint: disable=broad-except
+                _LOGGER.debug("Recovery probe failed: %s", err)
+                continue
+            if healthy:
+                _LOGGER.info("Recovery probe succeeded, half-opening circuit")
+                self.state = STATE_HALF_OPEN
+
+    def stop(self) -> None:
+        """Cancel the background probe."""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            self._probe_task = None
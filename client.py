@@ -0,0 +1,145 @@
+"""Pooled HTTP client for the external processing server."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Optional
+
+import aiohttp
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    DEFAULT_HEALTH_TIMEOUT,
+    DEFAULT_POOL_KEEPALIVE_TIMEOUT,
+    DEFAULT_POOL_LIMIT_PER_HOST,
+    DEFAULT_POOL_WARM_CONNECTIONS,
+    DEFAULT_REQUEST_TIMEOUT,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ServerConnectionPool:
+    """Long-lived keep-alive session shared by all requests of one config entry."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        server_url: str,
+        limit_per_host: int = DEFAULT_POOL_LIMIT_PER_HOST,
+        keepalive_timeout: float = DEFAULT_POOL_KEEPALIVE_TIMEOUT,
+        warm_connections: int = DEFAULT_POOL_WARM_CONNECTIONS,
+    ) -> None:
+        """Initialize the pool."""
+        self.hass = hass
+        self.server_url = server_url.rstrip("/")
+        self._limit_per_host = limit_per_host
+        self._keepalive_timeout = keepalive_timeout
+        self._warm_connections = max(0, min(warm_connections, limit_per_host))
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self._last_used = 0.0
+        self.stats = {"requests": 0, "reused": 0, "created": 0}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Return the underlying session, opening it on first use."""
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+        return self._session
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        """Create a session with a keep-alive connector and reuse tracing."""
+        connector = aiohttp.TCPConnector(
+            limit_per_host=self._limit_per_host,
+            keepalive_timeout=self._keepalive_timeout,
+            ttl_dns_cache=300,
+        )
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_connection_reuseconn.append(self._on_connection_reused)
+        trace_config.on_connection_create_end.append(self._on_connection_created)
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=DEFAULT_REQUEST_TIMEOUT),
+            trace_configs=[trace_config],
+        )
+
+    async def _on_request_start(self, session, ctx, params) -> None:
+        self.stats["requests"] += 1
+        self._last_used = time.monotonic()
+
+    async def _on_connection_reused(self, session, ctx, params) -> None:
+        self.stats["reused"] += 1
+
+    async def _on_connection_created(self, session, ctx, params) -> None:
+        self.stats["created"] += 1
+
+    def stats_dict(self) -> dict[str, Any]:
+        """Return reuse/miss counters of the pool."""
+        connections = self.stats["reused"] + self.stats["created"]
+        return {
+            **self.stats,
+            "reuse_ratio": self.stats["reused"] / connections if connections else 0.0,
+        }
+
+    def post(self, path: str, **kwargs):
+        """Send a POST request through the pool."""
+        return self.session.post(f"{self.server_url}{path}", **kwargs)
+
+    def get(self, path: str, **kwargs):
+        """Send a GET request through the pool."""
+        return self.session.get(f"{self.server_url}{path}", **kwargs)
+
+    async def async_check_health(self, timeout: float = DEFAULT_HEALTH_TIMEOUT) -> int:
+        """Probe /health and return the HTTP status."""
+        async with self.get("/health", timeout=timeout) as response:
+            await response.read()
+            return response.status
+
+    async def async_get_trace(self, trace_id: str) -> list[dict[str, Any]]:
+        """Fetch the server's spans of one trace, including those of its downstream services."""
+        async with self.get(f"/traces/{trace_id}", timeout=DEFAULT_HEALTH_TIMEOUT) as response:
+            if response.status != 200:
+                return []
+            return (await response.json()).get("spans", [])
+
+    async def async_warm_up(self) -> None:
+        """Open idle connections up front so the first utterances skip the handshake."""
+        if not self._warm_connections:
+            return
+        results = await asyncio.gather(
+            *(self.async_check_health() for _ in range(self._warm_connections)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                _LOGGER.debug("Connection warm-up failed: %s", result)
+
+    async def async_start(self) -> None:
+        """Warm the pool and keep idle connections alive in the background."""
+        await self.async_warm_up()
+        if self._warm_connections and self._keepalive_task is None:
+            self._keepalive_task = self.hass.async_create_background_task(
+                self._keepalive_loop(), "extended_conversation_client pool keep-alive"
+            )
+
+    async def _keepalive_loop(self) -> None:
+        """Refresh connections shortly before the connector would drop them."""
+        interval = self._keepalive_timeout * 0.8
+        while True:
+            await asyncio.sleep(interval)
+            if time.monotonic() - self._last_used < interval:
+                continue
+            await self.async_warm_up()
+
+    async def async_close(self) -> None:
+        """Stop the keep-alive task and close all pooled connections."""
+        if self._keepalive_task is not None:
+            self._keepalive_task.cancel()
+            self._keepalive_task = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        _LOGGER.debug("Connection pool closed: %s", self.stats_dict())
@@ -0,0 +1,119 @@
+"""Concurrent, coalesced execution of server commands."""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ServiceNotFound
+
+from .ServerInterface.Helpers.shared_models import Command
+
+_LOGGER = logging.getLogger(__name__)
+
+# Raised before the service handler runs, so no command of the group was applied
+PRE_DISPATCH_ERRORS = (ServiceNotFound, vol.Invalid)
+
+# Services that end in the same state when called twice
+IDEMPOTENT_SERVICES = frozenset({
+    "turn_on", "turn_off", "open_cover", "close_cover", "lock", "unlock",
+    "select_option", "volume_mute", "media_play", "media_pause", "media_stop",
+})
+
+
+@dataclass
+class CommandResult:
+    """Outcome of one command returned by the server."""
+
+    command: Command
+    success: bool
+    error: Optional[str] = None
+
+
+def _entity_ids(data: dict[str, Any]) -> list[str]:
+    entity_id = data.get("entity_id")
+    if isinstance(entity_id, str):
+        return [entity_id]
+    return list(entity_id or [])
+
+
+def is_idempotent(command: Command) -> bool:
+    """Whether repeating the command cannot apply it twice."""
+    if command.service not in IDEMPOTENT_SERVICES and not command.service.startswith("set_"):
+        return False
+    # Relative changes like brightness_step_pct add up
+    return not any("_step" in key for key in command.data)
+
+
+def group_commands(commands: list[Command]) -> dict[Any, list[int]]:
+    """Group command indexes that can share one service call."""
+    groups: dict[Any, list[int]] = {}
+    for index, command in enumerate(commands):
+        if "entity_id" not in command.data:
+            # Targets like area_id cannot be merged safely
+            groups[("single", index)] = [index]
+            continue
+        rest = {key: value for key, value in command.data.items() if key != "entity_id"}
+        key = (command.domain, command.service, json.dumps(rest, sort_keys=True, default=str))
+        groups.setdefault(key, []).append(index)
+    return groups
+
+
+class CommandExecutor:
+    """Runs commands grouped by domain/service with bounded concurrency."""
+
+    def __init__(self, hass: HomeAssistant, max_concurrency: int) -> None:
+        """Initialize the executor."""
+        self.hass = hass
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def async_execute(self, commands: list[Command]) -> list[CommandResult]:
+        """Execute commands and return one result per command, in order."""
+        results: list[Optional[CommandResult]] = [None] * len(commands)
+
+        async def _run_group(indexes: list[int]) -> None:
+            members = [commands[index] for index in indexes]
+            async with self._semaphore:
+                error, dispatched = await self._async_call(members)
+                if error is not None and len(members) > 1 and (not dispatched or is_idempotent(members[0])):
+                    # Retry one by one so each command reports its own outcome; the failed
+                    # group call may have applied some, so only if repeating them is safe
+                    for index, command in zip(indexes, members):
+                        single_error, _ = await self._async_call([command])
+                        results[index] = CommandResult(command, single_error is None, single_error)
+                    return
+            for index, command in zip(indexes, members):
+                results[index] = CommandResult(command, error is None, error)
+
+        await asyncio.gather(*(_run_group(indexes) for indexes in group_commands(commands).values()))
+        return results
+
+    async def _async_call(self, members: list[Command]) -> tuple[Optional[str], bool]:
+        """
+        Issue one service call for a group. Returns (error message or None, whether the
+        call reached the service handler, so some commands may have been applied).
+        """
+        first = members[0]
+        data = dict(first.data)
+        if len(members) > 1:
+            entity_ids: list[str] = []
+            for command in members:
+                for entity_id in _entity_ids(command.data):
+                    if entity_id not in entity_ids:
+                        entity_ids.append(entity_id)
+            data["entity_id"] = entity_ids
+        _LOGGER.debug("Executing command: %s.%s %s", first.domain, first.service, data)
+        try:
+            await self.hass.services.async_call(first.domain, first.service, data, blocking=True)
+        except PRE_DISPATCH_ERRORS as err:
+            _LOGGER.warning("Command %s.%s rejected: %s", first.domain, first.service, err)
+            return str(err), False
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.warning("Command %s.%s failed: %s", first.domain, first.service, err)
+            return str(err), True
+        return None, True
@@ -11,6 +11,20 @@ from .const import (
     DEFAULT_SERVER_URL,
     CONF_SERVER_ENABLED,
     DEFAULT_SERVER_ENABLED,
+    CONF_STREAMING,
+    DEFAULT_STREAMING,
+    CONF_HEDGING,
+    DEFAULT_HEDGING,
+    CONF_COMMAND_CONCURRENCY,
+    DEFAULT_COMMAND_CONCURRENCY,
+    CONF_TRANSPORT,
+    DEFAULT_TRANSPORT,
+    TRANSPORT_HTTP,
+    TRANSPORT_WEBSOCKET,
+    CONF_EXPOSED_ONLY,
+    DEFAULT_EXPOSED_ONLY,
+    CONF_STATE_DOMAINS,
+    DEFAULT_STATE_DOMAINS,
 )
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -82,6 +96,42 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                             CONF_SERVER_ENABLED, DEFAULT_SERVER_ENABLED
                         ),
                     ): bool,
+                    vol.Optional(
+                        CONF_STREAMING,
+                        default=self.config_entry.options.get(
+                            CONF_STREAMING, DEFAULT_STREAMING
+                        ),
+                    ): bool,
+                    vol.Optional(
+                        CONF_HEDGING,
+                        default=self.config_entry.options.get(
+                            CONF_HEDGING, DEFAULT_HEDGING
+                        ),
+                    ): bool,
+                    vol.Optional(
+                        CONF_COMMAND_CONCURRENCY,
+                        default=self.config_entry.options.get(
+                            CONF_COMMAND_CONCURRENCY, DEFAULT_COMMAND_CONCURRENCY
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=32)),
+                    vol.Optional(
+                        CONF_TRANSPORT,
+                        default=self.config_entry.options.get(
+                            CONF_TRANSPORT, DEFAULT_TRANSPORT
+                        ),
+                    ): vol.In([TRANSPORT_HTTP, TRANSPORT_WEBSOCKET]),
+                    vol.Optional(
+                        CONF_EXPOSED_ONLY,
+                        default=self.config_entry.options.get(
+                            CONF_EXPOSED_ONLY, DEFAULT_EXPOSED_ONLY
+                        ),
+                    ): bool,
+                    vol.Optional(
+                        CONF_STATE_DOMAINS,
+                        default=self.config_entry.options.get(
+                            CONF_STATE_DOMAINS, DEFAULT_STATE_DOMAINS
+                        ),
+                    ): str,
                 }
             ),
         )
\ No newline at end of file
@@ -3,8 +3,50 @@
 DOMAIN = "extended_conversation_client"
 
 # Server configuration
-CONF_SERVER_URL = "server_url"
+CONF_SERVER_URL = "server_url"  # Eine oder mehrere URLs, kommagetrennt
 # Host IP vom Docker-Host-System verwenden (typisch 172.x.x.x oder host.docker.internal)
 DEFAULT_SERVER_URL = "http://172.20.0.1:8129"  # Ersetze mit der tatsächlichen Host-IP
 CONF_SERVER_ENABLED = "server_enabled"
-DEFAULT_SERVER_ENABLED = True
\ No newline at end of file
+DEFAULT_SERVER_ENABLED = True
+
+CONF_STREAMING = "streaming"
+DEFAULT_STREAMING = True
+CONF_HEDGING = "hedging"
+DEFAULT_HEDGING = True
+CONF_COMMAND_CONCURRENCY = "command_concurrency"
+DEFAULT_COMMAND_CONCURRENCY = 4
+
+# Transport: one POST per turn or a persistent WebSocket (falls back to POST)
+CONF_TRANSPORT = "transport"
+TRANSPORT_HTTP = "http"
+TRANSPORT_WEBSOCKET = "websocket"
+DEFAULT_TRANSPORT = TRANSPORT_HTTP
+
+# State snapshot sent to the server
+CONF_EXPOSED_ONLY = "exposed_only"
+DEFAULT_EXPOSED_ONLY = False
+CONF_STATE_DOMAINS = "state_domains"  # Kommagetrennt, leer = alle Domains
+DEFAULT_STATE_DOMAINS = ""
+
+# Connection pool towards the processing server
+DEFAULT_REQUEST_TIMEOUT = 30
+DEFAULT_HEALTH_TIMEOUT = 10
+DEFAULT_POOL_LIMIT_PER_HOST = 4
+DEFAULT_POOL_KEEPALIVE_TIMEOUT = 60
+DEFAULT_POOL_WARM_CONNECTIONS = 2
+
+# WebSocket channel towards the processing server
+DEFAULT_WS_HEARTBEAT = 15
+DEFAULT_WS_RECONNECT_MIN = 1
+DEFAULT_WS_RECONNECT_MAX = 30
+
+# Circuit breaker towards the processing server
+DEFAULT_BREAKER_FAILURE_THRESHOLD = 3
+DEFAULT_BREAKER_PROBE_INTERVAL = 10
+DEFAULT_BREAKER_MIN_TIMEOUT = 2
+DEFAULT_BREAKER_MAX_TIMEOUT = DEFAULT_REQUEST_TIMEOUT
+
+# Tracing: spans of recent turns, queried by trace id with the get_trace service
+TRACE_SERVICE_NAME = "ha_integration"
+SERVICE_GET_TRACE = "get_trace"
+ATTR_TRACE_ID = "trace_id"
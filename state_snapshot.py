@@ -0,0 +1,140 @@
+"""Incrementally maintained entity state snapshot."""
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Callable, Mapping
+from types import MappingProxyType
+from typing import Any, Optional
+
+from homeassistant.components.homeassistant.exposed_entities import async_should_expose
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import Event, HomeAssistant, State, callback
+from homeassistant.helpers import (
+    area_registry as ar,
+    device_registry as dr,
+    entity_registry as er,
+)
+
+_REMOVED = object()
+
+
+class StateSnapshot:
+    """Entity states kept up to date from state_changed events."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        domains: Optional[set[str]] = None,
+        exposed_only: bool = False,
+    ) -> None:
+        """Initialize the snapshot."""
+        self.hass = hass
+        self.domains = domains or None
+        self.exposed_only = exposed_only
+        self.version = 0
+        self._base_version = 0
+        self._states: dict[str, Any] = {}
+        self._shared = False
+        # entity_id -> version of its last change, oldest change first
+        self._changelog: OrderedDict[str, int] = OrderedDict()
+        self._unsub: Optional[Callable[[], None]] = None
+
+    @callback
+    def async_start(self) -> None:
+        """Build the initial snapshot and start following state changes."""
+        self._states = {
+            state.entity_id: self._encode(state)
+            for state in self.hass.states.async_all()
+            if self._included(state.entity_id)
+        }
+        self._shared = False
+        self._changelog.clear()
+        self.version += 1
+        self._base_version = self.version
+        self._unsub = self.hass.bus.async_listen(
+            EVENT_STATE_CHANGED, self._async_state_changed
+        )
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop following state changes."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    def _included(self, entity_id: str) -> bool:
+        if self.domains is not None and entity_id.split(".", 1)[0] not in self.domains:
+            return False
+        if self.exposed_only:
+            return async_should_expose(self.hass, "conversation", entity_id)
+        return True
+
+    def _encode(self, state: State) -> Any:
+        """Encode a state with the name and area the server indexes on."""
+        return {
+            "state": state.state,
+            "name": state.name,
+            "area": self._area_name(state.entity_id),
+        }
+
+    def _area_name(self, entity_id: str) -> Optional[str]:
+        entity = er.async_get(self.hass).async_get(entity_id)
+        if entity is None:
+            return None
+        area_id = entity.area_id
+        if area_id is None and entity.device_id is not None:
+            device = dr.async_get(self.hass).async_get(entity.device_id)
+            area_id = device.area_id if device is not None else None
+        if area_id is None:
+            return None
+        area = ar.async_get(self.hass).async_get_area(area_id)
+        return area.name if area is not None else None
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        entity_id = event.data["entity_id"]
+        new_state: Optional[State] = event.data.get("new_state")
+
+        if new_state is None or not self._included(entity_id):
+            if entity_id not in self._states:
+                return
+            value = _REMOVED
+        else:
+            value = self._encode(new_state)
+            if self._states.get(entity_id, _REMOVED) == value:
+                return
+
+        # Copy-on-write: views handed out earlier must not change under their reader.
+        if self._shared:
+            self._states = dict(self._states)
+            self._shared = False
+        if value is _REMOVED:
+            del self._states[entity_id]
+        else:
+            self._states[entity_id] = value
+
+        self.version += 1
+        self._changelog[entity_id] = self.version
+        self._changelog.move_to_end(entity_id)
+
+    def view(self) -> Mapping[str, Any]:
+        """Return a read-only view that stays frozen at the current version."""
+        self._shared = True
+        return MappingProxyType(self._states)
+
+    def changes_since(
+        self, version: int
+    ) -> Optional[tuple[dict[str, Any], list[str]]]:
+        """Return entities changed and removed after version, None if unknown."""
+        if version < self._base_version:
+            return None
+        changed: dict[str, Any] = {}
+        removed: list[str] = []
+        for entity_id in reversed(self._changelog):
+            if self._changelog[entity_id] <= version:
+                break
+            if entity_id in self._states:
+                changed[entity_id] = self._states[entity_id]
+            else:
+                removed.append(entity_id)
+        return changed, removed
@@ -0,0 +1,51 @@
+"""Versioned delta state sync towards the processing server."""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from typing import Any, Optional
+from uuid import uuid4
+
+from .ServerInterface.Helpers.shared_models import StateSync
+from .state_snapshot import StateSnapshot
+
+
+class StateSyncClient:
+    """Tracks what the server has acknowledged and builds state deltas against it."""
+
+    def __init__(self, entry_id: str, snapshot: StateSnapshot) -> None:
+        """Initialize the sync client."""
+        # A fresh id per start makes the server discard mirrors of older runs.
+        self.client_id = f"{entry_id}-{uuid4().hex[:8]}"
+        self.snapshot = snapshot
+        self._acked_version: Optional[int] = None
+
+    def build(self, full: bool = False) -> tuple[Mapping[str, Any], StateSync]:
+        """Return the states payload and sync header for the next request."""
+        version = self.snapshot.version
+        changes = None
+        if not full and self._acked_version is not None:
+            changes = self.snapshot.changes_since(self._acked_version)
+
+        if changes is None:
+            return self.snapshot.view(), StateSync(
+                client_id=self.client_id, version=version
+            )
+
+        changed, removed = changes
+        return changed, StateSync(
+            client_id=self.client_id,
+            version=version,
+            base_version=self._acked_version,
+            removed=removed,
+        )
+
+    def acknowledge(self, version: Optional[int]) -> None:
+        """Record that the server mirror reached version."""
+        if version is None:
+            return
+        if self._acked_version is None or version > self._acked_version:
+            self._acked_version = version
+
+    def reset(self) -> None:
+        """Forget the acknowledged version so the next request is a full resync."""
+        self._acked_version = None
@@ -0,0 +1,162 @@
+"""Persistent, multiplexed WebSocket channel to the processing server."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import uuid
+from collections.abc import AsyncIterator, Callable
+from typing import Any, Optional
+
+import aiohttp
+from homeassistant.core import HomeAssistant
+
+from .ServerInterface.Helpers.shared_models import StreamEvent
+from .ServerInterface.Helpers.ws_protocol import (
+    MSG_CANCEL,
+    MSG_EVENT,
+    MSG_PING,
+    MSG_PONG,
+    MSG_PROCESS,
+    MSG_PUSH,
+    decode_message,
+    encode_message,
+)
+from .client import ServerConnectionPool
+from .const import (
+    DEFAULT_WS_HEARTBEAT,
+    DEFAULT_WS_RECONNECT_MAX,
+    DEFAULT_WS_RECONNECT_MIN,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Ends the event queue of a request when the channel drops
+_CLOSED = object()
+
+
+class WebSocketChannel:
+    """One socket per server carrying every in-flight request, reconnecting in the background."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        pool: ServerConnectionPool,
+        on_push: Callable[[dict[str, Any]], None],
+    ) -> None:
+        """Initialize the channel."""
+        self.hass = hass
+        self.pool = pool
+        self.on_push = on_push
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._pending: dict[str, asyncio.Queue] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def connected(self) -> bool:
+        """Return whether requests can go over the socket right now."""
+        return self._ws is not None and not self._ws.closed
+
+    def async_start(self) -> None:
+        """Connect in the background and keep reconnecting until closed."""
+        if self._task is None:
+            self._task = self.hass.async_create_background_task(
+                self._run(), "extended_conversation_client websocket"
+            )
+
+    async def _run(self) -> None:
+        delay = DEFAULT_WS_RECONNECT_MIN
+        while True:
+            try:
+                # aiohttp answers protocol pings and closes the socket if ours go unanswered
+                async with self.pool.session.ws_connect(
+                    f"{self.pool.server_url}/ws", heartbeat=DEFAULT_WS_HEARTBEAT
+                ) as ws:
+                    self._ws = ws
+                    delay = DEFAULT_WS_RECONNECT_MIN
+                    _LOGGER.info("WebSocket channel to %s open", self.pool.server_url)
+                    await self._read(ws)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                _LOGGER.debug("WebSocket channel to %s failed: %s", self.pool.server_url, err)
+            finally:
+                self._ws = None
+                self._fail_pending()
+            _LOGGER.debug("Reconnecting WebSocket channel in %ss", delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, DEFAULT_WS_RECONNECT_MAX)
+
+    async def _read(self, ws: aiohttp.ClientWebSocketResponse) -> None:
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+            try:
+                message = decode_message(msg.data)
+            except ValueError as err:
+                _LOGGER.warning("Ignoring malformed WebSocket message: %s", err)
+                continue
+
+            if message["type"] == MSG_EVENT:
+                queue = self._pending.get(message.get("id"))
+                if queue is not None:
+                    queue.put_nowait(message.get("event") or {})
+            elif message["type"] == MSG_PUSH:
+                self.on_push(message.get("event") or {})
+            elif message["type"] == MSG_PING:
+                await ws.send_str(encode_message({"type": MSG_PONG}))
+
+    def _fail_pending(self) -> None:
+        for queue in self._pending.values():
+            queue.put_nowait(_CLOSED)
+
+    async def async_events(
+        self,
+        request: dict[str, Any],
+        budget_ms: int,
+        timing: Optional[str] = None,
+        traceparent: Optional[str] = None,
+    ) -> AsyncIterator[StreamEvent]:
+        """Send one request and yield its events up to "done"; ConnectionError if the socket drops."""
+        ws = self._ws
+        if ws is None or ws.closed:
+            raise ConnectionError("WebSocket channel is not connected")
+
+        request_id = uuid.uuid4().hex
+        queue: asyncio.Queue = asyncio.Queue()
+        self._pending[request_id] = queue
+        done = False
+        try:
+            await ws.send_str(encode_message(
+                {
+                    "type": MSG_PROCESS,
+                    "id": request_id,
+                    "request": request,
+                    "budget_ms": budget_ms,
+                    "timing": timing,
+                    "traceparent": traceparent,
+                }
+            ))
+            while True:
+                item = await queue.get()
+                if item is _CLOSED:
+                    raise ConnectionError("WebSocket channel closed during the request")
+                event = StreamEvent(**item)
+                done = event.type == "done"
+                yield event
+                if done:
+                    return
+        finally:
+            del self._pending[request_id]
+            if not done and not ws.closed:
+                # Timed out or hedged away: let the server stop working on it
+                try:
+                    await ws.send_str(encode_message({"type": MSG_CANCEL, "id": request_id}))
+                except (aiohttp.ClientError, ConnectionError) as err:
+                    _LOGGER.debug("Could not cancel request %s: %s", request_id, err)
+
+    async def async_close(self) -> None:
+        """Stop reconnecting and close the socket."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._ws is not None:
+            await self._ws.close()
+            self._ws = None